@@ -0,0 +1,156 @@
+"""Process-wide admission control for CPU-bound OCR and network-bound summaries.
+
+Each kind of work passes through its own Gate: at most `limit` calls run at
+once, at most `max_queue` more wait for a slot, and none waits longer than
+`max_wait` seconds. Work that cannot be admitted raises ServerBusy straight
+away, with a retry_after hint in whole seconds estimated from recent service
+times, instead of piling more tesseract processes or API calls onto a
+saturated container.
+
+    with get_ocr_gate().slot():
+        text = extract_text(image)
+
+Limits are per process: under several gunicorn workers the machine-wide limit
+is the per-process limit times WEB_CONCURRENCY.
+"""
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+# Defaults (overridable through environment variables)
+DEFAULT_OCR_CONCURRENCY = os.cpu_count() or 1
+DEFAULT_SUMMARY_CONCURRENCY = 8
+# Unless set, a gate's queue holds this many calls per slot
+DEFAULT_QUEUE_PER_SLOT = 2
+DEFAULT_MAX_WAIT = 10.0
+
+# Service time assumed before a gate has timed any work, and the hint's ceiling
+INITIAL_SERVICE_SECONDS = {"ocr": 2.0, "summary": 5.0}
+MAX_RETRY_AFTER = 60
+SERVICE_SMOOTHING = 0.2
+
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_WAIT_TOO_LONG = "wait_too_long"
+REJECT_TIMEOUT = "timeout"
+
+
+class ServerBusy(RuntimeError):
+    """Raised when a gate turns work away; retry_after is a hint in seconds."""
+
+    def __init__(self, gate, retry_after):
+        super().__init__(f"NutriScan is busy ({gate}); retry in {retry_after} s")
+        self.gate = gate
+        self.retry_after = retry_after
+
+
+class Gate:
+    """Bounded concurrency with a bounded, time-limited wait queue."""
+
+    def __init__(self, name, limit, max_queue, max_wait=DEFAULT_MAX_WAIT, service_seconds=1.0):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.service_seconds = service_seconds
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def estimated_wait(self, ahead=None):
+        """Seconds until a slot frees up for work arriving behind `ahead` waiters (default: all)."""
+        ahead = self.waiting if ahead is None else ahead
+        if self.active < self.limit and ahead == 0:
+            return 0.0
+        return self.service_seconds * (ahead + 1) / self.limit
+
+    def retry_after(self):
+        """Whole seconds a rejected caller should wait before trying again."""
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(self.estimated_wait())))
+
+    def _reject(self, reason):
+        # Called with the condition held
+        self.rejected += 1
+        metrics.ADMISSION_REJECTIONS.inc(self.name, reason)
+        raise ServerBusy(self.name, self.retry_after())
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot for the duration of the block, or raise ServerBusy."""
+        start = time.perf_counter()
+        with self._cond:
+            if self.active >= self.limit:
+                if self.waiting >= self.max_queue:
+                    self._reject(REJECT_QUEUE_FULL)
+                # Fail fast when the queue ahead already exceeds the longest allowed wait
+                if self.estimated_wait() > self.max_wait:
+                    self._reject(REJECT_WAIT_TOO_LONG)
+                self.waiting += 1
+                metrics.ADMISSION_QUEUE_DEPTH.inc(self.name)
+                try:
+                    deadline = start + self.max_wait
+                    while self.active >= self.limit:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self._reject(REJECT_TIMEOUT)
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                    metrics.ADMISSION_QUEUE_DEPTH.dec(self.name)
+            self.active += 1
+            metrics.ADMISSION_ACTIVE.inc(self.name)
+        admitted = time.perf_counter()
+        metrics.ADMISSION_WAIT_SECONDS.observe(admitted - start, self.name)
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - admitted
+            with self._cond:
+                self.active -= 1
+                self.service_seconds += SERVICE_SMOOTHING * (held - self.service_seconds)
+                metrics.ADMISSION_ACTIVE.dec(self.name)
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {'active': self.active, 'waiting': self.waiting, 'rejected': self.rejected,
+                    'limit': self.limit, 'max_queue': self.max_queue,
+                    'service_seconds': self.service_seconds}
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+GATE_SETTINGS = {
+    "ocr": ("OCR_CONCURRENCY", DEFAULT_OCR_CONCURRENCY, "OCR_QUEUE_SIZE"),
+    "summary": ("SUMMARY_CONCURRENCY", DEFAULT_SUMMARY_CONCURRENCY, "SUMMARY_QUEUE_SIZE"),
+}
+
+
+def get_gate(name):
+    """Return the process-wide gate for "ocr" or "summary", configured from the environment."""
+    with _gates_lock:
+        gate = _gates.get(name)
+        if gate is None:
+            limit_var, limit, queue_var = GATE_SETTINGS[name]
+            limit = int(os.getenv(limit_var, limit))
+            gate = _gates[name] = Gate(
+                name,
+                limit=limit,
+                max_queue=int(os.getenv(queue_var, DEFAULT_QUEUE_PER_SLOT * limit)),
+                max_wait=float(os.getenv("ADMISSION_MAX_WAIT", DEFAULT_MAX_WAIT)),
+                service_seconds=INITIAL_SERVICE_SECONDS[name],
+            )
+        return gate
+
+
+def get_ocr_gate():
+    return get_gate("ocr")
+
+
+def get_summary_gate():
+    return get_gate("summary")
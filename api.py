@@ -0,0 +1,180 @@
+"""JSON HTTP API for the NutriScan label pipeline (plain WSGI, no Streamlit).
+
+    gunicorn -c gunicorn.conf.py api:application
+
+Endpoints:
+
+    POST /v1/analyze/image   raw image bytes as the request body
+    POST /v1/analyze/text    {"text": "<label text>"}
+    GET  /healthz            liveness check
+    GET  /metrics            Prometheus metrics (when METRICS_ENABLED=1)
+
+Both analyze endpoints return the pipeline result (nutrients, flags, status,
+timings) as JSON. Add ``?summary=1`` to the image URL, or ``"summary": true``
+to the text body, for a summary; ``summarizer`` picks the backend
+(auto|mistral|local).
+
+When OCR admission control turns a request away (see admission.py), the
+response is 503 with a Retry-After header instead of a long wait.
+"""
+import os
+import json
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+import metrics
+from admission import ServerBusy
+from pipeline import analyze_image, analyze_text
+from results_store import record_result
+
+load_dotenv()
+
+MAX_UPLOAD_BYTES = int(os.getenv("API_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+SUMMARIZER_CHOICES = ("auto", "mistral", "local")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_STATUS = {
+    200: "200 OK",
+    400: "400 Bad Request",
+    404: "404 Not Found",
+    405: "405 Method Not Allowed",
+    411: "411 Length Required",
+    413: "413 Payload Too Large",
+    503: "503 Service Unavailable",
+}
+
+
+class APIError(Exception):
+    """Client error returned as a JSON {"error": ...} body."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or []
+
+
+def json_response(start_response, status, body, headers=None):
+    data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+    start_response(HTTP_STATUS[status], [
+        ('Content-Type', 'application/json; charset=utf-8'),
+        ('Content-Length', str(len(data))),
+    ] + (headers or []))
+    return [data]
+
+
+def read_body(environ):
+    """Read the request body, enforcing MAX_UPLOAD_BYTES."""
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        raise APIError(400, "Invalid Content-Length")
+    if length <= 0:
+        raise APIError(411, "A request body with a Content-Length is required")
+    if length > MAX_UPLOAD_BYTES:
+        raise APIError(413, f"Request body exceeds {MAX_UPLOAD_BYTES} bytes")
+    return environ['wsgi.input'].read(length)
+
+
+def summary_options(summary, summarizer):
+    """Validate the summary flag and backend name from a request."""
+    if isinstance(summary, str):
+        summary = summary.lower() in ("1", "true", "yes")
+    if summarizer is not None and summarizer not in SUMMARIZER_CHOICES:
+        raise APIError(400, f"summarizer must be one of {', '.join(SUMMARIZER_CHOICES)}")
+    return bool(summary), summarizer
+
+
+def handle_image(environ):
+    query = parse_qs(environ.get('QUERY_STRING', ''))
+    summarize, summarizer = summary_options(
+        query.get('summary', ['0'])[0], query.get('summarizer', [None])[0]
+    )
+    image_bytes = read_body(environ)
+    result = analyze_image(image_bytes, api_key=os.getenv("MISTRAL_API_KEY"),
+                           summarize=summarize, summarizer=summarizer)
+    record_result(result)
+    return result
+
+
+def handle_text(environ):
+    try:
+        payload = json.loads(read_body(environ))
+    except ValueError:
+        raise APIError(400, "Request body must be JSON")
+    if not isinstance(payload, dict) or not isinstance(payload.get('text'), str):
+        raise APIError(400, 'Expected a JSON object with a "text" string')
+    summarize, summarizer = summary_options(payload.get('summary', False), payload.get('summarizer'))
+    result = analyze_text(payload['text'], api_key=os.getenv("MISTRAL_API_KEY"),
+                          summarize=summarize, summarizer=summarizer)
+    record_result(result)
+    return result
+
+
+def handle_health(environ):
+    return {'status': 'ok'}
+
+
+def handle_metrics(environ):
+    if not metrics.enabled():
+        raise APIError(404, "Metrics are disabled; set METRICS_ENABLED=1")
+    return metrics.render()
+
+
+ROUTES = {
+    '/v1/analyze/image': ('POST', handle_image),
+    '/v1/analyze/text': ('POST', handle_text),
+    '/healthz': ('GET', handle_health),
+    '/metrics': ('GET', handle_metrics),
+}
+
+
+def text_response(start_response, body):
+    data = body.encode('utf-8')
+    start_response(HTTP_STATUS[200], [
+        ('Content-Type', PROMETHEUS_CONTENT_TYPE),
+        ('Content-Length', str(len(data))),
+    ])
+    return [data]
+
+
+def application(environ, start_response):
+    """WSGI entry point."""
+    path = environ.get('PATH_INFO', '')
+    route = ROUTES.get(path)
+    status = 200
+    metrics.API_IN_FLIGHT.inc()
+    try:
+        if route is None:
+            raise APIError(404, "Not found")
+        method, handler = route
+        if environ.get('REQUEST_METHOD') != method:
+            raise APIError(405, f"Use {method}", headers=[('Allow', method)])
+        body = handler(environ)
+        if isinstance(body, str):
+            return text_response(start_response, body)
+        return json_response(start_response, 200, body)
+    except APIError as e:
+        status = e.status
+        return json_response(start_response, e.status, {'error': str(e)}, e.headers)
+    except ServerBusy as e:
+        status = 503
+        return json_response(start_response, 503, {'error': str(e), 'retry_after': e.retry_after},
+                             [('Retry-After', str(e.retry_after))])
+    except Exception:
+        # Left to the server, which answers 500
+        status = 500
+        raise
+    finally:
+        metrics.API_IN_FLIGHT.dec()
+        # Unknown paths share one label so scanners cannot blow up the series count
+        metrics.API_RESPONSES.inc(path if route is not None else "other", str(status))
+
+
+if __name__ == "__main__":
+    from wsgiref.simple_server import make_server
+
+    port = int(os.getenv("PORT", "8000"))
+    print(f"Serving on http://127.0.0.1:{port} (use gunicorn in production)")
+    make_server("", port, application).serve_forever()
@@ -1,16 +1,34 @@
 import os
-import re
-import json
-import numpy as np
-import requests
-from PIL import Image, ImageEnhance
-import pytesseract
+import time
 import streamlit as st
 from dotenv import load_dotenv
 
+from pipeline import (
+    STATUS_IMAGE_TOO_LARGE,
+    STATUS_OCR_FAILED,
+    STATUS_NO_TEXT,
+    STATUS_NO_NUTRIENTS,
+    TESSERACT_LANG,
+    ImageTooLargeError,
+    decode_image,
+    image_hash,
+    warmup,
+)
+from admission import ServerBusy
+from ocr_engine import get_ocr_engine
+from jobs import STAGE_SUMMARY, JobQueueFull, get_job_manager, run_analysis
+from summarizers import DEFAULT_BACKEND
+
 # Load environment variables first
 load_dotenv()
 
+# Seconds between reruns while a background analysis is running
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.3"))
+# Finished analyses kept in each browser session
+SESSION_RESULTS = 8
+# Longest side of the upload preview, in pixels
+PREVIEW_SIZE = 480
+
 # Configure page with custom theme
 st.set_page_config(
     page_title="NutriScan - AI Nutrition Label Analyzer",
@@ -269,312 +287,15 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Constants
-MISTRAL_API_URL = "https://api.mistral.ai/v1/chat/completions"
-MISTRAL_MODEL = "mistral-small-latest"
-
-# Nutrient thresholds (per 100g)
-THRESHOLDS = {
-    'sugars': {'high': 22.5, 'moderate': 5.0},
-    'fat': {'high': 17.5, 'moderate': 3.0},
-    'saturates': {'high': 5.0},
-    'salt': {'high': 1.5}
-}
-
-def preprocess_image(image):
-    """Enhanced image preprocessing for better OCR results."""
-    # Convert to grayscale
-    img = image.convert('L')
-    
-    # Enhance contrast
-    enhancer = ImageEnhance.Contrast(img)
-    img = enhancer.enhance(2.0)
-    
-    # Enhance sharpness
-    enhancer = ImageEnhance.Sharpness(img)
-    img = enhancer.enhance(2.0)
-    
-    # Resize if image is too large
-    max_size = 1800
-    width, height = img.size
-    if max(width, height) > max_size:
-        ratio = max_size / max(width, height)
-        new_size = (int(width * ratio), int(height * ratio))
-        img = img.resize(new_size, Image.Resampling.LANCZOS)
-    
-    return img
-
-def clean_ocr_text(text):
-    """Clean and normalize OCR output."""
-    # Remove junk characters but keep %
-    text = re.sub(r'[^\w\s.,%()-]', '', text)
-    
-    # Join hyphenated words
-    text = re.sub(r'(\w)-\s*\n\s*(\w)', r'\1\2', text)
-    
-    # Normalize spaces and newlines
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'\n\s*\n', '\n', text)
-    
-    return text.strip()
-
-def extract_text(image):
-    """Extract text from image using enhanced OCR."""
-    try:
-        text = pytesseract.image_to_string(image)
-        return text.strip()
-    except Exception as e:
-        st.error(f"OCR Error: {str(e)}")
-        return None
-
-def safe_float_convert(value_str):
-    """Safely convert string to float, handling various formats."""
-    try:
-        clean_str = re.sub(r'[^\d.,]', '', value_str)
-        clean_str = clean_str.replace(',', '.')
-        return float(clean_str)
-    except (ValueError, TypeError):
-        return None
-
-def parse_nutrition_table(text):
-    """Parse nutrition information using regex."""
-    nutrients = {}
-    
-    # Updated patterns to match common formats
-    patterns = {
-        'calories': r'Calories[:\s]*(\d+)',
-        'total_fat': r'Total Fat[:\s]*(\d+\.?\d*)g',
-        'saturated_fat': r'Saturated Fat[:\s]*(\d+\.?\d*)g',
-        'trans_fat': r'Trans Fat[:\s]*(\d+\.?\d*)g',
-        'cholesterol': r'Cholesterol[:\s]*(\d+)mg',
-        'sodium': r'Sodium[:\s]*(\d+)mg',
-        'total_carbohydrate': r'Total Carbohydrate[s]?[:\s]*(\d+\.?\d*)g',
-        'dietary_fiber': r'Dietary Fiber[:\s]*(\d+\.?\d*)g',
-        'total_sugars': r'Total Sugars[:\s]*(\d+\.?\d*)g',
-        'added_sugars': r'Added Sugars[:\s]*(\d+\.?\d*)g',
-        'protein': r'Protein[:\s]*(\d+\.?\d*)g',
-        'vitamin_d': r'Vitamin D[:\s]*(\d+\.?\d*)\s*(?:mcg|µg)',
-        'calcium': r'Calcium[:\s]*(\d+)mg',
-        'iron': r'Iron[:\s]*(\d+\.?\d*)mg',
-        'potassium': r'Potassium[:\s]*(\d+)mg'
-    }
-    
-    # Extract serving information
-    serving_size_match = re.search(r'Serving size[:\s]*([\d/]+)\s*([a-zA-Z]+)\s*\((\d+)g\)', text, re.IGNORECASE)
-    if serving_size_match:
-        nutrients['serving_size'] = {
-            'amount': serving_size_match.group(1),
-            'unit': serving_size_match.group(2),
-            'grams': int(serving_size_match.group(3))
-        }
-    
-    servings_match = re.search(r'(\d+)\s*servings? per container', text, re.IGNORECASE)
-    if servings_match:
-        nutrients['servings_per_container'] = int(servings_match.group(1))
-    
-    # Extract nutrients
-    for nutrient, pattern in patterns.items():
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            value = safe_float_convert(match.group(1))
-            if value is not None:
-                nutrients[nutrient] = {'value': value}
-                
-                # Look for % Daily Value
-                dv_pattern = f"{pattern}.*?(\d+)%"
-                dv_match = re.search(dv_pattern, text, re.IGNORECASE)
-                if dv_match and len(dv_match.groups()) > 1:
-                    nutrients[nutrient]['daily_value_percent'] = safe_float_convert(dv_match.group(2))
-    
-    return nutrients
-
-def compute_health_flags(nutrients):
-    """Compute health flags based on nutrient values."""
-    flags = []
-    
-    if 'total_sugars' in nutrients:
-        value = nutrients['total_sugars']['value']
-        if value >= THRESHOLDS['sugars']['high']:
-            flags.append("⚠️ High in sugar")
-        elif value >= THRESHOLDS['sugars']['moderate']:
-            flags.append("⚠️ Moderate sugar content")
-    
-    if 'total_fat' in nutrients:
-        value = nutrients['total_fat']['value']
-        if value >= THRESHOLDS['fat']['high']:
-            flags.append("⚠️ High in fat")
-        elif value >= THRESHOLDS['fat']['moderate']:
-            flags.append("⚠️ Moderate fat content")
-    
-    if 'saturated_fat' in nutrients:
-        if nutrients['saturated_fat']['value'] >= THRESHOLDS['saturates']['high']:
-            flags.append("⚠️ High in saturated fat")
-    
-    if 'sodium' in nutrients:
-        sodium_g = nutrients['sodium']['value'] / 1000  # Convert mg to g
-        if sodium_g >= THRESHOLDS['salt']['high']:
-            flags.append("⚠️ High in sodium")
-    
-    # Add protein assessment
-    if 'protein' in nutrients:
-        if nutrients['protein']['value'] < 5:
-            flags.append("ℹ️ Low in protein")
+def report_summary_error(e):
+    """Show a SummaryError and any API response details in the UI."""
+    st.error(str(e))
+    if e.details is not None:
+        st.error("Response content:")
+        if isinstance(e.details, (dict, list)):
+            st.json(e.details)
         else:
-            flags.append("✅ Good source of protein")
-    
-    # Add vitamin and mineral assessments
-    if 'calcium' in nutrients and nutrients['calcium'].get('daily_value_percent', 0) >= 20:
-        flags.append("✅ Good source of calcium")
-    
-    if 'iron' in nutrients and nutrients['iron'].get('daily_value_percent', 0) >= 20:
-        flags.append("✅ Good source of iron")
-    
-    return flags
-
-def build_mistral_prompt(nutrients, flags):
-    """Build a structured prompt for Mistral AI."""
-    system_message = """You are a nutrition expert assistant who explains nutrition facts in a clear, friendly way. Your task is to:
-
-1. ALWAYS start with the serving size in grams
-2. Explain % Daily Values in simple terms (e.g., "20% of your daily needs")
-3. Provide 2-4 clear bullet points covering:
-   - Calories and main macronutrients (carbs, fat, protein)
-   - Sugar and sodium levels
-   - Important vitamins and minerals
-   - Any health flags (high/low nutrients)
-4. End with one practical, actionable tip for consumers
-
-Keep your tone friendly but cautious, and make the information easy to scan and understand.
-Avoid technical jargon - write as if explaining to a friend."""
-    
-    # Create a structured nutrition facts summary
-    nutrition_summary = "Nutrition Facts Summary:\n\n"
-    
-    # Always put serving size first if available
-    if 'serving_size' in nutrients:
-        nutrition_summary += f"Serving Size: {nutrients['serving_size']['amount']} {nutrients['serving_size']['unit']} ({nutrients['serving_size']['grams']}g)\n"
-    if 'servings_per_container' in nutrients:
-        nutrition_summary += f"Servings per Container: {nutrients['servings_per_container']}\n"
-    
-    # Group nutrients by category for better organization
-    categories = {
-        'Main Nutrients': ['calories', 'total_fat', 'saturated_fat', 'trans_fat', 'total_carbohydrate', 'protein'],
-        'Sugars and Fiber': ['total_sugars', 'added_sugars', 'dietary_fiber'],
-        'Minerals': ['sodium', 'potassium', 'calcium', 'iron'],
-        'Vitamins': ['vitamin_d']
-    }
-    
-    for category, nutrient_list in categories.items():
-        relevant_nutrients = [n for n in nutrient_list if n in nutrients]
-        if relevant_nutrients:
-            nutrition_summary += f"\n{category}:\n"
-            for nutrient in relevant_nutrients:
-                data = nutrients[nutrient]
-                if isinstance(data, dict) and 'value' in data:
-                    nutrition_summary += f"- {nutrient.replace('_', ' ').title()}: {data['value']}"
-                    if 'daily_value_percent' in data:
-                        nutrition_summary += f" ({data['daily_value_percent']}% Daily Value)"
-                    nutrition_summary += "\n"
-    
-    if flags:
-        nutrition_summary += "\nHealth Considerations:\n"
-        for flag in flags:
-            nutrition_summary += f"- {flag}\n"
-    
-    user_message = f"""Please analyze these nutrition facts and create a consumer-friendly summary:
-
-{nutrition_summary}
-
-Requirements for your response:
-1. Start by clearly stating the serving size in grams
-2. When mentioning Daily Values, explain them in simple terms (e.g., "provides 20% of what you need in a day")
-3. Provide 2-4 bullet points covering the key nutrients and health considerations
-4. End with one practical tip for healthy consumption
-
-Make your summary easy to read and understand, highlighting the most important information first."""
-    
-    return system_message, user_message
-
-def get_mistral_summary(system_message, user_message, api_key):
-    """Get summary from Mistral AI API."""
-    if not api_key:
-        st.error("Please enter your Mistral AI API key in the sidebar")
-        return None
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    try:
-        # Clean and encode messages to handle special characters
-        def clean_text(text):
-            # Remove or replace problematic characters
-            text = text.encode('ascii', 'ignore').decode('ascii')
-            # Normalize whitespace
-            text = ' '.join(text.split())
-            return text
-        
-        clean_system_message = clean_text(system_message)
-        clean_user_message = clean_text(user_message)
-        
-        # Prepare the API request
-        payload = {
-            "model": MISTRAL_MODEL,
-            "messages": [
-                {"role": "system", "content": clean_system_message},
-                {"role": "user", "content": clean_user_message}
-            ],
-            "temperature": 0.3,
-            "max_tokens": 300
-        }
-        
-        # Make the API call
-        response = requests.post(
-            MISTRAL_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        # Handle response status
-        if response.status_code == 401:
-            st.error("Invalid API key. Please check your Mistral AI API key in the sidebar.")
-            return None
-        elif response.status_code != 200:
-            st.error(f"API Error: Status code {response.status_code}")
-            st.error("Response content:")
-            try:
-                st.json(response.json())
-            except:
-                st.error(response.text)
-            return None
-        
-        # Parse the response
-        try:
-            result = response.json()
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"]
-            else:
-                st.error("Unexpected API response format")
-                st.json(result)
-                return None
-        except Exception as e:
-            st.error(f"Error parsing API response: {str(e)}")
-            st.error(f"Raw response: {response.text}")
-            return None
-            
-    except requests.exceptions.Timeout:
-        st.error("Request timed out. Please try again.")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Network error: {str(e)}")
-        return None
-    except Exception as e:
-        st.error(f"Error generating summary: {str(e)}")
-        if 'response' in locals():
-            st.error(f"Response content: {response.text}")
-        return None
+            st.error(e.details)
 
 def render_header():
     """Render the app header with branding."""
@@ -643,8 +364,8 @@ def render_health_flags(flags):
         """, unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
-def render_summary_section(nutrients, flags, summary):
-    """Render the nutrition summary section."""
+def render_summary_section(nutrients, flags, summary, streaming=False):
+    """Render the nutrition summary section; while streaming, summary is the text received so far."""
     st.markdown("""
     <div class="summary-section">
         <h2 class="summary-header">📊 Nutrition Analysis</h2>
@@ -669,7 +390,10 @@ def render_summary_section(nutrients, flags, summary):
     
     # Display AI summary
     st.markdown("<h3>💡 Key Insights</h3>", unsafe_allow_html=True)
-    st.write(summary)
+    if streaming:
+        st.markdown(summary + "▌")
+    else:
+        st.write(summary)
     
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -685,10 +409,97 @@ def render_footer():
     </div>
     """, unsafe_allow_html=True)
 
+def render_job_progress(job):
+    """Show the progress of a running analysis, including the summary streamed so far."""
+    result = job.partial_result()
+    if job.stage == STAGE_SUMMARY and result is not None:
+        text = job.partial_text()
+        if text:
+            render_summary_section(result['nutrients'], result['flags'], text, streaming=True)
+        else:
+            st.info("✨ Generating insights...")
+    else:
+        st.info("🔍 Processing your nutrition label...")
+
+def render_analysis_result(result):
+    """Render a finished analysis."""
+    if result['status'] == STATUS_IMAGE_TOO_LARGE:
+        st.error(f"📏 {result['error']} Please upload a smaller photo.")
+    elif result['status'] == STATUS_OCR_FAILED:
+        st.error(result['error'])
+        st.error("📸 Image quality too low. Please try uploading a well-lit, clear photo.")
+    elif result['status'] == STATUS_NO_TEXT:
+        st.error("📸 Image quality too low. Please try uploading a well-lit, clear photo.")
+    elif result['status'] == STATUS_NO_NUTRIENTS:
+        st.error("😕 Couldn't read the nutrition information. Please try uploading a clearer photo.")
+    elif result['summary']:
+        # Show thank you message
+        st.markdown("""
+        <div class="success-message" style="text-align: center;">
+            <h3 style="margin: 0;">✨ Analysis Complete!</h3>
+            <p style="margin: 0.5rem 0 0 0;">
+                Here's your personalized nutrition summary.
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Render summary section
+        render_summary_section(result['nutrients'], result['flags'], result['summary'])
+        if result.get('summary_backend') == "local":
+            st.caption("Summary generated instantly from the label data.")
+        if result['summary_error'] is not None:
+            report_summary_error(result['summary_error'])
+    else:
+        if result['summary_error'] is not None:
+            report_summary_error(result['summary_error'])
+        st.error("Unable to generate summary. Please check your API key and try again.")
+
+@st.cache_resource(show_spinner=False)
+def check_tesseract():
+    """Return True when an OCR engine is available; checked once per process, not per rerun."""
+    try:
+        engine = get_ocr_engine(lang=TESSERACT_LANG)
+        if engine.name == "pytesseract":
+            import pytesseract
+            pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+@st.cache_resource(show_spinner=False)
+def warm_up():
+    """Pre-initialize OCR and deferred imports once per server process, not per rerun."""
+    return warmup()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_preview(file_hash, _image_bytes):
+    """Decode a small preview of an upload once; keyed by file hash so the bytes are not rehashed on every rerun."""
+    image = decode_image(_image_bytes, max_size=PREVIEW_SIZE)
+    image.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+    return image
+
+def get_upload_hash(uploaded_file):
+    """Return the content hash of an upload, computed once per uploaded file."""
+    cached = st.session_state.get('upload_hash')
+    if cached is not None and cached[0] == uploaded_file.file_id:
+        return cached[1]
+    key = image_hash(uploaded_file.getvalue())
+    st.session_state['upload_hash'] = (uploaded_file.file_id, key)
+    return key
+
+def remember_result(key, result):
+    """Keep a finished result in session state so reruns show it without re-analysing."""
+    results = st.session_state.setdefault('results', {})
+    results.pop(key, None)
+    results[key] = result
+    while len(results) > SESSION_RESULTS:
+        results.pop(next(iter(results)))
+
 def main():
     # Get API key from environment variables
     api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key:
+    backend = os.getenv("SUMMARIZER_BACKEND", DEFAULT_BACKEND).lower()
+    if not api_key and backend == "mistral":
         st.error("⚠️ Mistral AI API key not found. Please set the MISTRAL_API_KEY environment variable.")
         st.stop()
     
@@ -702,49 +513,46 @@ def main():
     uploaded_file = render_upload_section()
     
     if uploaded_file is not None:
-        # Process uploaded image
-        image = Image.open(uploaded_file)
-        render_success_upload(image)
+        # Process uploaded image (hashed and decoded once per upload, not per rerun)
+        image_bytes = uploaded_file.getvalue()
+        key = get_upload_hash(uploaded_file)
+        try:
+            preview = load_preview(key, image_bytes)
+        except ImageTooLargeError as e:
+            st.error(f"📏 {e} Please upload a smaller photo.")
+            st.stop()
+        render_success_upload(preview)
+        result = st.session_state.get('results', {}).get(key)
         
-        # Analyze button
+        # Analyze button: the analysis runs in the background job pool, deduplicated by image hash
         if st.button("🔍 Analyze Nutrition Label", key="analyze_btn"):
-            with st.spinner("Processing your nutrition label..."):
-                # Process image (OCR)
-                processed_image = preprocess_image(image)
-                raw_text = extract_text(processed_image)
-                
-                if raw_text:
-                    cleaned_text = clean_ocr_text(raw_text)
-                    nutrients = parse_nutrition_table(cleaned_text)
-                    
-                    if nutrients:
-                        # Compute health flags
-                        flags = compute_health_flags(nutrients)
-                        
-                        # Generate AI summary
-                        with st.spinner("Generating insights..."):
-                            system_msg, user_msg = build_mistral_prompt(nutrients, flags)
-                            summary = get_mistral_summary(system_msg, user_msg, api_key)
-                            
-                            if summary:
-                                # Show thank you message
-                                st.markdown("""
-                                <div class="success-message" style="text-align: center;">
-                                    <h3 style="margin: 0;">✨ Analysis Complete!</h3>
-                                    <p style="margin: 0.5rem 0 0 0;">
-                                        Here's your personalized nutrition summary.
-                                    </p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                                
-                                # Render summary section
-                                render_summary_section(nutrients, flags, summary)
-                            else:
-                                st.error("Unable to generate summary. Please check your API key and try again.")
-                    else:
-                        st.error("😕 Couldn't read the nutrition information. Please try uploading a clearer photo.")
-                else:
-                    st.error("📸 Image quality too low. Please try uploading a well-lit, clear photo.")
+            if result is None or result.get('summary_error') is not None:
+                try:
+                    st.session_state['analysis_job'] = get_job_manager().submit(
+                        key, run_analysis, image_bytes, api_key, backend
+                    )
+                    result = None
+                except JobQueueFull:
+                    st.warning("⏳ NutriScan is busy right now. Please try again in a few seconds.")
+        
+        job = st.session_state.get('analysis_job')
+        if job is not None and job.key == key:
+            if job.done():
+                del st.session_state['analysis_job']
+                try:
+                    result = job.result()
+                    remember_result(key, result)
+                except ServerBusy as e:
+                    st.warning(f"⏳ NutriScan is busy right now. Please try again in {e.retry_after} s.")
+                except Exception as e:
+                    st.error(f"⚠️ Analysis failed: {e}")
+            else:
+                render_job_progress(job)
+                time.sleep(JOB_POLL_INTERVAL)
+                st.rerun()
+        
+        if result is not None:
+            render_analysis_result(result)
     
     # Footer
     render_footer()
@@ -752,11 +560,10 @@ def main():
 if __name__ == "__main__":
     try:
         # Check if Tesseract is installed
-        try:
-            pytesseract.get_tesseract_version()
-        except Exception as e:
+        if not check_tesseract():
             st.error("⚠️ Tesseract OCR is not installed. Please check the README for installation instructions.")
             st.stop()
+        warm_up()
         
         # Run main application
         main()
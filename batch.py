@@ -0,0 +1,203 @@
+"""Headless batch runner for the NutriScan label pipeline.
+
+Runs every image in a directory through the pipeline on a process pool and
+streams one JSON object per image (NDJSON) to stdout or a file:
+
+    python batch.py photos/ --output results.ndjson
+    python batch.py photos/ --summary --workers 4
+    python batch.py photos/ --summary --summarizer local
+    python batch.py photos/ --store results.sqlite3
+    python batch.py photos/ --summary --summary-batch
+
+Per-image progress and aggregate throughput are reported on stderr.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from pipeline import STATUS_OK, STATUS_SUMMARY_FAILED, analyze_image, warmup
+from batch_summaries import get_batch_summarizer
+from results_store import ResultsStore
+from summarizers import DEFAULT_BACKEND
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def find_images(directory, recursive=False):
+    """Return sorted paths of supported images in a directory."""
+    paths = []
+    if recursive:
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in files)
+    else:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    return sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p))
+
+
+def init_worker():
+    """Give each worker process a single OCR engine, initialized before its first image."""
+    os.environ.setdefault("OCR_POOL_SIZE", "1")
+    warmup()
+
+
+def process_image(path, api_key=None, summarize=False, summarizer=None):
+    """Run the pipeline on one image file (executed inside a worker process)."""
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+        result = analyze_image(image_bytes, api_key=api_key, summarize=summarize, summarizer=summarizer)
+    except Exception as e:
+        result = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+    result['path'] = path
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+def summarize_results(results, summary_batch, summary_stats):
+    """Fill in the summaries of OK results with one BatchSummarizer pass, in the main process."""
+    start = time.perf_counter()
+    summaries = summary_batch.summarize_many(
+        [(result['nutrients'], result['flags']) for result in results], summary_stats
+    )
+    # The batch's wall time is shared out evenly between its products
+    share = (time.perf_counter() - start) / len(results)
+    for result, (summary, backend, error) in zip(results, summaries):
+        result['timings']['summary'] = share
+        result['elapsed'] += share
+        if error is not None:
+            result['status'] = STATUS_SUMMARY_FAILED
+            result['error'] = str(error)
+        else:
+            result['summary'] = summary
+            result['summary_backend'] = backend
+
+
+def run_batch(paths, output, workers=None, api_key=None, summarize=False, summarizer=None, log=sys.stderr,
+              store=None, summary_batch=None):
+    """Fan images out across a process pool and stream NDJSON results as they finish.
+
+    Results are also added to store (a ResultsStore) when one is given. With
+    summary_batch (a BatchSummarizer), workers skip the summary and OK results are
+    summarized several per API request, max_products at a time.
+    """
+    workers = workers or os.cpu_count() or 1
+    statuses = {}
+    busy_time = 0.0
+    done = 0
+    start = time.perf_counter()
+    summary_stats = {}
+    waiting = []
+
+    def emit(results):
+        nonlocal busy_time, done
+        for result in results:
+            done += 1
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            if store is not None:
+                store.add(result)
+
+            statuses[result['status']] = statuses.get(result['status'], 0) + 1
+            busy_time += result['elapsed']
+            print(f"[{done}/{len(paths)}] {result['path']}: {result['status']} in {result['elapsed']:.2f}s",
+                  file=log)
+
+    worker_summarize = summarize and summary_batch is None
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [executor.submit(process_image, path, api_key, worker_summarize, summarizer) for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            if summary_batch is None or not summarize or result['status'] != STATUS_OK:
+                emit([result])
+                continue
+            waiting.append(result)
+            if len(waiting) >= summary_batch.max_products:
+                summarize_results(waiting, summary_batch, summary_stats)
+                emit(waiting)
+                waiting = []
+    if waiting:
+        summarize_results(waiting, summary_batch, summary_stats)
+        emit(waiting)
+
+    wall_time = time.perf_counter() - start
+    stats = {
+        'images': len(paths),
+        'workers': workers,
+        'wall_seconds': wall_time,
+        'images_per_second': len(paths) / wall_time if wall_time > 0 else 0.0,
+        'mean_seconds_per_image': busy_time / len(paths) if paths else 0.0,
+        'statuses': statuses,
+    }
+    if summary_stats:
+        stats['summary_batches'] = summary_stats
+    print(
+        f"Processed {stats['images']} images in {wall_time:.2f}s with {workers} workers "
+        f"({stats['images_per_second']:.2f} images/s, {stats['mean_seconds_per_image']:.2f}s mean per image)",
+        file=log,
+    )
+    print(f"Statuses: {json.dumps(statuses, sort_keys=True)}", file=log)
+    if summary_stats:
+        print(f"Summaries: {summary_stats['products']} products in {summary_stats['api_calls']} API calls "
+              f"({summary_stats['batches']} batches, {summary_stats['retried']} retried alone, "
+              f"{summary_stats['cached']} cached)", file=log)
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the NutriScan label pipeline over a directory of images.")
+    parser.add_argument("directory", help="Directory containing nutrition label photos")
+    parser.add_argument("-o", "--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Worker processes (default: number of CPU cores)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Include images in subdirectories")
+    parser.add_argument("--summary", action="store_true",
+                        help="Also generate a summary")
+    parser.add_argument("--summarizer", choices=("auto", "mistral", "local"), default=None,
+                        help="Summary backend (default: SUMMARIZER_BACKEND or auto); mistral requires MISTRAL_API_KEY")
+    parser.add_argument("--summary-batch", action="store_true",
+                        help="Summarize several products per API request (needs MISTRAL_API_KEY); "
+                             "products retried alone use --summarizer")
+    parser.add_argument("--store", default=os.getenv("RESULTS_DB_PATH"),
+                        help="Also save results to this SQLite results database (default: RESULTS_DB_PATH)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+
+    paths = find_images(args.directory, recursive=args.recursive)
+    if not paths:
+        print(f"No images found in {args.directory}", file=sys.stderr)
+        return 1
+
+    api_key = os.getenv("MISTRAL_API_KEY")
+    backend = args.summarizer or os.getenv("SUMMARIZER_BACKEND", DEFAULT_BACKEND)
+    if args.summary and (backend == "mistral" or args.summary_batch) and not api_key:
+        print("MISTRAL_API_KEY is required for the mistral summarizer", file=sys.stderr)
+        return 1
+    summary_batch = get_batch_summarizer(api_key, backend) if args.summary and args.summary_batch else None
+
+    store = ResultsStore(args.store) if args.store else None
+    try:
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                run_batch(paths, output, args.workers, api_key, args.summary, backend, store=store,
+                          summary_batch=summary_batch)
+        else:
+            run_batch(paths, sys.stdout, args.workers, api_key, args.summary, backend, store=store,
+                      summary_batch=summary_batch)
+    finally:
+        if store is not None:
+            store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
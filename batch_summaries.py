@@ -0,0 +1,179 @@
+"""Several products per summary API request, for bulk ingest.
+
+One-at-a-time summaries pay the request overhead and the shared system
+message once per product. BatchSummarizer packs several products' prompts
+(from build_mistral_prompt) into one completion request: each product's user
+message becomes a section headed by an ID tag ("### P1"), and the model is
+asked to answer every section under the same tag. The reply is split on those
+tags; a product whose section is missing, duplicated or too short is retried
+on its own with the regular summarizer.
+
+Batches are packed greedily under BATCH_TOKEN_BUDGET estimated input tokens and
+at most BATCH_MAX_PRODUCTS products (each reserving MISTRAL_MAX_TOKENS of
+output). The product limit adapts: it halves after a batch with bad sections
+and grows by one after a clean batch.
+
+Sections are also stored in the summary cache under each product's own prompt,
+so a later single request for the same product is a cache hit.
+"""
+import os
+import re
+import time
+
+import pipeline
+from pipeline import SummaryError, build_mistral_prompt, estimate_tokens, prompt_cache_key, request_mistral_summary
+from summarizers import get_summarizer
+from summary_cache import get_summary_cache
+
+# Defaults (overridable through environment variables)
+DEFAULT_TOKEN_BUDGET = 2000
+DEFAULT_MAX_PRODUCTS = 8
+
+SECTION_TAG = "### "
+MIN_SECTION_CHARS = 40
+BATCH_INSTRUCTIONS = """
+The user message holds several labels, each in a section that starts with a line like "### P1".
+Write one reply per section, in the same order, each starting with its own "### <id>" line exactly as given.
+Do not merge, skip or add sections; nothing goes before the first "###" line."""
+
+_SECTION_RE = re.compile(r"^###\s*(P\d+)\s*$", re.MULTILINE)
+
+
+def split_sections(text, ids):
+    """Split a batch reply into {id: section text}, keeping only well-formed sections for known ids."""
+    headers = list(_SECTION_RE.finditer(text))
+    sections, seen = {}, set()
+    for i, match in enumerate(headers):
+        product_id = match.group(1)
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        body = text[match.end():end].strip()
+        if product_id in seen:
+            # The same id twice: neither copy can be trusted
+            sections.pop(product_id, None)
+            continue
+        seen.add(product_id)
+        if product_id in ids and len(body) >= MIN_SECTION_CHARS:
+            sections[product_id] = body
+    return sections
+
+
+class BatchSummarizer:
+    """Summarizes many products with as few API requests as the token budget allows."""
+
+    name = "mistral-batch"
+
+    def __init__(self, api_key, token_budget=DEFAULT_TOKEN_BUDGET, max_products=DEFAULT_MAX_PRODUCTS,
+                 fallback=None):
+        self.api_key = api_key
+        self.token_budget = token_budget
+        self.max_products = max_products
+        self.batch_limit = max_products
+        # Products retried on their own go through the regular backend
+        self.fallback = fallback if fallback is not None else get_summarizer("mistral", api_key)
+
+    def plan_batches(self, prompts):
+        """Group (index, system, user) prompts into batches under the token and product limits.
+
+        A generator: the product limit is read at every batch, so it can change between batches.
+        """
+        current, tokens = [], 0
+        for prompt in prompts:
+            section_tokens = estimate_tokens(prompt[2]) + 4  # plus the "### Pn" header line
+            full = len(current) >= self.batch_limit or tokens + section_tokens > self.token_budget
+            # Products share one system message per request
+            if current and (full or prompt[1] != current[0][1]):
+                yield current
+                current, tokens = [], 0
+            if not current:
+                tokens = estimate_tokens(prompt[1] + BATCH_INSTRUCTIONS)
+            current.append(prompt)
+            tokens += section_tokens
+        if current:
+            yield current
+
+    def summarize_many(self, products, stats=None):
+        """Summarize [(nutrients, flags)] and return one (summary, backend, error) per product, in order.
+
+        stats receives products, api_calls, batches, retried, cached and seconds.
+        """
+        stats = {} if stats is None else stats
+        for key in ('products', 'api_calls', 'batches', 'retried', 'cached'):
+            stats.setdefault(key, 0)
+        start = time.perf_counter()
+        cache = get_summary_cache()
+        results = [None] * len(products)
+        pending = []
+        for index, (nutrients, flags) in enumerate(products):
+            system_message, user_message = build_mistral_prompt(nutrients, flags)
+            cached = cache.get(prompt_cache_key(system_message, user_message))
+            if cached is not None:
+                results[index] = (cached, self.name, None)
+                stats['cached'] += 1
+            else:
+                pending.append((index, system_message, user_message))
+
+        singles, retry = [], []
+        for batch in self.plan_batches(pending):
+            if len(batch) == 1:
+                singles.extend(batch)
+                continue
+            missing = self._run_batch(batch, results, stats)
+            retry.extend(missing)
+            # Shrink after a batch with bad sections, creep back up after a clean one
+            if missing:
+                self.batch_limit = max(2, self.batch_limit // 2)
+            else:
+                self.batch_limit = min(self.max_products, self.batch_limit + 1)
+
+        for index, _, _ in singles + retry:
+            nutrients, flags = products[index]
+            stats['api_calls'] += 1
+            product_stats = {}
+            try:
+                summary = self.fallback.summarize(nutrients, flags, product_stats)
+                results[index] = (summary, product_stats.get('backend', self.fallback.name), None)
+            except SummaryError as e:
+                results[index] = (None, None, e)
+        stats['products'] += len(products)
+        stats['retried'] += len(retry)
+        stats['seconds'] = stats.get('seconds', 0.0) + time.perf_counter() - start
+        return results
+
+    def _run_batch(self, batch, results, stats):
+        """Request one batch; fill results for good sections and return the prompts still missing."""
+        ids = {f"P{n}": prompt for n, prompt in enumerate(batch, 1)}
+        system_message = batch[0][1] + "\n" + BATCH_INSTRUCTIONS
+        user_message = "\n\n".join(f"{SECTION_TAG}{product_id}\n{prompt[2]}" for product_id, prompt in ids.items())
+        stats['api_calls'] += 1
+        stats['batches'] += 1
+        try:
+            reply = request_mistral_summary(system_message, user_message, self.api_key,
+                                            max_tokens=pipeline.MISTRAL_MAX_TOKENS * len(batch))
+        except SummaryError as e:
+            if e.status_code == 401 or e.retry_after is not None:
+                # A rejected key or a busy service fails the same way for every product
+                for index, _, _ in batch:
+                    results[index] = (None, None, e)
+                return []
+            return batch
+        sections = split_sections(reply, ids)
+        cache = get_summary_cache()
+        missing = []
+        for product_id, (index, product_system, product_user) in ids.items():
+            section = sections.get(product_id)
+            if section is None:
+                missing.append((index, product_system, product_user))
+                continue
+            results[index] = (section, self.name, None)
+            cache.set(prompt_cache_key(product_system, product_user), section)
+        return missing
+
+
+def get_batch_summarizer(api_key, fallback_backend="mistral"):
+    """Return a BatchSummarizer configured from the environment; retries use fallback_backend."""
+    return BatchSummarizer(
+        api_key,
+        token_budget=int(os.getenv("BATCH_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)),
+        max_products=int(os.getenv("BATCH_MAX_PRODUCTS", DEFAULT_MAX_PRODUCTS)),
+        fallback=get_summarizer(fallback_backend, api_key),
+    )
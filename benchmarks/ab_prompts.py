@@ -0,0 +1,122 @@
+"""A/B comparison of the verbose and compact summary prompts against a local API stub.
+
+    python -m benchmarks.ab_prompts --labels 30
+
+Labels come from the synthetic OCR corpus used by bench_parser. Each label is
+summarized with both prompt styles, interleaved, through MistralSummarizer and
+the real HTTP client, against a local server that speaks the Mistral streaming
+protocol. The stub charges a fixed overhead plus --prefill-ms per estimated
+input token before the first chunk, then streams the same --output-tokens
+reply for both styles, so latency differences come from prompt size alone.
+Token counts use pipeline.estimate_tokens; payload bytes are what was sent.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pipeline
+import http_client
+from http_client import HTTPClient
+from summarizers import MistralSummarizer
+from summary_cache import get_summary_cache
+from benchmarks.bench_parser import generate_text
+from benchmarks.common import format_row, percentile, summarize_latencies
+
+STYLES = ("verbose", "compact")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Streams a fixed reply after a delay that grows with the prompt's token count."""
+
+    base_seconds = 0.1
+    prefill_seconds = 0.0003
+    output_tokens = 40
+    token_seconds = 0.005
+    payload_bytes = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        StubHandler.payload_bytes.append(len(body))
+        payload = json.loads(body)
+        tokens = sum(pipeline.estimate_tokens(message['content']) for message in payload['messages'])
+        time.sleep(self.base_seconds + tokens * self.prefill_seconds)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for _ in range(self.output_tokens):
+            event = {'choices': [{'index': 0, 'delta': {'content': "word "}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(self.token_seconds)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labels", type=int, default=30)
+    parser.add_argument("--base-ms", type=float, default=100.0, help="Fixed stub overhead per request")
+    parser.add_argument("--prefill-ms", type=float, default=0.3, help="Stub delay per input token")
+    parser.add_argument("--output-tokens", type=int, default=40)
+    parser.add_argument("--budget", type=int, default=pipeline.PROMPT_TOKEN_BUDGET,
+                        help="PROMPT_TOKEN_BUDGET for the compact style")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    StubHandler.base_seconds = args.base_ms / 1000
+    StubHandler.prefill_seconds = args.prefill_ms / 1000
+    StubHandler.output_tokens = args.output_tokens
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = HTTPClient(max_retries=0)
+    pipeline.MISTRAL_API_URL = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    http_client.get_http_client = lambda: client
+    pipeline.PROMPT_TOKEN_BUDGET = args.budget
+
+    rng = random.Random(args.seed)
+    labels = []
+    for _ in range(args.labels):
+        nutrients = pipeline.parse_nutrition_table(generate_text(rng))
+        labels.append((nutrients, pipeline.compute_health_flags(nutrients)))
+
+    summarizer = MistralSummarizer("stub-key")
+    results = {style: {'tokens': [], 'bytes': [], 'latency': [], 'dropped': 0} for style in STYLES}
+    cache = get_summary_cache()
+    try:
+        for nutrients, flags in labels:
+            for style in STYLES:
+                pipeline.PROMPT_STYLE = style
+                cache.clear()
+                stats = {}
+                start = time.perf_counter()
+                summarizer.summarize(nutrients, flags, stats)
+                results[style]['latency'].append(time.perf_counter() - start)
+                results[style]['tokens'].append(stats['prompt_tokens'])
+                results[style]['bytes'].append(StubHandler.payload_bytes[-1])
+                results[style]['dropped'] += bool(stats.get('prompt_dropped'))
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+    print(f"{args.labels} labels, stub: {args.base_ms:g}ms + {args.prefill_ms:g}ms/input token, "
+          f"{args.output_tokens} output tokens; compact budget {args.budget} tokens")
+    print(f"{'prompt':<10}{'tokens mean':>12}{'p95':>6}{'max':>6}{'payload B':>11}{'trimmed':>9}")
+    for style in STYLES:
+        tokens = results[style]['tokens']
+        print(f"{style:<10}{sum(tokens) / len(tokens):>12.0f}{percentile(tokens, 95):>6.0f}{max(tokens):>6}"
+              f"{sum(results[style]['bytes']) / len(tokens):>11.0f}{results[style]['dropped']:>9}")
+    print()
+    for style in STYLES:
+        print(format_row(f"end-to-end {style}", summarize_latencies(results[style]['latency'])))
+    verbose, compact = (sum(results[style]['tokens']) for style in STYLES)
+    print(f"\ncompact sends {1 - compact / verbose:.0%} fewer input tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Latency of a burst of OCR-sized jobs with and without the admission gate.
+
+    python -m benchmarks.bench_admission --clients 16 --work-ms 300
+
+--clients threads arrive at once, each running one CPU-bound job in a child
+process (a stand-in for a tesseract call that takes --work-ms on an idle
+core). "unlimited" lets every job start immediately; "gated" puts them
+through an admission.Gate with --limit slots (default: CPU count), a
+--queue-deep wait queue and --max-wait seconds. Reported: latency of the jobs
+that completed, how fast rejected jobs heard "busy", and the wall time of
+the burst.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+
+from admission import Gate, ServerBusy
+from benchmarks.common import format_row, summarize_latencies
+
+BURN = "import sys, time\nend = time.process_time() + float(sys.argv[1])\nwhile time.process_time() < end: pass\n"
+
+
+def ocr_job(seconds):
+    subprocess.run([sys.executable, "-c", BURN, str(seconds)], check=True)
+
+
+def burst(clients, seconds, gate=None):
+    """Start all clients together; return (completed latencies, rejected latencies, wall seconds)."""
+    completed, rejected = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+
+    def client():
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            if gate is None:
+                ocr_job(seconds)
+            else:
+                with gate.slot():
+                    ocr_job(seconds)
+            outcome = completed
+        except ServerBusy:
+            outcome = rejected
+        with lock:
+            outcome.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return completed, rejected, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--work-ms", type=float, default=300.0, help="CPU time of one job")
+    parser.add_argument("--limit", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queue", type=int, default=None, help="Wait queue size (default: 2 x limit)")
+    parser.add_argument("--max-wait", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    seconds = args.work_ms / 1000
+    queue = 2 * args.limit if args.queue is None else args.queue
+    print(f"{args.clients} simultaneous jobs of {args.work_ms:g}ms CPU on {os.cpu_count()} cores; "
+          f"gate: {args.limit} slots, queue {queue}, max wait {args.max_wait:g}s")
+    for name, gate in (("unlimited", None),
+                       ("gated", Gate("ocr", args.limit, queue, args.max_wait, service_seconds=seconds))):
+        completed, rejected, wall = burst(args.clients, seconds, gate)
+        print(f"\n{name}: {len(completed)} completed, {len(rejected)} rejected, burst wall time {wall:.2f}s")
+        print(format_row("completed", summarize_latencies(completed)))
+        if rejected:
+            print(format_row("rejected (busy)", summarize_latencies(rejected)))
+
+
+if __name__ == "__main__":
+    main()
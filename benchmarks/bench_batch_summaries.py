@@ -0,0 +1,143 @@
+"""Products/s and API calls of batched vs one-at-a-time summaries against a local API stub.
+
+    python -m benchmarks.bench_batch_summaries --labels 64 --malformed 0.1
+
+Labels come from the synthetic OCR corpus used by bench_parser. The stub
+charges a fixed overhead per request plus --prefill-ms per estimated input
+token and --output-ms per output token, then answers every "### Pn" section
+of a batch (or the single prompt). With --malformed, that fraction of batch
+sections is left out of the reply, so those products are retried alone.
+Both modes go through the real HTTP client; the summary cache is cleared
+before each run.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pipeline
+import http_client
+from http_client import HTTPClient
+from batch_summaries import BatchSummarizer
+from summarizers import MistralSummarizer
+from summary_cache import get_summary_cache
+from benchmarks.bench_parser import generate_text
+
+REPLY = "Moderate calories with some sodium; fine as part of a balanced breakfast. " * 2
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Replies after a delay that grows with input and output tokens; may drop batch sections."""
+
+    base_seconds = 0.1
+    prefill_seconds = 0.0003
+    output_seconds = 0.005
+    malformed = 0.0
+    rng = random.Random(0)
+    requests = 0
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        StubHandler.requests += 1
+        user_message = payload['messages'][1]['content']
+        ids = re.findall(r"^### (P\d+)$", user_message, re.MULTILINE)
+        if ids:
+            content = "\n\n".join(f"### {product_id}\n{REPLY}" for product_id in ids
+                                  if self.rng.random() >= self.malformed)
+        else:
+            content = REPLY
+        tokens = sum(pipeline.estimate_tokens(message['content']) for message in payload['messages'])
+        time.sleep(self.base_seconds + tokens * self.prefill_seconds
+                   + pipeline.estimate_tokens(content) * self.output_seconds)
+        if payload.get('stream'):
+            # Single products through MistralSummarizer stream; one event carries the reply
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            event = {'choices': [{'index': 0, 'delta': {'content': content}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+            return
+        data = json.dumps({'choices': [{'message': {'content': content}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def one_at_a_time(labels):
+    summarizer = MistralSummarizer("stub-key")
+    for nutrients, flags in labels:
+        summarizer.summarize(nutrients, flags)
+    return {'api_calls': len(labels), 'retried': 0}
+
+
+def batched(labels, token_budget, max_products):
+    stats = {}
+    BatchSummarizer("stub-key", token_budget, max_products,
+                    fallback=MistralSummarizer("stub-key")).summarize_many(labels, stats)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labels", type=int, default=64)
+    parser.add_argument("--base-ms", type=float, default=300.0, help="Fixed stub overhead per request")
+    parser.add_argument("--prefill-ms", type=float, default=0.3, help="Stub delay per input token")
+    parser.add_argument("--output-ms", type=float, default=5.0, help="Stub delay per output token")
+    parser.add_argument("--malformed", type=float, default=0.0, help="Fraction of batch sections left out")
+    parser.add_argument("--token-budget", type=int, default=2000)
+    parser.add_argument("--max-products", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    StubHandler.base_seconds = args.base_ms / 1000
+    StubHandler.prefill_seconds = args.prefill_ms / 1000
+    StubHandler.output_seconds = args.output_ms / 1000
+    StubHandler.malformed = args.malformed
+    StubHandler.rng = random.Random(args.seed)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = HTTPClient(max_retries=0)
+    pipeline.MISTRAL_API_URL = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    http_client.get_http_client = lambda: client
+
+    rng = random.Random(args.seed)
+    labels = []
+    for _ in range(args.labels):
+        nutrients = pipeline.parse_nutrition_table(generate_text(rng))
+        labels.append((nutrients, pipeline.compute_health_flags(nutrients)))
+
+    runs = [("one at a time", lambda: one_at_a_time(labels))]
+    for max_products in args.max_products:
+        runs.append((f"batched, max {max_products}",
+                     lambda max_products=max_products: batched(labels, args.token_budget, max_products)))
+
+    print(f"{args.labels} labels, stub: {args.base_ms:g}ms/request + {args.prefill_ms:g}ms/input token + "
+          f"{args.output_ms:g}ms/output token, {args.malformed:.0%} of batch sections malformed")
+    print(f"{'mode':<22}{'products/s':>12}{'API calls':>11}{'saved':>8}{'retried':>9}")
+    cache = get_summary_cache()
+    try:
+        for name, run in runs:
+            cache.clear()
+            StubHandler.requests = 0
+            start = time.perf_counter()
+            stats = run()
+            elapsed = time.perf_counter() - start
+            calls = StubHandler.requests
+            print(f"{name:<22}{args.labels / elapsed:>12.2f}{calls:>11}{1 - calls / args.labels:>8.0%}"
+                  f"{stats['retried']:>9}")
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
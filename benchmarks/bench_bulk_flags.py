@@ -0,0 +1,53 @@
+"""Products/s of per-product compute_health_flags vs. the vectorized bulk scorer.
+
+    python -m benchmarks.bench_bulk_flags --products 200000
+
+Products are synthetic label values (benchmarks.synthetic_labels, no images).
+The per-product path loops compute_health_flags over dicts; the bulk path scores
+a prebuilt matrix (bitmasks, and decoded label lists). Matrix construction is
+timed separately. Both paths are checked to agree before timing.
+"""
+import time
+import random
+import argparse
+
+from pipeline import compute_health_flags
+from bulk_flags import flag_bitmasks, flag_labels, nutrients_to_matrix
+from benchmarks.synthetic_labels import random_truth
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    products = [random_truth(rng) for _ in range(args.products)]
+    matrix = nutrients_to_matrix(products)
+    assert flag_labels(matrix) == [compute_health_flags(product) for product in products]
+
+    timings = {
+        "compute_health_flags loop": best_of(lambda: [compute_health_flags(p) for p in products], args.repeat),
+        "bulk bitmasks": best_of(lambda: flag_bitmasks(matrix), args.repeat),
+        "bulk label lists": best_of(lambda: flag_labels(matrix), args.repeat),
+        "build matrix from dicts": best_of(lambda: nutrients_to_matrix(products), args.repeat),
+    }
+    baseline = timings["compute_health_flags loop"]
+    print(f"{args.products} products")
+    for name, seconds in timings.items():
+        print(f"{name:<28}{args.products / seconds:>14,.0f} products/s  ({baseline / seconds:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compare full JPEG decoding with reduced-scale (draft mode) decoding of uploads.
+
+    python -m benchmarks.bench_decode --megapixels 12 --repeat 5
+
+The sample label is upscaled to a phone-sized JPEG; each mode then decodes it
+and runs crop_to_label and preprocess_image on the result, in a fresh
+subprocess so peak RSS is measured independently. "full" is the previous
+Image.open path, "draft" is pipeline.decode_image.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from io import BytesIO
+
+from benchmarks.common import SAMPLE_IMAGE, summarize_latencies, format_row
+from benchmarks.bench_preprocess import load_scaled_image, peak_rss_mb
+
+MODES = ("full", "draft")
+
+
+def run_child(mode, path, repeat):
+    """Time one decoding mode in this process and print a JSON result line."""
+    from PIL import Image
+    from pipeline import crop_to_label, decode_image, preprocess_image
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    baseline = peak_rss_mb()
+    decode_latencies, total_latencies = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if mode == "full":
+            image = Image.open(BytesIO(data))
+            image.load()
+        else:
+            image = decode_image(data)
+        decoded = time.perf_counter()
+        size = image.size
+        preprocess_image(crop_to_label(image)[0])
+        del image
+        decode_latencies.append(decoded - start)
+        total_latencies.append(time.perf_counter() - start)
+    print(json.dumps({
+        'mode': mode,
+        'decoded_size': size,
+        'decode_latencies': decode_latencies,
+        'total_latencies': total_latencies,
+        'peak_rss_delta_mb': peak_rss_mb() - baseline,
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("image", nargs="?", default=SAMPLE_IMAGE)
+    parser.add_argument("--megapixels", type=float, default=12.0,
+                        help="Upscale the input to this size (0 keeps the original)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child, args.image, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "upload.jpg")
+        source = load_scaled_image(args.image, args.megapixels)
+        source.save(path, quality=90)
+        print(f"input {source.size[0]}x{source.size[1]} JPEG, {os.path.getsize(path) / 1e6:.1f} MB")
+        del source
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_decode", path,
+                 "--repeat", str(args.repeat), "--child", mode],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            width, height = result['decoded_size']
+            print(f"{format_row(mode + ' decode', summarize_latencies(result['decode_latencies']))} "
+                  f"decoded={width}x{height}")
+            print(f"{format_row(mode + ' +crop+preprocess', summarize_latencies(result['total_latencies']))} "
+                  f"peak_rss_delta={result['peak_rss_delta_mb']:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Measure label-panel detection and its effect on OCR latency and parse hit rate.
+
+    python -m benchmarks.bench_label_detect --scenes 20
+
+Scenes are synthetic phone photos: the sample label pasted at a random
+position and scale onto a cluttered background. Detection accuracy is always
+reported; OCR latency and parse hit rate are reported when Tesseract is available.
+"""
+import time
+import random
+import argparse
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from label_detect import crop_to_label
+from pipeline import NUTRIENT_LABELS, clean_ocr_text, extract_text, parse_nutrition_table, preprocess_image, OCRError
+from benchmarks.common import SAMPLE_IMAGE, summarize_latencies, format_row
+
+# Bounding box of the printed panel inside the sample image (600x900)
+SAMPLE_PANEL = (95, 35, 511, 801)
+
+
+def make_scene(label, rng, size=(4000, 3000)):
+    """Paste the label onto a cluttered background; return (scene, panel box in scene pixels)."""
+    width, height = size
+    seed = rng.randrange(2 ** 31)
+    base = (np.random.RandomState(seed).rand(height // 100, width // 100, 3) * 255).astype(np.uint8)
+    scene = Image.fromarray(base).resize(size, Image.Resampling.BICUBIC)
+    draw = ImageDraw.Draw(scene)
+    for _ in range(rng.randint(3, 8)):
+        # Packaging graphics, hands and other objects
+        x, y = rng.randrange(width), rng.randrange(height)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle((x, y, x + rng.randint(100, 1200), y + rng.randint(100, 800)), fill=color)
+
+    scale = rng.uniform(1.2, min(3.0, height / label.size[1]))
+    placed = label.resize((int(label.size[0] * scale), int(label.size[1] * scale)), Image.Resampling.LANCZOS)
+    placed = placed.rotate(rng.uniform(-1.5, 1.5), expand=False, fillcolor='white')
+    x = rng.randint(0, width - placed.size[0])
+    y = rng.randint(0, height - placed.size[1])
+    scene.paste(placed, (x, y))
+    scene = scene.filter(ImageFilter.GaussianBlur(rng.uniform(0, 1.2)))
+
+    panel = tuple(int(v * scale) + offset for v, offset in zip(SAMPLE_PANEL, (x, y, x, y)))
+    return scene, panel
+
+
+def coverage(crop_box, panel):
+    """Fraction of the panel area that lies inside the crop."""
+    left, top = max(crop_box[0], panel[0]), max(crop_box[1], panel[1])
+    right, bottom = min(crop_box[2], panel[2]), min(crop_box[3], panel[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    return inter / ((panel[2] - panel[0]) * (panel[3] - panel[1]))
+
+
+def ocr_fields(image):
+    """OCR an image and return (seconds, number of nutrients parsed), or None without Tesseract."""
+    start = time.perf_counter()
+    try:
+        text = extract_text(preprocess_image(image))
+    except OCRError:
+        return None
+    elapsed = time.perf_counter() - start
+    fields = sum(1 for key in parse_nutrition_table(clean_ocr_text(text)) if key in NUTRIENT_LABELS)
+    return elapsed, fields
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-ocr", action="store_true", help="Only measure detection")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    label = Image.open(SAMPLE_IMAGE).convert('RGB')
+    detect_times, coverages, area_ratios = [], [], []
+    full_ocr, cropped_ocr = [], []
+    detected = 0
+    run_ocr = not args.no_ocr
+
+    for _ in range(args.scenes):
+        scene, panel = make_scene(label, rng)
+        start = time.perf_counter()
+        cropped, crop_box = crop_to_label(scene)
+        detect_times.append(time.perf_counter() - start)
+        if crop_box is not None:
+            detected += 1
+            coverages.append(coverage(crop_box, panel))
+            area_ratios.append((cropped.size[0] * cropped.size[1]) / (scene.size[0] * scene.size[1]))
+
+        if run_ocr:
+            full = ocr_fields(scene)
+            if full is None:
+                print("Tesseract is not available; skipping OCR measurements")
+                run_ocr = False
+                continue
+            full_ocr.append(full)
+            cropped_ocr.append(ocr_fields(cropped))
+
+    print(format_row("detection", summarize_latencies(detect_times)))
+    print(f"confident detections: {detected}/{args.scenes}")
+    if coverages:
+        print(f"mean panel coverage of crops: {np.mean(coverages):.1%}; "
+              f"mean crop area: {np.mean(area_ratios):.1%} of the photo")
+    if full_ocr:
+        for name, results in (("ocr full image", full_ocr), ("ocr cropped", cropped_ocr)):
+            print(format_row(name, summarize_latencies([elapsed for elapsed, _ in results])) +
+                  f" fields={np.mean([fields for _, fields in results]):.1f}/{len(NUTRIENT_LABELS)}")
+
+
+if __name__ == "__main__":
+    main()
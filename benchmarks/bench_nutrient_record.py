@@ -0,0 +1,66 @@
+"""Memory per product and access speed of nested-dict nutrients vs. NutrientRecord.
+
+    python -m benchmarks.bench_nutrient_record --products 100000
+
+Label texts come from the synthetic label generator (text only, no images).
+Memory is the tracemalloc growth from holding every parsed product; access
+speed is per call, best of several runs.
+"""
+import random
+import argparse
+import tracemalloc
+from timeit import repeat
+
+from pipeline import compute_health_flags, parse_nutrition_record, parse_nutrition_table
+from nutrient_record import FIELD_INDEX
+from benchmarks.synthetic_labels import label_lines, random_truth
+
+
+def label_texts(count, seed):
+    rng = random.Random(seed)
+    return [" ".join(label_lines(random_truth(rng))) for _ in range(count)]
+
+
+def bytes_per_product(parse, texts):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    products = [parse(text) for text in texts]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del products
+    return size / len(texts)
+
+
+def per_call_us(func, number):
+    return min(repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    texts = label_texts(args.products, args.seed)
+    memory = {'dict': bytes_per_product(parse_nutrition_table, texts),
+              'record': bytes_per_product(parse_nutrition_record, texts)}
+    print(f"{args.products} products")
+    print(f"{'memory per product':<32}{memory['dict']:>10.0f} B {memory['record']:>10.0f} B "
+          f"({memory['dict'] / memory['record']:.1f}x smaller)")
+
+    text = texts[0]
+    nutrients, record = parse_nutrition_table(text), parse_nutrition_record(text)
+    sodium = FIELD_INDEX['sodium']
+    rows = (
+        ("parse", lambda: parse_nutrition_table(text), lambda: parse_nutrition_record(text), 2_000),
+        ("compute_health_flags", lambda: compute_health_flags(nutrients), lambda: compute_health_flags(record), 20_000),
+        ("read sodium by name", lambda: nutrients['sodium']['value'], lambda: record.value('sodium'), 200_000),
+        ("read sodium by index", lambda: nutrients['sodium']['value'], lambda: record.data[sodium], 200_000),
+    )
+    print(f"{'per call':<32}{'dict':>12}{'record':>13}")
+    for name, dict_call, record_call, number in rows:
+        print(f"{name:<32}{per_call_us(dict_call, number):>10.3f}us {per_call_us(record_call, number):>10.3f}us")
+
+
+if __name__ == "__main__":
+    main()
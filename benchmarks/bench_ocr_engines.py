@@ -0,0 +1,57 @@
+"""Compare per-call OCR latency of the pytesseract and tesserocr pool backends.
+
+    python -m benchmarks.bench_ocr_engines [images...] --repeat 5 --pool-size 2
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+import ocr_engine
+from pipeline import preprocess_image, TESSERACT_LANG, TESSERACT_PSM
+from benchmarks.common import SAMPLE_IMAGE, summarize_latencies, time_calls, format_row
+
+
+def bench_backend(backend, images, repeat, pool_size, threads):
+    engine = ocr_engine.create_engine(backend, pool_size=pool_size, lang=TESSERACT_LANG)
+    try:
+        # Warm-up call so one-off initialization is not counted
+        engine.image_to_string(images[0], psm=TESSERACT_PSM)
+
+        def call(image):
+            return engine.image_to_string(image, psm=TESSERACT_PSM)
+
+        if threads <= 1:
+            return time_calls(call, [(image,) for image in images], repeat)
+
+        def timed(image):
+            return time_calls(call, [(image,)])[0]
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(timed, images * repeat))
+    finally:
+        engine.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="*", default=[SAMPLE_IMAGE])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent callers")
+    args = parser.parse_args(argv)
+
+    images = [preprocess_image(Image.open(path)) for path in args.images]
+    backends = ["pytesseract"]
+    if ocr_engine.tesserocr is not None:
+        backends.append("tesserocr")
+    else:
+        print("tesserocr is not installed; only the pytesseract backend is measured")
+
+    for backend in backends:
+        latencies = bench_backend(backend, images, args.repeat, args.pool_size, args.threads)
+        print(format_row(backend, summarize_latencies(latencies)))
+
+
+if __name__ == "__main__":
+    main()
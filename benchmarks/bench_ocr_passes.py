@@ -0,0 +1,80 @@
+"""Compare single full-pass OCR with the adaptive fast-pass-first strategy.
+
+    python -m benchmarks.bench_ocr_passes --labels 30
+    python -m benchmarks.bench_ocr_passes --corpus corpus/ --min-core-fields 4
+
+Each synthetic label is decoded, cropped and preprocessed once; then both
+strategies OCR the same preprocessed image. Reported per strategy: latency,
+field accuracy against the ground truth and, for the adaptive one, how often
+the fast pass was enough. Needs Tesseract.
+"""
+import sys
+import time
+import argparse
+
+from pipeline import (
+    OCR_PASS_FAST, OCRError, clean_ocr_text, crop_to_label, extract_text,
+    extract_text_adaptive, parse_nutrition_table, preprocess_image,
+)
+from benchmarks.common import format_row, summarize_latencies
+from benchmarks.bench_stages import decode, generated_corpus, load_corpus, score
+
+
+def field_accuracy(accuracy):
+    total = sum(c['total'] for c in accuracy.values())
+    return sum(c['value'] for c in accuracy.values()) / total if total else 0.0
+
+
+def run(corpus, min_core_fields):
+    latencies = {'full': [], 'adaptive': []}
+    accuracy = {'full': {}, 'adaptive': {}}
+    fast_hits = 0
+    for path, truth, _ in corpus:
+        image, _ = crop_to_label(decode(path))
+        processed = preprocess_image(image)
+
+        start = time.perf_counter()
+        text = extract_text(processed)
+        latencies['full'].append(time.perf_counter() - start)
+        score(parse_nutrition_table(clean_ocr_text(text)), truth, accuracy['full'])
+
+        start = time.perf_counter()
+        text, ocr_pass = extract_text_adaptive(processed, min_core_fields)
+        latencies['adaptive'].append(time.perf_counter() - start)
+        score(parse_nutrition_table(clean_ocr_text(text)), truth, accuracy['adaptive'])
+        fast_hits += ocr_pass == OCR_PASS_FAST
+    return latencies, accuracy, fast_hits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Directory written by benchmarks.synthetic_labels (default: generate one)")
+    parser.add_argument("--labels", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-megapixels", type=float, default=12)
+    parser.add_argument("--min-core-fields", type=int, default=None,
+                        help="Escalation threshold (default: OCR_MIN_CORE_FIELDS)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.corpus:
+            latencies, accuracy, fast_hits = run(load_corpus(args.corpus), args.min_core_fields)
+        else:
+            with generated_corpus(args.labels, args.seed, args.max_megapixels) as corpus:
+                latencies, accuracy, fast_hits = run(corpus, args.min_core_fields)
+    except OCRError as e:
+        print(f"Tesseract is required for this benchmark ({e})", file=sys.stderr)
+        return 1
+
+    stats = {name: summarize_latencies(values) for name, values in latencies.items()}
+    for name in ('full', 'adaptive'):
+        print(f"{format_row(name, stats[name])} field accuracy={field_accuracy(accuracy[name]):.1%}")
+    labels = stats['full']['count']
+    reduction = 1 - stats['adaptive']['mean_ms'] / stats['full']['mean_ms']
+    print(f"fast pass sufficed for {fast_hits}/{labels} labels; mean OCR latency {reduction:+.1%} "
+          f"({stats['full']['mean_ms']:.0f}ms -> {stats['adaptive']['mean_ms']:.0f}ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
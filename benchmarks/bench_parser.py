@@ -0,0 +1,145 @@
+"""Benchmark the single-pass nutrient parser against the original per-pattern regex parser.
+
+    python -m benchmarks.bench_parser --texts 500 --repeat 5
+
+The corpus is synthetic OCR output: label text with random values, dropped
+lines, junk characters and noise words, run through clean_ocr_text.
+"""
+import re
+import time
+import random
+import argparse
+
+from pipeline import clean_ocr_text, parse_nutrition_table, safe_float_convert
+
+LEGACY_PATTERNS = {
+    'calories': r'Calories[:\s]*(\d+)',
+    'total_fat': r'Total Fat[:\s]*(\d+\.?\d*)g',
+    'saturated_fat': r'Saturated Fat[:\s]*(\d+\.?\d*)g',
+    'trans_fat': r'Trans Fat[:\s]*(\d+\.?\d*)g',
+    'cholesterol': r'Cholesterol[:\s]*(\d+)mg',
+    'sodium': r'Sodium[:\s]*(\d+)mg',
+    'total_carbohydrate': r'Total Carbohydrate[s]?[:\s]*(\d+\.?\d*)g',
+    'dietary_fiber': r'Dietary Fiber[:\s]*(\d+\.?\d*)g',
+    'total_sugars': r'Total Sugars[:\s]*(\d+\.?\d*)g',
+    'added_sugars': r'Added Sugars[:\s]*(\d+\.?\d*)g',
+    'protein': r'Protein[:\s]*(\d+\.?\d*)g',
+    'vitamin_d': r'Vitamin D[:\s]*(\d+\.?\d*)\s*(?:mcg|µg)',
+    'calcium': r'Calcium[:\s]*(\d+)mg',
+    'iron': r'Iron[:\s]*(\d+\.?\d*)mg',
+    'potassium': r'Potassium[:\s]*(\d+)mg'
+}
+
+LABEL_LINES = [
+    ("Calories {}", 'calories', (50, 600), None),
+    ("Total Fat {}g {}%", 'total_fat', (0, 40), True),
+    ("Saturated Fat {}g {}%", 'saturated_fat', (0, 15), True),
+    ("Trans Fat {}g", 'trans_fat', (0, 3), None),
+    ("Cholesterol {}mg {}%", 'cholesterol', (0, 120), True),
+    ("Sodium {}mg {}%", 'sodium', (0, 2400), True),
+    ("Total Carbohydrate {}g {}%", 'total_carbohydrate', (0, 90), True),
+    ("Dietary Fiber {}g {}%", 'dietary_fiber', (0, 15), True),
+    ("Total Sugars {}g", 'total_sugars', (0, 50), None),
+    ("Includes {}g Added Sugars {}%", 'added_sugars', (0, 30), True),
+    ("Protein {}g", 'protein', (0, 40), None),
+    ("Vitamin D {}mcg {}%", 'vitamin_d', (0, 20), True),
+    ("Calcium {}mg {}%", 'calcium', (0, 1300), True),
+    ("Iron {}mg {}%", 'iron', (0, 18), True),
+    ("Potassium {}mg {}%", 'potassium', (0, 4700), True),
+]
+NOISE_WORDS = ["Amount per serving", "% Daily Value*", "lll", "|", "~~", "Not a significant source of",
+               "The % Daily Value tells you how much", "Ingredients: sugar, wheat flour, palm oil"]
+
+
+def legacy_parse_nutrition_table(text):
+    """The original parser: one re.search per nutrient plus an on-the-fly % Daily Value pattern."""
+    nutrients = {}
+    serving_size_match = re.search(r'Serving size[:\s]*([\d/]+)\s*([a-zA-Z]+)\s*\((\d+)g\)', text, re.IGNORECASE)
+    if serving_size_match:
+        nutrients['serving_size'] = {
+            'amount': serving_size_match.group(1),
+            'unit': serving_size_match.group(2),
+            'grams': int(serving_size_match.group(3))
+        }
+    servings_match = re.search(r'(\d+)\s*servings? per container', text, re.IGNORECASE)
+    if servings_match:
+        nutrients['servings_per_container'] = int(servings_match.group(1))
+    for nutrient, pattern in LEGACY_PATTERNS.items():
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            value = safe_float_convert(match.group(1))
+            if value is not None:
+                nutrients[nutrient] = {'value': value}
+                dv_pattern = f"{pattern}.*?(\\d+)%"
+                dv_match = re.search(dv_pattern, text, re.IGNORECASE)
+                if dv_match and len(dv_match.groups()) > 1:
+                    nutrients[nutrient]['daily_value_percent'] = safe_float_convert(dv_match.group(2))
+    return nutrients
+
+
+def generate_text(rng):
+    """Build one noisy OCR-like nutrition label text."""
+    lines = ["Nutrition Facts", f"{rng.randint(1, 20)} servings per container",
+             f"Serving size {rng.choice(['1', '2/3', '1/2'])} cup ({rng.randint(20, 250)}g)"]
+    for template, _, (low, high), has_dv in LABEL_LINES:
+        if rng.random() < 0.1:
+            continue  # OCR dropped the line
+        value = rng.randint(low, high)
+        line = template.format(value, rng.randint(0, 100)) if has_dv else template.format(value)
+        if rng.random() < 0.2:
+            line = line.upper()
+        lines.append(line)
+        if rng.random() < 0.3:
+            lines.append(rng.choice(NOISE_WORDS))
+    text = "\n".join(lines)
+    # Sprinkle OCR junk characters
+    junk = "".join(rng.choice("@#*^~|;") if rng.random() < 0.02 else c for c in text)
+    return clean_ocr_text(junk)
+
+
+def time_parser(parser, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            parser(text)
+    return time.perf_counter() - start
+
+
+def compare_results(texts):
+    """Count texts where the parsers disagree on values or on % Daily Values."""
+    value_diffs = dv_diffs = 0
+    for text in texts:
+        old, new = legacy_parse_nutrition_table(text), parse_nutrition_table(text)
+        strip = lambda result: {k: (v['value'] if isinstance(v, dict) and 'value' in v else v)
+                                for k, v in result.items()}
+        if strip(old) != strip(new):
+            value_diffs += 1
+        elif old != new:
+            dv_diffs += 1
+    return value_diffs, dv_diffs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    texts = [generate_text(rng) for _ in range(args.texts)]
+    calls = len(texts) * args.repeat
+
+    legacy = time_parser(legacy_parse_nutrition_table, texts, args.repeat)
+    single_pass = time_parser(parse_nutrition_table, texts, args.repeat)
+    value_diffs, dv_diffs = compare_results(texts)
+
+    print(f"legacy       {legacy / calls * 1e6:8.1f} us/text")
+    print(f"single-pass  {single_pass / calls * 1e6:8.1f} us/text")
+    print(f"speedup      {legacy / single_pass:8.2f}x")
+    print(f"texts with different values: {value_diffs}/{len(texts)}; "
+          f"different % Daily Values only: {dv_diffs}/{len(texts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Hit rate, false-match rate and lookup latency of the perceptual-hash label index.
+
+    python -m benchmarks.bench_phash --labels 200 --distances 2,4,6,8
+
+Each synthetic label (benchmarks.synthetic_labels) gets several views, as
+either of two variations:
+
+    reencode      one photo, shared again resized and JPEG-recompressed
+    rephotograph  separate photos: rotation, blur and sensor noise differ per view
+
+Every view is cropped with crop_to_label, as in run_ocr. The first view of half
+the labels is indexed; the remaining views of those labels should match it
+(hit rate), and any match to another label, including every match for the
+unindexed half, is a false match. No Tesseract is needed.
+
+Lookup latency is measured on an index padded to --index-size entries with
+perturbed copies of real label hashes, which cluster like a real catalogue.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
+from benchmarks.common import summarize_latencies, format_row
+from benchmarks.synthetic_labels import available_fonts, degrade, draw_label, random_truth
+from label_detect import crop_to_label
+from phash_index import HASH_SIZE, PerceptualHashIndex, dhash
+
+
+VARIATIONS = ("reencode", "rephotograph")
+
+
+def reencode(image, rng):
+    """The photo as a messaging app passes it on: scaled down and recompressed."""
+    scale = rng.uniform(0.5, 0.9)
+    image = image.resize((int(image.size[0] * scale), int(image.size[1] * scale)), Image.Resampling.BICUBIC)
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=rng.randint(60, 85))
+    return Image.open(BytesIO(buffer.getvalue())).convert('RGB')
+
+
+def label_views(count, views, variation, seed):
+    """Return [(label id, hash)] for every view, and the per-view hashing latencies."""
+    rng = random.Random(seed)
+    fonts = available_fonts()
+    hashes, latencies = [], []
+    for label in range(count):
+        base = draw_label(random_truth(rng), 1.0, rng.choice(fonts))
+        photo = degrade(base, rng)[0]
+        for view in range(views):
+            if variation == "rephotograph":
+                photo = degrade(base, rng)[0]
+            elif view:
+                photo = reencode(photo, rng)
+            image, _ = crop_to_label(photo)
+            start = time.perf_counter()
+            key = dhash(image)
+            latencies.append(time.perf_counter() - start)
+            hashes.append((label, key))
+    return hashes, latencies
+
+
+def match_rates(hashes, views, max_distance):
+    """Return (hit rate on repeat photos, false-match rate over all lookups)."""
+    indexed_labels = len(hashes) // views // 2
+    index = PerceptualHashIndex(max_distance=max_distance)
+    for label, key in hashes[::views][:indexed_labels]:
+        index.add_hash(key, str(label))
+    hits = repeats = false_matches = 0
+    for position, (label, key) in enumerate(hashes):
+        if position % views == 0 and label < indexed_labels:
+            continue
+        text, _ = index.lookup_hash(key)
+        if label < indexed_labels:
+            repeats += 1
+            hits += text == str(label)
+        false_matches += text is not None and text != str(label)
+    return hits / repeats, false_matches / (len(hashes) - indexed_labels)
+
+
+def padded_index(hashes, size, seed, path=None):
+    rng = random.Random(seed)
+    bits = HASH_SIZE ** 2
+    index = PerceptualHashIndex(path=path)
+    while len(index) < size:
+        _, key = rng.choice(hashes)
+        for _ in range(rng.randint(16, 64)):
+            key ^= 1 << rng.randrange(bits)
+        index.add_hash(key, "")
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labels", type=int, default=200)
+    parser.add_argument("--views", type=int, default=3, help="Photos per label")
+    parser.add_argument("--variation", choices=VARIATIONS + ("both",), default="both")
+    parser.add_argument("--distances", default="2,4,6,8", help="Comma-separated max Hamming distances")
+    parser.add_argument("--index-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    variations = VARIATIONS if args.variation == "both" else (args.variation,)
+    distances = [int(value) for value in args.distances.split(",")]
+    print(f"{args.labels} labels x {args.views} views, {HASH_SIZE ** 2}-bit dHash")
+    print(f"{'variation':<14}{'max distance':>12}{'hit rate':>10}{'false matches':>16}")
+    for variation in variations:
+        hashes, hash_latencies = label_views(args.labels, args.views, variation, args.seed)
+        for distance in distances:
+            hit_rate, false_rate = match_rates(hashes, args.views, distance)
+            print(f"{variation:<14}{distance:>12}{hit_rate:>10.1%}{false_rate:>16.2%}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "phash.jsonl")
+        index = padded_index(hashes, args.index_size, args.seed, path)
+        lookups = []
+        for _, key in hashes:
+            start = time.perf_counter()
+            index.lookup_hash(key)
+            lookups.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        reloaded = PerceptualHashIndex(path=path)
+        load_seconds = time.perf_counter() - start
+    print()
+    print(format_row("dhash of cropped label", summarize_latencies(hash_latencies)))
+    print(format_row(f"lookup in {len(index)}", summarize_latencies(lookups)))
+    print(f"reload {len(reloaded)} entries from disk: {load_seconds * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare wall time and peak memory of the legacy and NumPy preprocessing paths.
+
+    python -m benchmarks.bench_preprocess [image] --megapixels 12 --repeat 5
+
+Each method runs in a fresh subprocess so peak RSS is measured independently.
+"""
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+from benchmarks.common import SAMPLE_IMAGE, summarize_latencies, format_row
+
+METHODS = ("legacy", "numpy")
+
+
+def load_scaled_image(path, megapixels):
+    """Load an image and upscale it to roughly the requested size, simulating a phone photo."""
+    from PIL import Image
+
+    image = Image.open(path).convert('RGB')
+    if megapixels:
+        width, height = image.size
+        scale = (megapixels * 1_000_000 / (width * height)) ** 0.5
+        image = image.resize((int(width * scale), int(height * scale)), Image.Resampling.BICUBIC)
+    return image
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(method, path, megapixels, repeat):
+    """Time one method in this process and print a JSON result line."""
+    from pipeline import preprocess_image
+
+    image = load_scaled_image(path, megapixels)
+    baseline = peak_rss_mb()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        preprocess_image(image, method=method)
+        latencies.append(time.perf_counter() - start)
+    print(json.dumps({
+        'method': method,
+        'size': image.size,
+        'latencies': latencies,
+        'peak_rss_delta_mb': peak_rss_mb() - baseline,
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("image", nargs="?", default=SAMPLE_IMAGE)
+    parser.add_argument("--megapixels", type=float, default=12.0,
+                        help="Upscale the input to this size (0 keeps the original)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child, args.image, args.megapixels, args.repeat)
+        return
+
+    for method in METHODS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_preprocess", args.image,
+             "--megapixels", str(args.megapixels), "--repeat", str(args.repeat), "--child", method],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        stats = summarize_latencies(result['latencies'])
+        width, height = result['size']
+        print(f"{format_row(method, stats)} peak_rss_delta={result['peak_rss_delta_mb']:.1f}MB "
+              f"input={width}x{height}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Insert throughput, indexed query latency and export memory of the SQLite results store.
+
+    python -m benchmarks.bench_results_store --rows 100000
+
+Results are synthetic label values (benchmarks.synthetic_labels, no images)
+shaped like analyze_text output. Inserts are timed one row per transaction
+and in batches; "sodium > N" queries are timed with their index and with
+NOT INDEXED (a full table scan); the NDJSON export is timed, and its peak
+Python memory measured with tracemalloc in a separate run.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+from pipeline import compute_health_flags
+from results_store import ResultsStore
+from benchmarks.synthetic_labels import label_lines, random_truth
+
+
+def synthetic_results(count, seed):
+    rng = random.Random(seed)
+    results = []
+    for _ in range(count):
+        truth = random_truth(rng)
+        text = "\n".join(label_lines(truth))
+        results.append({
+            'image_hash': f"{rng.getrandbits(256):064x}", 'status': "ok", 'ocr_pass': "fast",
+            'raw_text': text, 'cleaned_text': text, 'nutrients': truth, 'flags': compute_health_flags(truth),
+            'summary': None, 'summary_backend': None,
+            'timings': {'ocr': rng.uniform(0.2, 1.5), 'parse': 0.0002, 'flags': 0.00001},
+        })
+    return results
+
+
+def insert_rate(path, results, batch_size):
+    store = ResultsStore(path, batch_size=batch_size, flush_interval=0)
+    start = time.perf_counter()
+    for result in results:
+        store.add(result)
+    store.flush()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return len(results) / elapsed
+
+
+def query_ms(store, sql, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        store._conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--unbatched-rows", type=int, default=2_000,
+                        help="Rows for the one-transaction-per-row run (each commit waits on the disk)")
+    parser.add_argument("--sodium", type=float, nargs="+", default=[600, 2000],
+                        help="Sodium thresholds (mg) to query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = synthetic_results(args.rows, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'insert':<34}{'rows/s':>12}")
+        for batch_size, rows in ((1, results[:args.unbatched_rows]), (50, results), (500, results)):
+            path = os.path.join(tmp, f"batch{batch_size}.sqlite3")
+            print(f"{f'batch size {batch_size} ({len(rows)} rows)':<34}{insert_rate(path, rows, batch_size):>12,.0f}")
+
+        store = ResultsStore(os.path.join(tmp, "batch500.sqlite3"))
+        for sodium in args.sodium:
+            matches = store.count([('sodium', '>', sodium)])
+            print(f"\n{f'sodium > {sodium:g} ({matches} of {args.rows})':<34}{'ms':>12}")
+            for name, table in (("indexed", "analyses"), ("full scan", "analyses NOT INDEXED")):
+                for query, columns in (("count", "COUNT(*)"), ("ids", "id"), ("rows", "*")):
+                    sql = f"SELECT {columns} FROM {table} WHERE sodium > {sodium}"
+                    print(f"{f'{name}, {query}':<34}{query_ms(store, sql):>12.2f}")
+
+        with open(os.devnull, 'w', encoding='utf-8') as out:
+            start = time.perf_counter()
+            exported = store.export_ndjson(out)
+            elapsed = time.perf_counter() - start
+            # Memory in a second run: tracemalloc slows allocation-heavy code down
+            tracemalloc.start()
+            store.export_ndjson(out)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        store.close()
+    print(f"\nNDJSON export of {exported} rows: {elapsed:.2f}s, {exported / elapsed:,.0f} rows/s, "
+          f"peak Python memory {peak / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Stage-level pipeline benchmark on a synthetic label corpus.
+
+    python -m benchmarks.bench_stages --labels 30 --max-megapixels 12
+    python -m benchmarks.bench_stages --corpus corpus/ --compare bench-results/stages-<commit>.json
+
+Labels come from benchmarks.synthetic_labels: an existing corpus directory, or
+a fresh one generated in a subprocess (so generation does not distort the
+memory figures). Every label is decoded and run through each pipeline stage
+in order, timing the stages separately. The report covers per-stage
+throughput, latency percentiles and how much each stage raised the process's
+peak RSS, plus field-level extraction accuracy against the ground truth.
+Results are written as JSON tagged with the git commit, so runs can be
+compared across commits.
+
+Without Tesseract, the OCR stage is skipped. The text stages then run on the
+label's reference text, and accuracy is reported for the parser alone.
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+
+from PIL import Image
+
+from pipeline import (
+    OCRError, build_mistral_prompt, clean_ocr_text, compute_health_flags,
+    crop_to_label, extract_text, parse_nutrition_table, preprocess_image,
+)
+from benchmarks.common import summarize_latencies
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ('decode', 'crop_to_label', 'preprocess_image', 'extract_text', 'clean_ocr_text',
+          'parse_nutrition_table', 'compute_health_flags', 'build_mistral_prompt')
+# Nutrient fields scored for accuracy (serving size is scored on its gram weight)
+SCORED_FIELDS = ('serving_size', 'servings_per_container', 'calories', 'total_fat', 'saturated_fat',
+                 'trans_fat', 'cholesterol', 'sodium', 'total_carbohydrate', 'dietary_fiber',
+                 'total_sugars', 'added_sugars', 'protein', 'vitamin_d', 'calcium', 'iron', 'potassium')
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def git_commit():
+    """Return (commit, dirty) for the working tree, or (None, None) outside git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def score(parsed, truth, accuracy):
+    """Add field-level hits for one label into the accuracy counters."""
+    for field in SCORED_FIELDS:
+        counts = accuracy.setdefault(field, {'total': 0, 'value': 0, 'dv_total': 0, 'dv': 0})
+        counts['total'] += 1
+        expected, found = truth.get(field), parsed.get(field)
+        if field == 'serving_size':
+            counts['value'] += bool(found) and found.get('grams') == expected['grams']
+        elif field == 'servings_per_container':
+            counts['value'] += found == expected
+        else:
+            counts['value'] += bool(found) and found.get('value') == expected['value']
+            if 'daily_value_percent' in expected:
+                counts['dv_total'] += 1
+                counts['dv'] += bool(found) and found.get('daily_value_percent') == expected['daily_value_percent']
+
+
+def timed(stage, timings, rss_growth, func, *args):
+    """Run one stage, recording its latency and any growth of the peak RSS."""
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    result = func(*args)
+    timings[stage].append(time.perf_counter() - start)
+    rss_growth[stage] += peak_rss_mb() - before
+    return result
+
+
+def load_corpus(directory):
+    """Return [(path, truth, info)] from a synthetic_labels output directory."""
+    with open(os.path.join(directory, "labels.json"), encoding='utf-8') as f:
+        manifest = json.load(f)
+    return [(os.path.join(directory, name), entry['truth'], entry['info']) for name, entry in sorted(manifest.items())]
+
+
+@contextmanager
+def generated_corpus(count, seed=0, max_megapixels=12):
+    """Generate a corpus in a subprocess (keeping this process's memory figures clean) and yield it."""
+    with tempfile.TemporaryDirectory(prefix="labels-") as directory:
+        subprocess.run([sys.executable, "-m", "benchmarks.synthetic_labels", directory,
+                        "--count", str(count), "--seed", str(seed), "--max-megapixels", str(max_megapixels)],
+                       cwd=ROOT, check=True, stderr=subprocess.DEVNULL)
+        yield load_corpus(directory)
+
+
+def decode(path):
+    image = Image.open(path)
+    image.load()
+    return image
+
+
+def run(args, corpus):
+    timings = {stage: [] for stage in STAGES}
+    rss_growth = {stage: 0.0 for stage in STAGES}
+    accuracy = {}
+    use_ocr = not args.no_ocr
+    megapixels = []
+
+    for path, truth, info in corpus:
+        megapixels.append(info['megapixels'])
+        raw_text = info['text']
+        if not args.no_ocr:
+            image = timed('decode', timings, rss_growth, decode, path)
+            cropped, _ = timed('crop_to_label', timings, rss_growth, crop_to_label, image)
+            processed = timed('preprocess_image', timings, rss_growth, preprocess_image, cropped)
+            del image, cropped
+            if use_ocr:
+                try:
+                    raw_text = timed('extract_text', timings, rss_growth, extract_text, processed)
+                except OCRError as e:
+                    print(f"OCR unavailable ({e}); using reference text", file=sys.stderr)
+                    use_ocr = False
+        cleaned = timed('clean_ocr_text', timings, rss_growth, clean_ocr_text, raw_text)
+        nutrients = timed('parse_nutrition_table', timings, rss_growth, parse_nutrition_table, cleaned)
+        flags = timed('compute_health_flags', timings, rss_growth, compute_health_flags, nutrients)
+        timed('build_mistral_prompt', timings, rss_growth, build_mistral_prompt, nutrients, flags)
+        score(nutrients, truth, accuracy)
+
+    stages = {}
+    for stage in STAGES:
+        if not timings[stage]:
+            continue
+        stats = summarize_latencies(timings[stage])
+        total = sum(timings[stage])
+        stats['per_second'] = len(timings[stage]) / total if total > 0 else float('inf')
+        stats['raised_peak_rss_mb'] = rss_growth[stage]
+        stages[stage] = stats
+
+    fields = sum(c['total'] for c in accuracy.values())
+    dv_fields = sum(c['dv_total'] for c in accuracy.values())
+    commit, dirty = git_commit()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': vars(args),
+        'ocr': "tesseract" if use_ocr else "reference_text",
+        'labels': len(corpus),
+        'mean_megapixels': sum(megapixels) / len(megapixels) if megapixels else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': stages,
+        'accuracy': {
+            'value': sum(c['value'] for c in accuracy.values()) / fields if fields else 0.0,
+            'daily_value': sum(c['dv'] for c in accuracy.values()) / dv_fields if dv_fields else 0.0,
+            'per_field': {field: c['value'] / c['total'] for field, c in accuracy.items()},
+        },
+    }
+
+
+def print_report(results, baseline=None):
+    print(f"{results['labels']} labels, mean {results['mean_megapixels']:.1f} MP, OCR: {results['ocr']}, "
+          f"commit {(results['commit'] or 'unknown')[:10]}{' (dirty)' if results['dirty'] else ''}")
+    print(f"{'stage':<24}{'per s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'+peak MB':>10}")
+    for stage, stats in results['stages'].items():
+        line = (f"{stage:<24}{stats['per_second']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['raised_peak_rss_mb']:>10.1f}")
+        old = (baseline or {}).get('stages', {}).get(stage)
+        if old:
+            line += f"   p50 {stats['p50_ms'] / old['p50_ms'] - 1:+.0%} vs {(baseline['commit'] or '?')[:10]}"
+        print(line)
+    accuracy = results['accuracy']
+    print(f"peak RSS {results['peak_rss_mb']:.0f} MB; field accuracy {accuracy['value']:.1%} "
+          f"(% Daily Value {accuracy['daily_value']:.1%})")
+    misses = {field: rate for field, rate in accuracy['per_field'].items() if rate < 1.0}
+    if misses:
+        print("fields below 100%: " + ", ".join(f"{field} {rate:.0%}" for field, rate in sorted(misses.items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Directory written by benchmarks.synthetic_labels (default: generate one)")
+    parser.add_argument("--labels", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-megapixels", type=float, default=12)
+    parser.add_argument("--no-ocr", action="store_true", help="Skip the image stages")
+    parser.add_argument("--output", help="JSON results file (default: bench-results/stages-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        results = run(args, load_corpus(args.corpus))
+    else:
+        with generated_corpus(args.labels, args.seed, args.max_megapixels) as corpus:
+            results = run(args, corpus)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join(ROOT, "bench-results", f"stages-{(results['commit'] or 'nogit')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
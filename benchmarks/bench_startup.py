@@ -0,0 +1,110 @@
+"""Measure cold-start cost: module import time and time to first analysis.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --top 15 --max-import-ms 150   # exit 1 on regression
+
+Every measurement runs in a fresh interpreter. Import times come from
+``python -X importtime``; the heaviest imports under each entry module are
+listed so a new eager dependency is easy to spot. Time to first analysis is
+the wall time of a process that imports the pipeline and analyzes one label.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from statistics import median
+
+from benchmarks.common import SAMPLE_IMAGE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_MODULES = ("pipeline", "api", "batch", "jobs")
+
+SAMPLE_TEXT = ("Serving size 1 cup (228g) Calories 250 Total Fat 12g 18% Sodium 470mg 20% "
+               "Total Carbohydrate 31g 10% Total Sugars 5g Protein 5g")
+FIRST_ANALYSIS = {
+    'interpreter': "pass",
+    'text': f"import pipeline; pipeline.analyze_text({SAMPLE_TEXT!r}, summarize=True, summarizer='local')",
+    'image': f"import pipeline; pipeline.analyze_image(open({SAMPLE_IMAGE!r}, 'rb').read())",
+}
+
+
+def run_python(args, env=None):
+    """Run the current interpreter in the project root and return (seconds, stderr)."""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True, env=env)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{completed.stderr[-2000:]}")
+    return elapsed, completed.stderr
+
+
+def parse_importtime(stderr):
+    """Return [(name, depth, self_us, cumulative_us)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_profile(module, repeat):
+    """Median cumulative import time of module plus its heaviest imports (median over runs)."""
+    runs = []
+    for _ in range(repeat):
+        _, stderr = run_python(["-X", "importtime", "-c", f"import {module}"])
+        rows = parse_importtime(stderr)
+        # Children are printed before their parent: keep the rows back to the previous top-level import
+        end = max(i for i, row in enumerate(rows) if row[0] == module and row[1] == 0)
+        start = end
+        while start > 0 and rows[start - 1][1] > 0:
+            start -= 1
+        runs.append({name: cumulative for name, _, _, cumulative in rows[start:end + 1]})
+    names = set.intersection(*(set(run) for run in runs))
+    profile = {name: median(run[name] for run in runs) / 1000 for name in names}
+    return profile.get(module, 0.0), profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Heaviest imports to list per entry module")
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="Exit with status 1 if any entry module imports slower than this")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {'imports_ms': {}, 'first_analysis_ms': {}}
+    for module in ENTRY_MODULES:
+        total, profile = import_profile(module, args.repeat)
+        results['imports_ms'][module] = total
+        print(f"import {module:<10} {total:8.1f}ms")
+        heaviest = sorted(((ms, name) for name, ms in profile.items() if name != module), reverse=True)
+        for ms, name in heaviest[:args.top]:
+            print(f"    {name:<40} {ms:8.1f}ms")
+
+    # No disk cache, so the image run really performs OCR
+    env = dict(os.environ, OCR_CACHE_DIR="")
+    for name, code in FIRST_ANALYSIS.items():
+        ms = median(run_python(["-c", code], env=env)[0] for _ in range(args.repeat)) * 1000
+        results['first_analysis_ms'][name] = ms
+        print(f"process start -> first {name:<12} {ms:8.1f}ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_import_ms is not None:
+        slow = {m: ms for m, ms in results['imports_ms'].items() if ms > args.max_import_ms}
+        if slow:
+            print(f"Import time budget of {args.max_import_ms:g}ms exceeded: {slow}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
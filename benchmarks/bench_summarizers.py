@@ -0,0 +1,50 @@
+"""Benchmark summary latency of the local template backend (and optionally Mistral).
+
+    python -m benchmarks.bench_summarizers --labels 500
+    python -m benchmarks.bench_summarizers --remote 5   # also time 5 Mistral calls (needs MISTRAL_API_KEY)
+
+Labels come from the synthetic OCR corpus used by bench_parser.
+"""
+import os
+import random
+import argparse
+
+from dotenv import load_dotenv
+
+from pipeline import compute_health_flags, parse_nutrition_table
+from summarizers import LocalSummarizer, MistralSummarizer
+from summary_cache import get_summary_cache
+from benchmarks.bench_parser import generate_text
+from benchmarks.common import format_row, summarize_latencies, time_calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labels", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--remote", type=int, default=0, help="Mistral calls to time (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    labels = []
+    for _ in range(args.labels):
+        nutrients = parse_nutrition_table(generate_text(rng))
+        labels.append((nutrients, compute_health_flags(nutrients)))
+
+    local = LocalSummarizer()
+    print(format_row("local", summarize_latencies(time_calls(local.summarize, labels, args.repeat))))
+
+    if args.remote:
+        load_dotenv()
+        api_key = os.getenv("MISTRAL_API_KEY")
+        if not api_key:
+            print("mistral                  skipped: MISTRAL_API_KEY is not set")
+            return
+        get_summary_cache().clear()
+        remote = MistralSummarizer(api_key)
+        print(format_row("mistral", summarize_latencies(time_calls(remote.summarize, labels[:args.remote]))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import time
+
+SAMPLE_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "nutrition-facts-label-download-image1.jpg")
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values using linear interpolation."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(values):
+    """Return mean/min/percentile statistics (in milliseconds) for latencies in seconds."""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values) * 1000,
+        'min_ms': min(values) * 1000,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'max_ms': max(values) * 1000,
+    }
+
+
+def time_calls(func, args_list, repeat=1):
+    """Call func(*args) for each args tuple, repeat times, returning per-call latencies."""
+    latencies = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            func(*args)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def format_row(name, stats):
+    return (f"{name:<24} n={stats['count']:<5} mean={stats['mean_ms']:9.2f}ms "
+            f"p50={stats['p50_ms']:9.2f}ms p95={stats['p95_ms']:9.2f}ms")
@@ -0,0 +1,101 @@
+"""Load-test the JSON API and report latency percentiles and throughput.
+
+    gunicorn -c gunicorn.conf.py api:application &
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --endpoint text --concurrency 16 --requests 2000
+    python -m benchmarks.load_test --endpoint image --image label.jpg --concurrency 4 --requests 100
+
+The text endpoint posts synthetic OCR output (see bench_parser) and isolates
+the HTTP and parsing overhead; the image endpoint includes OCR.
+"""
+import sys
+import time
+import random
+import argparse
+import threading
+
+import requests
+
+from benchmarks.bench_parser import generate_text
+from benchmarks.common import SAMPLE_IMAGE, summarize_latencies
+
+
+def build_requests(args):
+    """Return a list of (path, kwargs) request specs to cycle through."""
+    if args.endpoint == "image":
+        with open(args.image, 'rb') as f:
+            image_bytes = f.read()
+        query = "?summary=1&summarizer=local" if args.summary else ""
+        return [(f"/v1/analyze/image{query}", {'data': image_bytes, 'headers': {'Content-Type': 'image/jpeg'}})]
+    rng = random.Random(args.seed)
+    return [("/v1/analyze/text", {'json': {'text': generate_text(rng), 'summary': args.summary,
+                                           'summarizer': 'local'}})
+            for _ in range(100)]
+
+
+def run(args):
+    specs = build_requests(args)
+    latencies = []
+    errors = []
+    counter = iter(range(args.requests))
+    lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            path, kwargs = specs[index % len(specs)]
+            start = time.perf_counter()
+            try:
+                response = session.post(args.url.rstrip('/') + path, timeout=args.timeout, **kwargs)
+                ok = response.status_code == 200
+            except requests.exceptions.RequestException as e:
+                ok, response = False, e
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(getattr(response, 'status_code', type(response).__name__))
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    stats = summarize_latencies(latencies)
+    stats['errors'] = len(errors)
+    stats['requests_per_second'] = len(latencies) / wall_time if wall_time > 0 else 0.0
+    return stats, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=("text", "image"), default="text")
+    parser.add_argument("--image", default=SAMPLE_IMAGE)
+    parser.add_argument("--summary", action="store_true", help="Request a local summary as well")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stats, errors = run(args)
+    if not stats['count']:
+        print(f"All {len(errors)} requests failed: {errors[:5]}", file=sys.stderr)
+        return 1
+    print(f"{args.endpoint} x{args.requests} at concurrency {args.concurrency}")
+    print(f"  p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms "
+          f"max={stats['max_ms']:.1f}ms")
+    print(f"  {stats['requests_per_second']:.1f} requests/s, {stats['errors']} errors")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Synthetic FDA-style Nutrition Facts labels with ground truth.
+
+    python -m benchmarks.synthetic_labels corpus/ --count 50 --max-megapixels 12
+
+Each label is drawn with PIL from random nutrient values, in one of the
+available fonts, then degraded with rotation, blur and sensor noise and
+rendered at a random resolution. The ground truth (values, % Daily Values,
+serving size) is returned with the image, or written to labels.json next to
+the generated files.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Design size of the label in points; everything is scaled to the target resolution
+LABEL_WIDTH = 600
+LABEL_HEIGHT = 800
+MEGAPIXEL_CHOICES = (0.5, 1, 2, 5, 8, 12)
+
+# TrueType fonts tried in order; Pillow's built-in font is always available as well
+FONT_CANDIDATES = (
+    "DejaVuSans.ttf", "DejaVuSans-Bold.ttf", "LiberationSans-Regular.ttf", "LiberationSans-Bold.ttf",
+    "Arial.ttf", "arialbd.ttf", "Helvetica.ttc", "FreeSans.ttf", "FreeSansBold.ttf",
+)
+
+# (key, label, unit, value range, decimals allowed, has % DV, indent)
+NUTRIENT_LINES = (
+    ('total_fat', "Total Fat", 'g', (0, 40), True, True, 0),
+    ('saturated_fat', "Saturated Fat", 'g', (0, 15), True, True, 1),
+    ('trans_fat', "Trans Fat", 'g', (0, 3), True, False, 1),
+    ('cholesterol', "Cholesterol", 'mg', (0, 120), False, True, 0),
+    ('sodium', "Sodium", 'mg', (0, 2400), False, True, 0),
+    ('total_carbohydrate', "Total Carbohydrate", 'g', (0, 90), False, True, 0),
+    ('dietary_fiber', "Dietary Fiber", 'g', (0, 15), False, True, 1),
+    ('total_sugars', "Total Sugars", 'g', (0, 50), False, False, 1),
+    ('added_sugars', "Added Sugars", 'g', (0, 30), False, True, 2),
+    ('protein', "Protein", 'g', (0, 40), False, False, 0),
+)
+VITAMIN_LINES = (
+    ('vitamin_d', "Vitamin D", 'mcg', (0, 20), False),
+    ('calcium', "Calcium", 'mg', (0, 1300), False),
+    ('iron', "Iron", 'mg', (0, 18), True),
+    ('potassium', "Potassium", 'mg', (0, 4700), False),
+)
+SERVING_UNITS = ("cup", "tbsp", "pieces", "bar", "container")
+
+
+def available_fonts():
+    """Return loadable TrueType font names plus None for Pillow's built-in font."""
+    fonts = []
+    for name in FONT_CANDIDATES:
+        try:
+            ImageFont.truetype(name, 12)
+        except OSError:
+            continue
+        fonts.append(name)
+    return fonts + [None]
+
+
+def load_font(name, size):
+    size = max(6, int(size))
+    return ImageFont.truetype(name, size) if name else ImageFont.load_default(size=size)
+
+
+def random_truth(rng):
+    """Draw random label contents; values mirror what parse_nutrition_table returns."""
+    truth = {
+        'serving_size': {'amount': rng.choice(["1", "2", "3", "1/2", "2/3"]),
+                         'unit': rng.choice(SERVING_UNITS), 'grams': rng.randint(15, 300)},
+        'servings_per_container': rng.randint(1, 20),
+        'calories': {'value': float(rng.randint(0, 650))},
+    }
+    for key, _, _, (low, high), decimals, has_dv, _ in NUTRIENT_LINES:
+        value = rng.randint(low, high) + (rng.choice((0, 0.5)) if decimals and high < 20 else 0)
+        truth[key] = {'value': float(value)}
+        if has_dv:
+            truth[key]['daily_value_percent'] = float(rng.randint(0, 100))
+    for key, _, _, (low, high), decimals in VITAMIN_LINES:
+        value = rng.randint(low, high) + (rng.choice((0, 0.5)) if decimals else 0)
+        truth[key] = {'value': float(value), 'daily_value_percent': float(rng.randint(0, 100))}
+    return truth
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+def label_lines(truth):
+    """Return the label text, line by line, as a perfect OCR pass would read it."""
+    serving = truth['serving_size']
+    lines = ["Nutrition Facts", f"{truth['servings_per_container']} servings per container",
+             f"Serving size {serving['amount']} {serving['unit']} ({serving['grams']}g)",
+             "Amount per serving", f"Calories {_number(truth['calories']['value'])}", "% Daily Value*"]
+    for key, label, unit, _, _, has_dv, _ in NUTRIENT_LINES:
+        text = f"{label} {_number(truth[key]['value'])}{unit}"
+        if key == 'added_sugars':
+            text = f"Includes {_number(truth[key]['value'])}{unit} Added Sugars"
+        if has_dv:
+            text += f" {_number(truth[key]['daily_value_percent'])}%"
+        lines.append(text)
+    for key, label, unit, _, _ in VITAMIN_LINES:
+        lines.append(f"{label} {_number(truth[key]['value'])}{unit} {_number(truth[key]['daily_value_percent'])}%")
+    return lines
+
+
+def draw_label(truth, scale, font_name):
+    """Render the label at `scale` pixels per design point."""
+    width, height = int(LABEL_WIDTH * scale), int(LABEL_HEIGHT * 1.5 * scale)
+    image = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    margin = 24 * scale
+    left, right = margin, width - margin
+    fonts = {size: load_font(font_name, size * scale) for size in (15, 17, 22, 34, 48)}
+    y = margin
+
+    def rule(thickness):
+        nonlocal y
+        draw.rectangle((left, y, right, y + thickness * scale), fill=0)
+        y += (thickness + 6) * scale
+
+    def text_line(text, size=17, indent=0, right_text=None, gap=8):
+        nonlocal y
+        font = fonts[size]
+        draw.text((left + indent * 18 * scale, y), text, font=font, fill=0)
+        if right_text:
+            draw.text((right, y), right_text, font=font, fill=0, anchor="ra")
+        y += font.size + gap * scale
+
+    serving = truth['serving_size']
+    text_line("Nutrition Facts", size=48)
+    rule(1)
+    text_line(f"{truth['servings_per_container']} servings per container")
+    text_line("Serving size", size=22, right_text=f"{serving['amount']} {serving['unit']} ({serving['grams']}g)")
+    rule(12)
+    text_line("Amount per serving", size=15, gap=0)
+    text_line("Calories", size=34, right_text=_number(truth['calories']['value']))
+    rule(6)
+    text_line("% Daily Value*", size=15, right_text=" ")
+    for key, label, unit, _, _, has_dv, indent in NUTRIENT_LINES:
+        rule(1)
+        amount = f"{_number(truth[key]['value'])}{unit}"
+        text = f"Includes {amount} Added Sugars" if key == 'added_sugars' else f"{label} {amount}"
+        percent = f"{_number(truth[key]['daily_value_percent'])}%" if has_dv else None
+        text_line(text, indent=indent, right_text=percent)
+    rule(12)
+    for key, label, unit, _, _ in VITAMIN_LINES:
+        text_line(f"{label} {_number(truth[key]['value'])}{unit}",
+                  right_text=f"{_number(truth[key]['daily_value_percent'])}%")
+        rule(1)
+    text_line("* The % Daily Value tells you how much a nutrient in a serving", size=15, gap=2)
+    text_line("of food contributes to a daily diet.", size=15)
+
+    # Trim the unused canvas below the footnote, then frame the panel
+    image = image.crop((0, 0, width, min(height, int(y + margin))))
+    ImageDraw.Draw(image).rectangle((margin / 2, margin / 2, width - margin / 2, image.size[1] - margin / 2),
+                                    outline=0, width=max(1, int(3 * scale)))
+    return image
+
+
+def degrade(image, rng):
+    """Apply the imperfections of a phone photo: rotation, blur and sensor noise."""
+    angle = rng.uniform(-2, 2)
+    image = image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+    blur = rng.uniform(0, 1.5)
+    if blur > 0.2:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    sigma = rng.uniform(0, 12)
+    if sigma > 1:
+        pixels = np.random.default_rng(rng.randrange(2 ** 31)).standard_normal(
+            (image.size[1], image.size[0]), dtype=np.float32)
+        pixels *= sigma
+        pixels += np.asarray(image, dtype=np.float32)
+        image = Image.fromarray(np.clip(pixels, 0, 255, out=pixels).astype(np.uint8), mode='L')
+    return image.convert('RGB'), {'rotation': angle, 'blur': blur, 'noise_sigma': sigma}
+
+
+def generate_label(rng, fonts=None, max_megapixels=12):
+    """Return (image, truth, info) for one random label."""
+    fonts = fonts or available_fonts()
+    truth = random_truth(rng)
+    megapixels = rng.choice([mp for mp in MEGAPIXEL_CHOICES if mp <= max_megapixels] or [max_megapixels])
+    scale = (megapixels * 1e6 / (LABEL_WIDTH * LABEL_HEIGHT)) ** 0.5
+    font_name = rng.choice(fonts)
+    image, info = degrade(draw_label(truth, scale, font_name), rng)
+    info.update({'font': font_name or "pillow-default", 'megapixels': megapixels,
+                 'size': list(image.size), 'text': "\n".join(label_lines(truth))})
+    return image, truth, info
+
+
+def generate_corpus(count, seed=0, max_megapixels=12):
+    """Yield (image, truth, info) for `count` labels, reproducibly for a given seed."""
+    rng = random.Random(seed)
+    fonts = available_fonts()
+    for _ in range(count):
+        yield generate_label(rng, fonts, max_megapixels)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="Output directory")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-megapixels", type=float, default=12)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.directory, exist_ok=True)
+    manifest = {}
+    for index, (image, truth, info) in enumerate(generate_corpus(args.count, args.seed, args.max_megapixels)):
+        name = f"label_{index:04d}.jpg"
+        image.save(os.path.join(args.directory, name), quality=90)
+        manifest[name] = {'truth': truth, 'info': info}
+        print(f"{name}: {info['size'][0]}x{info['size'][1]} {info['font']}", file=sys.stderr)
+    with open(os.path.join(args.directory, "labels.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
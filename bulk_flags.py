@@ -0,0 +1,131 @@
+"""Vectorized health-flag scoring for whole product catalogs.
+
+compute_health_flags scores one product per call. To re-score a catalog, for
+example after changing thresholds, products are stacked into an
+(N x RECORD_LENGTH) float matrix in the NutrientRecord layout (NaN = missing)
+and every rule in FLAG_RULES is applied to a whole column at once. The result
+is one bitmask per product: bit i set means FLAG_LABELS[i]. For the same
+thresholds, bitmask_labels() of a row equals compute_health_flags() of that
+product, flag for flag and in the same order.
+
+Thresholds default to pipeline.THRESHOLDS and can be overridden from a JSON
+file with the same shape:
+
+    python bulk_flags.py results.ndjson --thresholds thresholds.json --output rescored.ndjson
+"""
+import sys
+import copy
+import json
+import argparse
+
+import numpy as np
+
+from pipeline import THRESHOLDS
+from nutrient_record import DAILY_VALUE_OFFSET, FIELD_INDEX, RECORD_LENGTH, NutrientRecord
+
+# One rule per flag, in compute_health_flags' output order:
+# (flag, matrix column, divisor, comparison, threshold path, flag that suppresses this one)
+FLAG_RULES = (
+    ("⚠️ High in sugar", FIELD_INDEX['total_sugars'], 1, '>=', ('sugars', 'high'), None),
+    ("⚠️ Moderate sugar content", FIELD_INDEX['total_sugars'], 1, '>=', ('sugars', 'moderate'), "⚠️ High in sugar"),
+    ("⚠️ High in fat", FIELD_INDEX['total_fat'], 1, '>=', ('fat', 'high'), None),
+    ("⚠️ Moderate fat content", FIELD_INDEX['total_fat'], 1, '>=', ('fat', 'moderate'), "⚠️ High in fat"),
+    ("⚠️ High in saturated fat", FIELD_INDEX['saturated_fat'], 1, '>=', ('saturates', 'high'), None),
+    ("⚠️ High in sodium", FIELD_INDEX['sodium'], 1000, '>=', ('salt', 'high'), None),  # mg -> g
+    ("ℹ️ Low in protein", FIELD_INDEX['protein'], 1, '<', ('protein', 'low'), None),
+    ("✅ Good source of protein", FIELD_INDEX['protein'], 1, '>=', ('protein', 'low'), None),
+    ("✅ Good source of calcium", FIELD_INDEX['calcium'] + DAILY_VALUE_OFFSET, 1, '>=', ('calcium', 'good_source'), None),
+    ("✅ Good source of iron", FIELD_INDEX['iron'] + DAILY_VALUE_OFFSET, 1, '>=', ('iron', 'good_source'), None),
+)
+FLAG_LABELS = tuple(rule[0] for rule in FLAG_RULES)
+FLAG_BITS = {label: 1 << bit for bit, label in enumerate(FLAG_LABELS)}
+
+_COMPARISONS = {'>=': np.greater_equal, '<': np.less}
+
+
+def load_thresholds(path=None):
+    """Return pipeline.THRESHOLDS, with values from a JSON file of the same shape overriding it."""
+    thresholds = copy.deepcopy(THRESHOLDS)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        for group, values in overrides.items():
+            if group not in thresholds:
+                raise ValueError(f"Unknown threshold group {group!r} in {path}")
+            thresholds[group].update({name: float(value) for name, value in values.items()})
+    return thresholds
+
+
+def records_to_matrix(records):
+    """Stack NutrientRecords into an (N x RECORD_LENGTH) float64 matrix."""
+    buffer = b"".join(record.data.tobytes() for record in records)
+    return np.frombuffer(buffer, dtype=np.float64).reshape(-1, RECORD_LENGTH)
+
+
+def nutrients_to_matrix(products):
+    """Stack nested-dict nutrients (parse_nutrition_table output) or records into a matrix."""
+    return records_to_matrix(
+        product if isinstance(product, NutrientRecord) else NutrientRecord.from_dict(product)
+        for product in products
+    )
+
+
+def flag_bitmasks(matrix, thresholds=None):
+    """Score every row of the matrix and return a uint16 bitmask per product."""
+    thresholds = THRESHOLDS if thresholds is None else thresholds
+    matrix = np.asarray(matrix, dtype=np.float64)
+    masks = np.zeros(matrix.shape[0], dtype=np.uint16)
+    hits = {}
+    for bit, (label, column, divisor, comparison, (group, name), unless) in enumerate(FLAG_RULES):
+        values = matrix[:, column]
+        if divisor != 1:
+            values = values / divisor
+        # NaN compares False, so missing nutrients raise no flag
+        hit = _COMPARISONS[comparison](values, thresholds[group][name])
+        if unless is not None:
+            hit &= ~hits[unless]
+        hits[label] = hit
+        masks |= hit.astype(np.uint16) << bit
+    return masks
+
+
+def bitmask_labels(mask):
+    """Flag labels for one bitmask, in compute_health_flags' order."""
+    mask = int(mask)
+    return [label for bit, label in enumerate(FLAG_LABELS) if mask >> bit & 1]
+
+
+def flag_labels(matrix, thresholds=None):
+    """Score a matrix and return a list of flag lists, one per product."""
+    masks = flag_bitmasks(matrix, thresholds)
+    # Few distinct masks occur in practice: decode each once
+    decoded = {int(mask): bitmask_labels(mask) for mask in np.unique(masks)}
+    return [list(decoded[mask]) for mask in masks.tolist()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score health flags for a batch.py NDJSON output file")
+    parser.add_argument("input", help="NDJSON with a 'nutrients' object per line")
+    parser.add_argument("--thresholds", help="JSON file overriding pipeline.THRESHOLDS")
+    parser.add_argument("--output", help="Output NDJSON (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with open(args.input, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    labels = flag_labels(nutrients_to_matrix(row.get('nutrients') or {} for row in rows),
+                         load_thresholds(args.thresholds))
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for row, flags in zip(rows, labels):
+            row['flags'] = flags
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Re-scored {len(rows)} products", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
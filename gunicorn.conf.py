@@ -0,0 +1,32 @@
+"""Gunicorn settings for the JSON API: gunicorn -c gunicorn.conf.py api:application"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# OCR is CPU-bound, so one worker process per core; a few threads per worker
+# keep cores busy while requests wait on the summary API
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "gthread"
+threads = int(os.getenv("API_THREADS", "4"))
+
+# Each worker runs one OCR at a time (one per core overall); the other threads
+# queue briefly or answer 503 busy, and keep serving summaries and health checks.
+# Only that many OCR calls can hold an engine, so the pool is sized to match
+ocr_concurrency = os.environ.setdefault("OCR_CONCURRENCY", "1")
+os.environ.setdefault("OCR_POOL_SIZE", ocr_concurrency)
+
+timeout = int(os.getenv("API_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth from image decoding
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = "-"
+
+
+def post_worker_init(worker):
+    """Load deferred imports and start the OCR engines before the worker takes traffic."""
+    from pipeline import warmup
+    warmup()
@@ -0,0 +1,234 @@
+"""Shared HTTP client for upstream API calls.
+
+One requests.Session per process keeps TCP/TLS connections alive between
+calls. On top of it the client adds separate connect and read timeouts,
+retries with jittered exponential backoff that honour ``Retry-After``, and a
+circuit breaker that fails fast while the upstream is unhealthy instead of
+tying up a caller for the full timeout on every request.
+"""
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Defaults (overridable through environment variables)
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8.0
+DEFAULT_POOL_SIZE = 10
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 30.0
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Methods that may be repeated after the server could already have acted on them
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Upstream temporarily unavailable; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one trial request through after a cool-down."""
+
+    def __init__(self, failure_threshold=DEFAULT_BREAKER_THRESHOLD, reset_timeout=DEFAULT_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._trial_in_flight:
+                raise CircuitOpenError(max(remaining, 1.0))
+            # Half-open: this caller is the trial request
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.trips += 1
+            self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a Retry-After header (seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_connect_error(error):
+    """True when a transport error happened before the request reached the server."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class HTTPClient:
+    """Pooled keep-alive session with timeouts, retries and a circuit breaker."""
+
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, pool_size=DEFAULT_POOL_SIZE, breaker=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'attempts': 0, 'retries': 0, 'failures': 0, 'breaker_rejections': 0}
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """Send a request, retrying transport errors and RETRY_STATUSES responses.
+
+        Non-idempotent methods (POST) are only retried after connect errors, never
+        after a read timeout. The final response is returned whatever its status;
+        transport errors and CircuitOpenError propagate as requests exceptions.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        self._count('requests')
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_request()
+            except CircuitOpenError:
+                self._count('breaker_rejections')
+                raise
+
+            self._count('attempts')
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.breaker.record_failure()
+                self._count('failures')
+                if attempt >= self.max_retries or not (method.upper() in IDEMPOTENT_METHODS or is_connect_error(e)):
+                    raise
+                delay = self._backoff(attempt)
+            except Exception:
+                # TLS, header, redirect errors...: still a failure, and it must end a half-open trial
+                self.breaker.record_failure()
+                self._count('failures')
+                raise
+            else:
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                    self._count('failures')
+                else:
+                    # 429 means the upstream is healthy but rate limiting us
+                    self.breaker.record_success()
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None and retry_after > self.backoff_max:
+                    # Waiting that long would hold the caller; let it decide
+                    return response
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                response.close()
+
+            attempt += 1
+            self._count('retries')
+            time.sleep(delay)
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """Return request, retry, breaker and connection reuse counters."""
+        with self._lock:
+            stats = dict(self._counters)
+        new_connections = 0
+        pooled_requests = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                new_connections += pool.num_connections
+                pooled_requests += pool.num_requests
+        stats['new_connections'] = new_connections
+        stats['reused_connections'] = max(0, pooled_requests - new_connections)
+        stats['breaker_trips'] = self.breaker.trips
+        stats['breaker_state'] = self.breaker.state
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide HTTP client configured from the environment."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient(
+                connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+                read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)),
+                max_retries=int(os.getenv("HTTP_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+                backoff_base=float(os.getenv("HTTP_BACKOFF_BASE", DEFAULT_BACKOFF_BASE)),
+                backoff_max=float(os.getenv("HTTP_BACKOFF_MAX", DEFAULT_BACKOFF_MAX)),
+                pool_size=int(os.getenv("HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv("HTTP_BREAKER_THRESHOLD", DEFAULT_BREAKER_THRESHOLD)),
+                    reset_timeout=float(os.getenv("HTTP_BREAKER_RESET", DEFAULT_BREAKER_RESET)),
+                ),
+            )
+        return _client
@@ -0,0 +1,173 @@
+"""Background analysis jobs for the Streamlit UI.
+
+Analyses run on a shared, bounded thread pool instead of the Streamlit script
+thread. The UI keeps a Job handle in st.session_state and polls it on each
+rerun; the job exposes its stage, the parsed result as soon as OCR finishes
+and the summary text streamed so far. Jobs are keyed by image hash, so a
+double-click or rerun on the same upload reuses the job already in flight.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from pipeline import STATUS_OK, SummaryError, analyze_image
+from results_store import record_result
+from summarizers import get_summarizer
+
+# Defaults (overridable through environment variables)
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 16
+DEFAULT_MAX_FINISHED = 64
+
+STAGE_QUEUED = "queued"
+STAGE_OCR = "ocr"
+STAGE_SUMMARY = "summary"
+STAGE_DONE = "done"
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when too many jobs are already waiting or running."""
+
+
+class Job:
+    """Handle for one background analysis, safe to read from the UI thread while it runs."""
+
+    def __init__(self, key):
+        self.key = key
+        self.stage = STAGE_QUEUED
+        self.submitted_at = time.time()
+        self.future = None
+        self._result = None
+        self._chunks = []
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage):
+        self.stage = stage
+
+    def set_result(self, result):
+        with self._lock:
+            self._result = result
+
+    def append_text(self, chunk):
+        with self._lock:
+            self._chunks.append(chunk)
+
+    def partial_result(self):
+        """Return the analysis result published so far (None before OCR finishes)."""
+        with self._lock:
+            return self._result
+
+    def partial_text(self):
+        """Return the summary text streamed so far."""
+        with self._lock:
+            return "".join(self._chunks)
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def result(self):
+        """Return the final result dict; re-raises any error from the job."""
+        return self.future.result()
+
+    def succeeded(self):
+        """True once the job finished with an OK analysis and no exception or summary error."""
+        if not self.done() or self.future.exception() is not None:
+            return False
+        result = self.future.result()
+        return result.get('status') == STATUS_OK and result.get('summary_error') is None
+
+
+class JobManager:
+    """Bounded executor that deduplicates jobs by key and remembers recent results."""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 max_finished=DEFAULT_MAX_FINISHED):
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args):
+        """Run fn(job, *args) in the background and return its Job, reusing a live job with the same key."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and (not job.done() or job.succeeded()):
+                self._jobs.move_to_end(key)
+                return job
+
+            if self.pending() >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} analyses already queued")
+
+            job = Job(key)
+            job.future = self._executor.submit(fn, job, *args)
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._forget_finished()
+            return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def pending(self):
+        """Number of jobs queued or running."""
+        return sum(1 for job in self._jobs.values() if not job.done())
+
+    def _forget_finished(self):
+        finished = [key for key, job in self._jobs.items() if job.done()]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[key]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def run_analysis(job, image_bytes, api_key, backend=None):
+    """Job body: OCR, parse and flag the image, then stream the summary into the job."""
+    metrics.JOBS_IN_FLIGHT.inc()
+    try:
+        job.set_stage(STAGE_OCR)
+        result = analyze_image(image_bytes)
+        result['summary_error'] = None
+        job.set_result(result)
+
+        if result['status'] == STATUS_OK:
+            job.set_stage(STAGE_SUMMARY)
+            summarizer = get_summarizer(backend, api_key)
+            stats = {}
+            try:
+                with metrics.span("summary"):
+                    for chunk in summarizer.stream(result['nutrients'], result['flags'], stats):
+                        job.append_text(chunk)
+            except SummaryError as e:
+                result['summary_error'] = e
+            result['summary'] = job.partial_text() or None
+            result['summary_backend'] = stats.get('backend', summarizer.name)
+            result['summary_stats'] = stats
+            result['timings']['summary'] = stats.get('total_time')
+
+        record_result(result)
+        job.set_stage(STAGE_DONE)
+        return result
+    finally:
+        metrics.JOBS_IN_FLIGHT.dec()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Return the process-wide job manager configured from the environment."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(
+                max_workers=int(os.getenv("ANALYSIS_WORKERS", DEFAULT_WORKERS)),
+                max_pending=int(os.getenv("ANALYSIS_MAX_PENDING", DEFAULT_MAX_PENDING)),
+            )
+        return _manager
@@ -0,0 +1,175 @@
+"""Locate the Nutrition Facts panel in a photo so OCR only sees the label.
+
+FDA-style labels are a high-contrast black-on-white box crossed by long
+horizontal rules that start or end at the same x coordinates. The detector
+finds those rules on a small grayscale thumbnail, derives the panel rectangle
+from them and reports a confidence score; callers fall back to the full image
+when the score is low.
+"""
+import os
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+DETECT_MAX_SIZE = 1000
+RULE_MIN_LENGTH = 0.08     # shortest rule, as a fraction of the thumbnail width
+MAX_RULE_THICKNESS = 0.012 # thickest rule, as a fraction of the thumbnail's longer side
+SKEW_ROWS = 2              # vertical slack so slightly rotated rules still form long runs
+MIN_RULES = 5              # aligned rules needed for full confidence
+ALIGN_TOLERANCE = 0.04     # allowed edge misalignment, as a fraction of the panel width
+PADDING = 0.03             # margin around the panel, as a fraction of the panel width
+PAPER_MIN_LIGHT = 0.6      # share of light pixels for a row to count as label paper
+LABEL_MIN_CONFIDENCE = float(os.getenv("LABEL_MIN_CONFIDENCE", "0.6"))
+
+
+def otsu_threshold(pixels):
+    """Return the gray level that best separates dark ink from light background."""
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_dark = np.cumsum(histogram)
+    weight_light = weight_dark[-1] - weight_dark
+    sum_dark = np.cumsum(histogram * levels)
+    mean_dark = sum_dark / np.maximum(weight_dark, 1)
+    mean_light = (sum_dark[-1] - sum_dark) / np.maximum(weight_light, 1)
+    between_variance = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    return int(np.argmax(between_variance))
+
+
+def horizontal_runs(mask, min_length):
+    """Return (rows, starts, ends) of every run of True at least min_length long, in row order."""
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    # Starts and ends come out in row-major order, so they pair up one to one
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    keep = ends - starts >= min_length
+    return rows[keep], starts[keep], ends[keep]
+
+
+def vertical_opening(mask, size):
+    """Morphological opening with a vertical line of `size` rows: keeps only tall dark regions."""
+    height = mask.shape[0]
+    if height < size:
+        return np.zeros_like(mask)
+    counts = np.zeros((height + 1,) + mask.shape[1:], dtype=np.int32)
+    np.cumsum(mask, axis=0, out=counts[1:])
+    # eroded[y]: rows y .. y + size - 1 are all dark
+    eroded = (counts[size:] - counts[:-size]) == size
+
+    eroded_counts = np.zeros((eroded.shape[0] + 1,) + mask.shape[1:], dtype=np.int32)
+    np.cumsum(eroded, axis=0, out=eroded_counts[1:])
+    rows = np.arange(height)
+    low = np.maximum(rows - size + 1, 0)
+    high = np.minimum(rows, height - size) + 1
+    return (eroded_counts[high] - eroded_counts[low]) > 0
+
+
+def thin_line_mask(dark, thickness):
+    """Keep dark pixels whose vertical dark run is at most `thickness` rows tall.
+
+    Rules, bars and text pass this test; large dark regions such as background
+    or packaging do not.
+    """
+    lines = dark & ~vertical_opening(dark, thickness + 1)
+
+    # Let the rules of a slightly rotated label span a few rows
+    slack = lines.copy()
+    for shift in range(1, SKEW_ROWS + 1):
+        slack[shift:] |= lines[:-shift]
+        slack[:-shift] |= lines[shift:]
+    return slack
+
+
+def find_rules(lines, min_length):
+    """Merge overlapping long runs in neighbouring rows into rules: [top, bottom, start, end]."""
+    rules = []
+    open_rules = []
+    for row, start, end in zip(*horizontal_runs(lines, min_length)):
+        row, start, end = int(row), int(start), int(end)
+        open_rules = [rule for rule in open_rules if row - rule[1] <= 1]
+        for rule in open_rules:
+            overlap = min(end, rule[3]) - max(start, rule[2])
+            if overlap >= 0.5 * min(end - start, rule[3] - rule[2]):
+                rule[1] = row
+                rule[2], rule[3] = min(start, rule[2]), max(end, rule[3])
+                break
+        else:
+            rule = [row, row, start, end]
+            rules.append(rule)
+            open_rules.append(rule)
+    return rules
+
+
+def align_rules(rules):
+    """Return the largest group of rules sharing a left or right edge, plus its left and right."""
+    if not rules:
+        return [], 0, 0
+    extents = np.array([(start, end) for _, _, start, end in rules], dtype=np.float64)
+    best = None
+    for left, right in extents:
+        tolerance = ALIGN_TOLERANCE * (right - left)
+        # Rules under indented sub-nutrients only share the right edge, so one edge is enough
+        aligned = (
+            (np.abs(extents[:, 0] - left) <= tolerance) | (np.abs(extents[:, 1] - right) <= tolerance)
+        ) & (extents[:, 1] - extents[:, 0] >= 0.5 * (right - left))
+        if best is None or aligned.sum() > best.sum():
+            best = aligned
+    members = extents[best]
+    return [rule for rule, keep in zip(rules, best) if keep], members[:, 0].min(), members[:, 1].max()
+
+
+def detect_label_region(image):
+    """Return ((left, top, right, bottom), confidence) of the label panel, or (None, 0.0)."""
+    # Shrink before converting, so large photos are not copied to grayscale at full
+    # resolution: a cheap integer reduction first, then an exact resize of the small copy
+    factor = max(image.size) // DETECT_MAX_SIZE
+    small = image
+    if factor >= 2:
+        if small.mode not in ('L', 'RGB', 'RGBA'):
+            small = small.convert('RGB')
+        small = small.reduce(factor)
+    thumbnail = small.convert('L')
+    thumbnail.thumbnail((DETECT_MAX_SIZE, DETECT_MAX_SIZE))
+    scale = image.size[0] / thumbnail.size[0]
+    pixels = np.asarray(thumbnail, dtype=np.uint8)
+    height, width = pixels.shape
+
+    dark = pixels <= otsu_threshold(pixels)
+    thickness = max(2, int(MAX_RULE_THICKNESS * max(height, width)))
+    rules = find_rules(thin_line_mask(dark, thickness), RULE_MIN_LENGTH * width)
+    aligned, left, right = align_rules(rules)
+    if len(aligned) < 2:
+        return None, 0.0
+
+    top = min(rule[0] for rule in aligned)
+    bottom = max(rule[1] for rule in aligned)
+    confidence = min(1.0, len(aligned) / MIN_RULES)
+
+    # The title and footnote sit outside the outermost rules: grow the panel
+    # vertically for as long as the rows between its edges still look like paper
+    paper = 1.0 - dark[:, int(left):int(right)].mean(axis=1)
+    paper = np.convolve(paper, np.ones(thickness) / thickness, mode='same')
+    while top > 0 and paper[top - 1] >= PAPER_MIN_LIGHT:
+        top -= 1
+    while bottom < height - 1 and paper[bottom + 1] >= PAPER_MIN_LIGHT:
+        bottom += 1
+
+    pad = PADDING * (right - left)
+    box = (
+        max(0, int((left - pad) * scale)),
+        max(0, int((top - pad) * scale)),
+        min(image.size[0], int((right + pad) * scale)),
+        min(image.size[1], int((bottom + pad) * scale)),
+    )
+    return box, float(confidence)
+
+
+def crop_to_label(image, min_confidence=LABEL_MIN_CONFIDENCE):
+    """Crop to the detected label panel and return (image, box); box is None for the full-image fallback."""
+    box, confidence = detect_label_region(image)
+    if box is None or confidence < min_confidence:
+        return image, None
+    return image.crop(box), box
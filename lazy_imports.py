@@ -0,0 +1,31 @@
+"""Deferred imports for heavy dependencies.
+
+lazy_import("numpy") returns a module object right away but only executes
+the module on first attribute access, so importing the app, the API or the
+batch runner does not pay for numpy, requests or pytesseract (which pulls in
+pandas) until a code path actually uses them. warmup() in pipeline forces
+them in at process start where that is wanted.
+"""
+import sys
+import importlib.util
+
+
+def lazy_import(name):
+    """Return module `name`, loading it on first attribute access."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    # A regular import binds a submodule on its package; without this, a later
+    # "import PIL.Image" finds it in sys.modules but PIL.Image is missing
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -0,0 +1,337 @@
+"""In-process metrics for the label pipeline, exported in Prometheus text format.
+
+Pipeline stages are wrapped in spans (``with span("parse_nutrition_table"):``
+or the ``@timed(...)`` decorator) that feed a latency histogram per stage.
+Counters and gauges cover OCR calls, parse hit rate, summary API errors by
+status and in-flight work. Export is pull-based: ``GET /metrics`` on the JSON
+API, or a file rewritten every few seconds (``METRICS_FILE``) for the node
+exporter's textfile collector.
+
+Everything is off unless ``METRICS_ENABLED=1``; disabled, a span is a shared
+no-op object and every update returns after a single flag check.
+"""
+import os
+import sys
+import time
+import atexit
+import functools
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_FILE_INTERVAL = 15.0
+
+_enabled = os.getenv("METRICS_ENABLED", "0") == "1"
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    """Turn recording on or off at runtime (tests, benchmarks)."""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _check(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += self._samples(items)
+        return lines
+
+    def _samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in items]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        if not _enabled:
+            return
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        if not _enabled:
+            return
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        if not _enabled:
+            return
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+
+class Histogram(Metric):
+    """Cumulative-bucket latency histogram (seconds)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, *labels):
+        if not _enabled:
+            return
+        self._check(labels)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # [per-bucket counts..., sum, count]
+                state = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            return state[-1] if state else 0
+
+    def _samples(self, items):
+        lines = []
+        for labels, state in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets, state):
+                cumulative += hits
+                le = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{label_text} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self):
+        """Return every metric in Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "nutriscan_stage_seconds", "Wall time of pipeline stages", ("stage",)))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "nutriscan_stage_errors_total", "Pipeline stages that raised an exception", ("stage",)))
+OCR_CALLS = REGISTRY.register(Counter(
+    "nutriscan_ocr_calls_total", "Tesseract recognitions by outcome (ok, error)", ("result",)))
+OCR_PASSES = REGISTRY.register(Counter(
+    "nutriscan_ocr_passes_total",
+    "Images by the OCR pass that produced their text (fast, full, fast_after_full, near_duplicate)", ("pass",)))
+OCR_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "nutriscan_ocr_cache_lookups_total", "OCR cache lookups by outcome (hit, miss)", ("result",)))
+PHASH_LOOKUPS = REGISTRY.register(Counter(
+    "nutriscan_phash_lookups_total", "Near-duplicate label lookups by outcome (hit, miss)", ("result",)))
+PARSES = REGISTRY.register(Counter(
+    "nutriscan_parses_total", "Label texts parsed, by whether any nutrient was found (hit, miss)", ("result",)))
+SUMMARY_API_ERRORS = REGISTRY.register(Counter(
+    "nutriscan_summary_api_errors_total",
+    "Failed summary API calls by HTTP status, or timeout/network/circuit_open", ("status",)))
+SUMMARY_PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "nutriscan_summary_prompt_tokens", "Estimated input tokens per summary API request",
+    buckets=(50, 100, 150, 200, 250, 300, 400, 500, 750, 1000)))
+JOBS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "nutriscan_jobs_in_flight", "Background UI analyses currently running"))
+API_IN_FLIGHT = REGISTRY.register(Gauge(
+    "nutriscan_api_requests_in_flight", "JSON API requests currently being handled"))
+API_RESPONSES = REGISTRY.register(Counter(
+    "nutriscan_api_responses_total", "JSON API responses by route and status code", ("route", "status")))
+ADMISSION_ACTIVE = REGISTRY.register(Gauge(
+    "nutriscan_admission_active", "Calls holding an admission slot, by gate (ocr, summary)", ("gate",)))
+ADMISSION_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "nutriscan_admission_queue_depth", "Calls waiting for an admission slot, by gate", ("gate",)))
+ADMISSION_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "nutriscan_admission_wait_seconds", "Time admitted calls waited for a slot, by gate", ("gate",)))
+ADMISSION_REJECTIONS = REGISTRY.register(Counter(
+    "nutriscan_admission_rejections_total",
+    "Calls turned away as busy, by gate and reason (queue_full, wait_too_long, timeout)", ("gate", "reason")))
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Times a block into STAGE_SECONDS; exceptions also count in STAGE_ERRORS."""
+
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(self.stage)
+        return False
+
+
+def span(stage):
+    """Context manager timing one stage (a shared no-op when metrics are disabled)."""
+    return Span(stage) if _enabled else _NULL_SPAN
+
+
+def timed(stage):
+    """Decorator wrapping every call of a function in span(stage)."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def render():
+    return REGISTRY.render()
+
+
+def write_file(path):
+    """Atomically write the current metrics to path (for the node exporter textfile collector)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+def _write_periodically(path, interval, stop):
+    """Rewrite the metrics file every interval seconds until stop is set.
+
+    A write error (full disk, removed directory) is reported once per run of
+    failures and retried at the next interval instead of ending the thread.
+    """
+    failing = False
+    while not stop.wait(interval):
+        try:
+            write_file(path)
+        except OSError as e:
+            if not failing:
+                print(f"Could not write metrics file {path}: {e}", file=sys.stderr)
+            failing = True
+        else:
+            failing = False
+
+
+def start_file_writer(path, interval=DEFAULT_FILE_INTERVAL):
+    """Rewrite the metrics file every interval seconds and once more at exit.
+
+    ``{pid}`` in the path is replaced with the process id, so each worker of a
+    multi-process server writes its own file.
+    """
+    path = path.replace("{pid}", str(os.getpid()))
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    threading.Thread(target=_write_periodically, args=(path, interval, threading.Event()),
+                     name="metrics-file", daemon=True).start()
+    atexit.register(write_file, path)
+    return path
+
+
+_file_writer_lock = threading.Lock()
+_file_writer_path = None
+
+
+def ensure_file_writer():
+    """Start the METRICS_FILE writer once per process when metrics and the file are configured."""
+    global _file_writer_path
+    path = os.getenv("METRICS_FILE")
+    if not (_enabled and path):
+        return None
+    with _file_writer_lock:
+        if _file_writer_path is None:
+            _file_writer_path = start_file_writer(
+                path, float(os.getenv("METRICS_FILE_INTERVAL", DEFAULT_FILE_INTERVAL)))
+        return _file_writer_path
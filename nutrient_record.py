@@ -0,0 +1,142 @@
+"""Fixed-schema, array-backed nutrient record.
+
+parse_nutrition_table returns nested dicts such as
+``{'sodium': {'value': 470.0, 'daily_value_percent': 20.0}, ...}``, which cost
+a few kilobytes per product. NutrientRecord holds the same data in one array
+of doubles laid out by a stable field index, with NaN for anything missing,
+plus the two serving-size strings.
+
+A record is also a read-only Mapping with the dict layout, so code written
+against the dicts (prompt building, summaries, rendering) accepts it
+unchanged. to_dict() and from_dict() convert in both directions.
+"""
+from array import array
+from collections.abc import Mapping
+
+# Stable field index: append new nutrients at the end, never reorder (stored records depend on it)
+NUTRIENT_FIELDS = (
+    'calories', 'total_fat', 'saturated_fat', 'trans_fat', 'cholesterol', 'sodium',
+    'total_carbohydrate', 'dietary_fiber', 'total_sugars', 'added_sugars', 'protein',
+    'vitamin_d', 'calcium', 'iron', 'potassium',
+)
+FIELD_INDEX = {name: index for index, name in enumerate(NUTRIENT_FIELDS)}
+NUTRIENT_COUNT = len(NUTRIENT_FIELDS)
+
+# Array layout: amounts, then % Daily Values, then serving grams and servings per container
+DAILY_VALUE_OFFSET = NUTRIENT_COUNT
+SERVING_GRAMS = 2 * NUTRIENT_COUNT
+SERVINGS_PER_CONTAINER = SERVING_GRAMS + 1
+RECORD_LENGTH = SERVINGS_PER_CONTAINER + 1
+
+NAN = float('nan')
+_EMPTY = array('d', [NAN] * RECORD_LENGTH)
+
+
+class NutrientRecord(Mapping):
+    """Parsed label as a flat array of doubles (NaN = not on the label)."""
+
+    __slots__ = ('data', 'serving_amount', 'serving_unit')
+
+    def __init__(self, data=None, serving_amount=None, serving_unit=None):
+        self.data = array('d', _EMPTY) if data is None else data
+        self.serving_amount = serving_amount
+        self.serving_unit = serving_unit
+
+    def value(self, name):
+        """Amount of a nutrient, or None when it is missing."""
+        value = self.data[FIELD_INDEX[name]]
+        return None if value != value else value
+
+    def daily_value(self, name):
+        """% Daily Value of a nutrient, or None when it is missing."""
+        value = self.data[FIELD_INDEX[name] + DAILY_VALUE_OFFSET]
+        return None if value != value else value
+
+    def set(self, name, value, daily_value=None):
+        index = FIELD_INDEX[name]
+        self.data[index] = NAN if value is None else value
+        self.data[index + DAILY_VALUE_OFFSET] = NAN if daily_value is None else daily_value
+
+    def set_serving_size(self, amount, unit, grams):
+        self.serving_amount = amount
+        self.serving_unit = unit
+        self.data[SERVING_GRAMS] = grams
+
+    def set_servings_per_container(self, servings):
+        self.data[SERVINGS_PER_CONTAINER] = servings
+
+    @property
+    def serving_size(self):
+        grams = self.data[SERVING_GRAMS]
+        if grams != grams:
+            return None
+        return {'amount': self.serving_amount, 'unit': self.serving_unit, 'grams': int(grams)}
+
+    @property
+    def servings_per_container(self):
+        servings = self.data[SERVINGS_PER_CONTAINER]
+        return None if servings != servings else int(servings)
+
+    # Mapping interface with the layout of parse_nutrition_table's dicts
+
+    def __getitem__(self, key):
+        if key == 'serving_size' or key == 'servings_per_container':
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        index = FIELD_INDEX[key]
+        value = self.data[index]
+        if value != value:
+            raise KeyError(key)
+        entry = {'value': value}
+        daily_value = self.data[index + DAILY_VALUE_OFFSET]
+        if daily_value == daily_value:
+            entry['daily_value_percent'] = daily_value
+        return entry
+
+    def __contains__(self, key):
+        index = FIELD_INDEX.get(key)
+        if index is not None:
+            return self.data[index] == self.data[index]
+        if key == 'serving_size':
+            return self.data[SERVING_GRAMS] == self.data[SERVING_GRAMS]
+        if key == 'servings_per_container':
+            return self.data[SERVINGS_PER_CONTAINER] == self.data[SERVINGS_PER_CONTAINER]
+        return False
+
+    def __iter__(self):
+        data = self.data
+        if data[SERVING_GRAMS] == data[SERVING_GRAMS]:
+            yield 'serving_size'
+        if data[SERVINGS_PER_CONTAINER] == data[SERVINGS_PER_CONTAINER]:
+            yield 'servings_per_container'
+        for index, name in enumerate(NUTRIENT_FIELDS):
+            if data[index] == data[index]:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"NutrientRecord({self.to_dict()!r})"
+
+    def to_dict(self):
+        """Return the nested-dict form produced by parse_nutrition_table."""
+        return {key: self[key] for key in self}
+
+    @classmethod
+    def from_dict(cls, nutrients):
+        """Build a record from parse_nutrition_table's dict form; unknown keys are ignored."""
+        record = cls()
+        serving = nutrients.get('serving_size')
+        if serving:
+            record.set_serving_size(serving['amount'], serving['unit'], serving['grams'])
+        servings = nutrients.get('servings_per_container')
+        if servings is not None:
+            record.set_servings_per_container(servings)
+        for name in NUTRIENT_FIELDS:
+            entry = nutrients.get(name)
+            if entry:
+                record.set(name, entry['value'], entry.get('daily_value_percent'))
+        return record
@@ -0,0 +1,189 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Defaults (overridable through environment variables)
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_BYTES = 64 * 1024 * 1024
+
+
+def ocr_cache_key(image_bytes, settings):
+    """Build a content-addressed key from the upload bytes and OCR settings."""
+    digest = hashlib.sha256()
+    digest.update(image_bytes)
+    digest.update(b"\0")
+    digest.update(json.dumps(settings, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Two-tier cache of raw OCR text: a bounded LRU in memory and an optional directory on disk."""
+
+    def __init__(self, max_entries=DEFAULT_MEMORY_ENTRIES, disk_dir=None, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+        }
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    def get(self, key):
+        """Return cached OCR text for a key, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return self._memory[key]
+
+            text = self._read_disk(key)
+            if text is not None:
+                self._counters['disk_hits'] += 1
+                self._remember(key, text)
+                return text
+
+            self._counters['misses'] += 1
+            return None
+
+    def set(self, key, text):
+        """Store OCR text in both tiers."""
+        with self._lock:
+            self._counters['stores'] += 1
+            self._remember(key, text)
+            self._write_disk(key, text)
+
+    def stats(self):
+        """Return hit/miss counters and current tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_bytes'] = self._disk_bytes
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            for path, _, _ in self._disk_entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters['memory_evictions'] += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.txt")
+
+    def _disk_entries(self):
+        """List (path, mtime, size) for every file in the disk tier."""
+        entries = []
+        if not self.disk_dir:
+            return entries
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.txt'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            return None
+        # Touch the file so eviction treats it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return text
+
+    def _write_disk(self, key, text):
+        if not self.disk_dir:
+            return
+        data = text.encode('utf-8')
+        if len(data) > self.max_disk_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._disk_bytes += len(data) - previous
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove least recently used files until the disk tier fits its budget."""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[1])
+        self._disk_bytes = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            self._counters['disk_evictions'] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Return the process-wide OCR cache configured from the environment."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OCRCache(
+                max_entries=int(os.getenv("OCR_CACHE_MAX_ENTRIES", DEFAULT_MEMORY_ENTRIES)),
+                disk_dir=os.getenv("OCR_CACHE_DIR") or None,
+                max_disk_bytes=int(os.getenv("OCR_CACHE_MAX_BYTES", DEFAULT_DISK_BYTES)),
+            )
+        return _cache
@@ -0,0 +1,149 @@
+"""OCR engine backends.
+
+Two interchangeable backends expose the same image_to_string() call:
+
+- TesserocrPoolEngine keeps a pool of long-lived, pre-initialized Tesseract API
+  handles (via the optional ``tesserocr`` binding). Images are handed to the
+  library as in-memory buffers, so there is no fork, temp file or model reload
+  per call.
+- PytesseractEngine shells out to the ``tesseract`` binary through pytesseract.
+  It is the fallback when tesserocr is not installed.
+"""
+import os
+import queue
+import threading
+
+from lazy_imports import lazy_import
+
+# pytesseract imports pandas when it is installed; load it only if this backend is used
+pytesseract = lazy_import("pytesseract")
+
+try:
+    import tesserocr
+except ImportError:  # optional dependency
+    tesserocr = None
+
+DEFAULT_LANG = "eng"
+DEFAULT_PSM = 3  # Tesseract's default: fully automatic page segmentation
+
+
+def build_tesseract_config(psm=None, variables=None):
+    """Translate page segmentation mode and variables into tesseract CLI flags."""
+    parts = []
+    if psm is not None:
+        parts.append(f"--psm {int(psm)}")
+    for name, value in sorted((variables or {}).items()):
+        parts.append(f"-c {name}={value}")
+    return " ".join(parts)
+
+
+class PytesseractEngine:
+    """Runs the tesseract binary in a subprocess for every call."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang=DEFAULT_LANG):
+        self.lang = lang
+
+    def image_to_string(self, image, psm=None, variables=None):
+        return pytesseract.image_to_string(
+            image, lang=self.lang, config=build_tesseract_config(psm, variables)
+        )
+
+    def close(self):
+        pass
+
+
+class TesserocrPoolEngine:
+    """Pool of pre-initialized in-process Tesseract instances shared between threads."""
+
+    name = "tesserocr"
+
+    def __init__(self, pool_size=None, lang=DEFAULT_LANG):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.lang = lang
+        self.pool_size = max(1, pool_size or os.cpu_count() or 1)
+        self._idle = queue.Queue()
+        self._workers = []
+        for _ in range(self.pool_size):
+            worker = _TesserocrWorker(lang)
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def image_to_string(self, image, psm=None, variables=None):
+        worker = self._idle.get()
+        try:
+            return worker.recognize(image, psm, variables)
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+
+
+class _TesserocrWorker:
+    """One Tesseract API handle plus the variables it has overridden."""
+
+    def __init__(self, lang):
+        self.api = tesserocr.PyTessBaseAPI(lang=lang, psm=DEFAULT_PSM)
+        self._defaults = {}
+
+    def recognize(self, image, psm, variables):
+        self._configure(psm, variables or {})
+        try:
+            self.api.SetImage(image)
+            return self.api.GetUTF8Text()
+        finally:
+            self.api.Clear()
+
+    def _configure(self, psm, variables):
+        self.api.SetPageSegMode(DEFAULT_PSM if psm is None else int(psm))
+        # Restore variables a previous call changed but this one does not set
+        for name in list(self._defaults):
+            if name not in variables:
+                self.api.SetVariable(name, self._defaults.pop(name))
+        for name, value in variables.items():
+            if name not in self._defaults:
+                self._defaults[name] = self.api.GetVariableAsString(name) or ""
+            self.api.SetVariable(name, str(value))
+
+    def close(self):
+        self.api.End()
+
+
+def create_engine(backend="auto", pool_size=None, lang=DEFAULT_LANG):
+    """Create an OCR engine; 'auto' prefers the tesserocr pool and falls back to pytesseract."""
+    backend = backend.lower()
+    if backend == "pytesseract":
+        return PytesseractEngine(lang=lang)
+    if backend == "tesserocr":
+        return TesserocrPoolEngine(pool_size=pool_size, lang=lang)
+    if backend == "auto":
+        if tesserocr is not None:
+            try:
+                return TesserocrPoolEngine(pool_size=pool_size, lang=lang)
+            except RuntimeError:
+                pass
+        return PytesseractEngine(lang=lang)
+    raise ValueError(f"Unknown OCR backend: {backend}")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine(lang=DEFAULT_LANG):
+    """Return the process-wide OCR engine configured from the environment."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            pool_size = os.getenv("OCR_POOL_SIZE")
+            _engine = create_engine(
+                backend=os.getenv("OCR_BACKEND", "auto"),
+                pool_size=int(pool_size) if pool_size else None,
+                lang=lang,
+            )
+        return _engine
@@ -0,0 +1,214 @@
+"""Near-duplicate lookup of label photos by perceptual hash.
+
+The OCR cache only recognises byte-identical uploads. This index recognises the
+same label photographed again: each cropped label is reduced to a difference
+hash (dHash) of a small grayscale thumbnail, and previously read labels are kept
+in a BK-tree keyed by Hamming distance. A lookup within max_distance bits
+returns the stored OCR text, so Tesseract is skipped and the parse is the same
+as the first time.
+
+Nutrition panels share one template and differ mostly in their digits, which a
+thumbnail barely sees. The hash reliably recognises a photo that was resized or
+recompressed; a genuinely new photo of the same label is usually too far away,
+and a loose distance starts matching *different* products. Keep the distance
+strict (benchmarks.bench_phash measures both rates). A lookup that finds
+several different texts in range is treated as a miss.
+
+Entries are appended to a JSON-lines file and reloaded on start. Entries written
+with other OCR settings or another hash size are ignored when loading.
+"""
+import os
+import json
+import time
+import threading
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+
+HASH_SIZE = 16  # a 16 x 16 dHash: 256 bits
+# Gray levels a cell must exceed its neighbour by to set a bit. Labels are mostly
+# flat paper, and without a margin noise decides the bits of near-equal cells.
+DEAD_ZONE = 4
+
+# Defaults (overridable through environment variables)
+DEFAULT_MAX_DISTANCE = 2
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """Difference hash of an image as an int of hash_size**2 bits.
+
+    Each bit says whether a pixel of the (hash_size + 1) x hash_size grayscale
+    thumbnail is brighter than its right-hand neighbour by more than DEAD_ZONE.
+    """
+    thumbnail = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    thumbnail = np.asarray(thumbnail, dtype=np.float32)
+    bits = np.packbits(thumbnail[:, 1:] - thumbnail[:, :-1] > DEAD_ZONE)
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree of ints under Hamming distance.
+
+    Nodes are [hash, value, {distance: child}]; search prunes every subtree whose
+    edge distance is outside [d - max_distance, d + max_distance].
+    """
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key, value):
+        self._size += 1
+        node = [key, value, {}]
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming(key, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, key, max_distance):
+        """Return [(distance, value)] for every key within max_distance, nearest first."""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node_key, value, children = stack.pop()
+            distance = hamming(key, node_key)
+            if distance <= max_distance:
+                found.append((distance, value))
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda match: match[0])
+        return found
+
+
+class PerceptualHashIndex:
+    """BK-tree of label hashes to OCR text, persisted as an append-only JSON-lines file."""
+
+    def __init__(self, path=None, max_distance=DEFAULT_MAX_DISTANCE, settings_key="", hash_size=HASH_SIZE):
+        self.path = path
+        self.max_distance = max_distance
+        self.settings_key = settings_key
+        self.hash_size = hash_size
+        self._tree = BKTree()
+        self._texts = []
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'ambiguous': 0, 'stores': 0}
+        self._lookup_seconds = 0.0
+
+        if self.path:
+            self._load()
+
+    def lookup(self, image):
+        """Return (text, distance) of the nearest stored label, or (None, None) on a miss."""
+        key = dhash(image, self.hash_size)
+        return self.lookup_hash(key)
+
+    def lookup_hash(self, key):
+        start = time.perf_counter()
+        with self._lock:
+            matches = self._tree.search(key, self.max_distance)
+            if matches and any(self._texts[index] != self._texts[matches[0][1]] for _, index in matches):
+                # Several different labels in range: none of them can be trusted
+                self._counters['ambiguous'] += 1
+                matches = []
+            if matches:
+                self._counters['hits'] += 1
+                distance, index = matches[0]
+                result = self._texts[index], distance
+            else:
+                self._counters['misses'] += 1
+                result = None, None
+            self._lookup_seconds += time.perf_counter() - start
+        return result
+
+    def add(self, image, text):
+        """Index an image's OCR text."""
+        self.add_hash(dhash(image, self.hash_size), text)
+
+    def add_hash(self, key, text):
+        with self._lock:
+            self._insert(key, text)
+            self._counters['stores'] += 1
+            self._append(key, text)
+
+    def stats(self):
+        """Return lookup counters, hit rate, mean lookup latency and index size."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._tree)
+            lookup_seconds = self._lookup_seconds
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['mean_lookup_ms'] = lookup_seconds / lookups * 1000 if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        return len(self._tree)
+
+    def _insert(self, key, text):
+        self._texts.append(text)
+        self._tree.add(key, len(self._texts) - 1)
+
+    def _append(self, key, text):
+        if not self.path:
+            return
+        line = json.dumps({'hash': f"{key:x}", 'bits': self.hash_size ** 2, 'settings': self.settings_key,
+                           'text': text}, ensure_ascii=False)
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+    def _load(self):
+        try:
+            f = open(self.path, encoding='utf-8')
+        except OSError:
+            return
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash mid-append
+                if entry.get('bits') == self.hash_size ** 2 and entry.get('settings') == self.settings_key:
+                    self._insert(int(entry['hash'], 16), entry['text'])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_phash_index(settings_key=""):
+    """Return the process-wide near-duplicate index, or None when PHASH_INDEX_PATH is unset."""
+    global _index
+    path = os.getenv("PHASH_INDEX_PATH")
+    if not path:
+        return None
+    with _index_lock:
+        if _index is None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            _index = PerceptualHashIndex(
+                path=path,
+                max_distance=int(os.getenv("PHASH_MAX_DISTANCE", DEFAULT_MAX_DISTANCE)),
+                settings_key=settings_key,
+            )
+        return _index
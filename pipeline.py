@@ -0,0 +1,1129 @@
+"""NutriScan label pipeline: preprocessing, OCR, parsing, health flags and summarization.
+
+This module has no Streamlit dependency so it can be used from the UI, the batch
+CLI and any other headless entry point. Failures are raised as PipelineError
+subclasses instead of being rendered.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+from io import BytesIO
+from contextlib import contextmanager
+from operator import itemgetter
+
+import metrics
+from admission import ServerBusy, get_ocr_gate, get_summary_gate
+from lazy_imports import lazy_import
+from ocr_cache import get_ocr_cache, ocr_cache_key
+from phash_index import dhash, get_phash_index
+from summary_cache import get_summary_cache, summary_cache_key
+from ocr_engine import get_ocr_engine
+from label_detect import crop_to_label, LABEL_MIN_CONFIDENCE
+from nutrient_record import DAILY_VALUE_OFFSET, FIELD_INDEX, NAN, NutrientRecord
+
+# Heavy dependencies load on first use (see warmup)
+np = lazy_import("numpy")
+requests = lazy_import("requests")
+Image = lazy_import("PIL.Image")
+ImageEnhance = lazy_import("PIL.ImageEnhance")
+ImageOps = lazy_import("PIL.ImageOps")
+http_client = lazy_import("http_client")
+
+# Constants
+MISTRAL_API_URL = "https://api.mistral.ai/v1/chat/completions"
+MISTRAL_MODEL = "mistral-small-latest"
+MISTRAL_TEMPERATURE = 0.3
+MISTRAL_MAX_TOKENS = 300
+MISTRAL_STREAM = os.getenv("MISTRAL_STREAM", "1") == "1"
+
+# Summary prompt: "compact" (one line per nutrient group, token budget) or "verbose" (original wording)
+PROMPT_STYLE = os.getenv("PROMPT_STYLE", "compact")
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "250"))
+# Average characters per token of English prose; digits are one token each
+TOKEN_CHARS = 4
+# Compact prompt lines: nutrients sharing a line, and the short name used for each
+COMPACT_GROUPS = (
+    ('calories',),
+    ('total_fat', 'saturated_fat', 'trans_fat'),
+    ('cholesterol', 'sodium'),
+    ('total_carbohydrate', 'dietary_fiber', 'total_sugars', 'added_sugars'),
+    ('protein',),
+    ('vitamin_d', 'calcium', 'iron', 'potassium'),
+)
+COMPACT_NAMES = {
+    'calories': "calories", 'total_fat': "fat", 'saturated_fat': "sat fat", 'trans_fat': "trans fat",
+    'cholesterol': "cholesterol", 'sodium': "sodium", 'total_carbohydrate': "carbs", 'dietary_fiber': "fiber",
+    'total_sugars': "sugars", 'added_sugars': "added sugars", 'protein': "protein", 'vitamin_d': "vitamin D",
+    'calcium': "calcium", 'iron': "iron", 'potassium': "potassium",
+}
+# Left out first when a compact prompt is over budget; serving size, calories,
+# fat, sodium, carbs, sugars, protein and the flags are always kept
+PROMPT_DROP_ORDER = ('potassium', 'vitamin_d', 'iron', 'calcium', 'cholesterol', 'trans_fat', 'dietary_fiber',
+                     'added_sugars', 'saturated_fat', 'servings_per_container')
+COMPACT_SYSTEM_MESSAGE = """You explain nutrition labels to consumers in a friendly, cautious tone without jargon.
+Reply with: the serving size in grams first; 2-4 bullets on calories, fat/carbs/protein, sugar and sodium, vitamins/minerals and the flags, putting % Daily Value in plain words (e.g. "20% of your daily needs"); one practical tip last."""
+
+# Preprocessing and Tesseract settings (part of the OCR cache key)
+LABEL_DETECTION = os.getenv("LABEL_DETECTION", "1") == "1"
+PREPROCESS_METHOD = os.getenv("PREPROCESS_METHOD", "numpy")  # "numpy" or "legacy"
+PREPROCESS_MAX_SIZE = 1800
+# JPEG uploads are decoded at reduced scale, keeping the longer side at least this long
+DECODE_MAX_SIZE = int(os.getenv("DECODE_MAX_SIZE", PREPROCESS_MAX_SIZE))
+# Uploads that would decode to more pixels than this are rejected
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", 40_000_000))
+CONTRAST_FACTOR = 2.0
+SHARPNESS_FACTOR = 2.0
+CONTRAST_CLIP_PERCENT = 1.0
+UNSHARP_RADIUS = 2
+UNSHARP_AMOUNT = 1.0
+BINARIZE = os.getenv("PREPROCESS_BINARIZE", "0") == "1"
+BINARIZE_WINDOW = 31
+BINARIZE_OFFSET = 10
+TESSERACT_LANG = "eng"
+TESSERACT_PSM = 3
+TESSERACT_VARIABLES = {}
+
+# Adaptive OCR: a cheap pass first, the full pass only when too few core fields parse
+OCR_STRATEGY = os.getenv("OCR_STRATEGY", "adaptive")  # "adaptive" or "full"
+OCR_MIN_CORE_FIELDS = int(os.getenv("OCR_MIN_CORE_FIELDS", "5"))
+CORE_FIELDS = ('serving_size', 'calories', 'total_fat', 'sodium', 'total_carbohydrate', 'total_sugars', 'protein')
+FAST_PASS_MAX_SIZE = 1000
+FAST_PASS_PSM = 6  # a single uniform block of text: no page layout analysis
+# Digits, label punctuation and the letters of nutrient names, units and serving words
+FAST_PASS_WHITELIST = "".join(sorted(set(
+    "0123456789.,%()/"
+    "Nutrition Facts Amount per serving Servings Container Size Calories Daily Value "
+    "Total Fat Saturated Trans Cholesterol Sodium Carbohydrate Dietary Fiber Includes Added Sugars "
+    "Protein Vitamin D Calcium Iron Potassium mcg mg g cup tbsp tsp oz pieces bar bottle can package"
+) - {" "}))
+FAST_PASS_VARIABLES = {'tessedit_char_whitelist': FAST_PASS_WHITELIST}
+
+OCR_SETTINGS = {
+    'label_detection': [LABEL_DETECTION, LABEL_MIN_CONFIDENCE],
+    'decode_max_size': DECODE_MAX_SIZE,
+    'preprocess': PREPROCESS_METHOD,
+    'max_size': PREPROCESS_MAX_SIZE,
+    'contrast': CONTRAST_FACTOR,
+    'sharpness': SHARPNESS_FACTOR,
+    'clip_percent': CONTRAST_CLIP_PERCENT,
+    'unsharp': [UNSHARP_RADIUS, UNSHARP_AMOUNT],
+    'binarize': [BINARIZE, BINARIZE_WINDOW, BINARIZE_OFFSET],
+    'lang': TESSERACT_LANG,
+    'psm': TESSERACT_PSM,
+    'variables': TESSERACT_VARIABLES,
+    'strategy': [OCR_STRATEGY, OCR_MIN_CORE_FIELDS, FAST_PASS_MAX_SIZE, FAST_PASS_PSM, FAST_PASS_WHITELIST],
+}
+
+# Nutrient thresholds (per 100g; protein in grams, calcium and iron in % Daily Value)
+THRESHOLDS = {
+    'sugars': {'high': 22.5, 'moderate': 5.0},
+    'fat': {'high': 17.5, 'moderate': 3.0},
+    'saturates': {'high': 5.0},
+    'salt': {'high': 1.5},
+    'protein': {'low': 5.0},
+    'calcium': {'good_source': 20.0},
+    'iron': {'good_source': 20.0},
+}
+
+# Result statuses reported by analyze_image
+STATUS_OK = "ok"
+STATUS_OCR_FAILED = "ocr_failed"
+STATUS_IMAGE_TOO_LARGE = "image_too_large"
+STATUS_NO_TEXT = "no_text"
+STATUS_NO_NUTRIENTS = "no_nutrients"
+STATUS_SUMMARY_FAILED = "summary_failed"
+
+# Which OCR pass produced a result's text
+OCR_PASS_FAST = "fast"
+OCR_PASS_FULL = "full"
+# Escalated to the full pass, but the fast pass had read more of the label
+OCR_PASS_FAST_AFTER_FULL = "fast_after_full"
+OCR_PASS_CACHED = "cache"
+OCR_PASS_NEAR_DUPLICATE = "near_duplicate"
+
+
+class PipelineError(Exception):
+    """Base class for errors raised by pipeline stages."""
+
+
+class OCRError(PipelineError):
+    """Raised when Tesseract fails to process an image."""
+
+
+class ImageTooLargeError(PipelineError):
+    """Raised when an upload exceeds MAX_IMAGE_PIXELS even at reduced decoding scale."""
+
+
+class SummaryError(PipelineError):
+    """Raised when the summarization API call fails.
+
+    retry_after (seconds) is set when the call was not attempted because the
+    service is busy or its circuit breaker is open.
+    """
+
+    def __init__(self, message, status_code=None, details=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+        self.retry_after = retry_after
+
+
+def image_hash(image_bytes):
+    """Return the SHA-256 hex digest identifying an uploaded image."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+def decode_image(image_bytes, max_size=None, max_pixels=None):
+    """Decode upload bytes at the smallest scale the pipeline can use.
+    
+    JPEGs use draft mode: libjpeg scales by 1/2, 1/4 or 1/8 in the DCT domain
+    while keeping the longer side at least max_size (default DECODE_MAX_SIZE),
+    so a 12 MP photo is never held at full size. The pixel guard is checked on
+    the header before any pixel data is decoded; EXIF orientation is applied last.
+    """
+    max_size = DECODE_MAX_SIZE if max_size is None else max_size
+    max_pixels = MAX_IMAGE_PIXELS if max_pixels is None else max_pixels
+    try:
+        image = Image.open(BytesIO(image_bytes))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+    
+    width, height = image.size
+    if image.format == 'JPEG' and max(width, height) > max_size:
+        ratio = max_size / max(width, height)
+        image.draft(image.mode, (max(1, round(width * ratio)), max(1, round(height * ratio))))
+    
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image is too large ({width}x{height} pixels); the limit is {max_pixels / 1e6:g} megapixels."
+        )
+    image.load()
+    ImageOps.exif_transpose(image, in_place=True)
+    return image
+
+@metrics.timed("preprocess_image")
+def preprocess_image(image, method=None):
+    """Enhanced image preprocessing for better OCR results."""
+    method = method or PREPROCESS_METHOD
+    if method == "numpy":
+        return preprocess_image_numpy(image)
+    if method == "legacy":
+        return preprocess_image_legacy(image)
+    raise ValueError(f"Unknown preprocessing method: {method}")
+
+def preprocess_image_legacy(image):
+    """Original PIL pipeline: filters run at full resolution, resize last."""
+    # Convert to grayscale
+    img = image.convert('L')
+    
+    # Enhance contrast
+    enhancer = ImageEnhance.Contrast(img)
+    img = enhancer.enhance(CONTRAST_FACTOR)
+    
+    # Enhance sharpness
+    enhancer = ImageEnhance.Sharpness(img)
+    img = enhancer.enhance(SHARPNESS_FACTOR)
+    
+    # Resize if image is too large
+    max_size = PREPROCESS_MAX_SIZE
+    width, height = img.size
+    if max(width, height) > max_size:
+        ratio = max_size / max(width, height)
+        new_size = (int(width * ratio), int(height * ratio))
+        img = img.resize(new_size, Image.Resampling.LANCZOS)
+    
+    return img
+
+def preprocess_image_numpy(image, binarize=None):
+    """Staged pipeline: downsample first, then vectorized contrast, sharpening and binarization."""
+    # Downsample before anything else so every later stage touches fewer pixels
+    width, height = image.size
+    if max(width, height) > PREPROCESS_MAX_SIZE:
+        if image.mode not in ('L', 'RGB', 'RGBA'):
+            image = image.convert('RGB')
+        # Cheap integer box reduction first, then an exact high-quality resize
+        factor = max(width, height) // PREPROCESS_MAX_SIZE
+        if factor >= 2:
+            image = image.reduce(factor)
+        ratio = PREPROCESS_MAX_SIZE / max(width, height)
+        new_size = (int(width * ratio), int(height * ratio))
+        img = image.convert('L').resize(new_size, Image.Resampling.LANCZOS)
+    else:
+        img = image.convert('L')
+    
+    pixels = np.asarray(img, dtype=np.uint8)
+    pixels = stretch_contrast(pixels, CONTRAST_CLIP_PERCENT)
+    pixels = unsharp_mask(pixels, UNSHARP_RADIUS, UNSHARP_AMOUNT)
+    
+    if BINARIZE if binarize is None else binarize:
+        pixels = adaptive_binarize(pixels, BINARIZE_WINDOW, BINARIZE_OFFSET)
+    
+    return Image.fromarray(pixels, mode='L')
+
+def stretch_contrast(pixels, clip_percent):
+    """Linearly stretch the [clip, 100 - clip] percentile range to 0-255 via a lookup table."""
+    # Histogram in row blocks: bincount widens to int64, so a single call would use 8 bytes per pixel
+    histogram = np.zeros(256, dtype=np.int64)
+    for start in range(0, pixels.shape[0], 256):
+        histogram += np.bincount(pixels[start:start + 256].ravel(), minlength=256)
+    cumulative = np.cumsum(histogram)
+    total = cumulative[-1]
+    low = int(np.searchsorted(cumulative, total * clip_percent / 100.0))
+    high = int(np.searchsorted(cumulative, total * (100.0 - clip_percent) / 100.0))
+    if high <= low:
+        return pixels
+    
+    scale = 255.0 / (high - low)
+    lut = np.clip((np.arange(256) - low) * scale, 0, 255).astype(np.uint8)
+    return lut[pixels]
+
+def box_mean(pixels, radius, band_rows=256):
+    """Mean over a (2r+1)x(2r+1) window using integral images; edges are replicated.
+    
+    Works in horizontal bands so the int32 integral image stays small.
+    """
+    size = 2 * radius + 1
+    height, width = pixels.shape
+    padded = np.pad(pixels, radius, mode='edge')
+    means = np.empty_like(pixels)
+    
+    for top in range(0, height, band_rows):
+        rows = min(band_rows, height - top)
+        band = padded[top:top + rows + size - 1]
+        
+        integral = np.zeros((rows + size, width + size), dtype=np.int32)
+        np.cumsum(band, axis=0, dtype=np.int32, out=integral[1:, 1:])
+        np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+        
+        window_sum = integral[size:, size:] - integral[:rows, size:]
+        window_sum -= integral[size:, :width]
+        window_sum += integral[:rows, :width]
+        means[top:top + rows] = window_sum // (size * size)
+    
+    return means
+
+def unsharp_mask(pixels, radius, amount):
+    """Sharpen by adding back the difference between the image and its local mean."""
+    detail = pixels.astype(np.int16)
+    detail -= box_mean(pixels, radius)
+    if amount != 1.0:
+        detail = (detail * np.float32(amount)).astype(np.int16)
+    detail += pixels
+    np.clip(detail, 0, 255, out=detail)
+    return detail.astype(np.uint8)
+
+def adaptive_binarize(pixels, window, offset):
+    """Threshold each pixel against its local mean minus an offset (dark text becomes 0)."""
+    threshold = box_mean(pixels, window // 2).astype(np.int16) - offset
+    return np.where(pixels > threshold, 255, 0).astype(np.uint8)
+
+def _clean_ocr_text(text):
+    """Clean and normalize OCR output (untimed; see clean_ocr_text)."""
+    # Remove junk characters but keep %
+    text = re.sub(r'[^\w\s.,%()-]', '', text)
+    
+    # Join hyphenated words
+    text = re.sub(r'(\w)-\s*\n\s*(\w)', r'\1\2', text)
+    
+    # Normalize spaces and newlines
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n', '\n', text)
+    
+    return text.strip()
+
+@metrics.timed("clean_ocr_text")
+def clean_ocr_text(text):
+    """Clean and normalize OCR output."""
+    return _clean_ocr_text(text)
+
+@metrics.timed("extract_text")
+def extract_text(image, psm=None, variables=None):
+    """Extract text from image using enhanced OCR."""
+    try:
+        engine = get_ocr_engine(lang=TESSERACT_LANG)
+        text = engine.image_to_string(
+            image,
+            psm=TESSERACT_PSM if psm is None else psm,
+            variables=TESSERACT_VARIABLES if variables is None else variables
+        )
+    except Exception as e:
+        metrics.OCR_CALLS.inc("error")
+        raise OCRError(f"OCR Error: {str(e)}") from e
+    metrics.OCR_CALLS.inc("ok")
+    return text.strip()
+
+def count_core_fields(text):
+    """Number of CORE_FIELDS that parse out of raw OCR text.
+    
+    Uses the untimed cleaner and scanner, so the stage metrics count one parse per
+    request rather than one per OCR pass.
+    """
+    found, serving_size, _ = _scan_nutrition_table(_clean_ocr_text(text))
+    if serving_size is not None:
+        found['serving_size'] = serving_size
+    return sum(1 for field in CORE_FIELDS if field in found)
+
+def extract_text_adaptive(image, min_core_fields=None):
+    """OCR a preprocessed image with a fast pass first, escalating to the full pass if needed.
+    
+    The fast pass reads a copy downscaled to FAST_PASS_MAX_SIZE with a single-block
+    page segmentation and a character whitelist. When fewer than min_core_fields
+    (default OCR_MIN_CORE_FIELDS) core fields parse from it, the full-resolution
+    default pass runs as well, and whichever text reads more core fields is kept.
+    Returns (text, ocr_pass).
+    """
+    min_core_fields = OCR_MIN_CORE_FIELDS if min_core_fields is None else min_core_fields
+    small = image
+    width, height = image.size
+    if max(width, height) > FAST_PASS_MAX_SIZE:
+        ratio = FAST_PASS_MAX_SIZE / max(width, height)
+        small = image.resize((int(width * ratio), int(height * ratio)), Image.Resampling.LANCZOS)
+    
+    fast_text = extract_text(small, psm=FAST_PASS_PSM, variables=FAST_PASS_VARIABLES)
+    fast_fields = count_core_fields(fast_text)
+    if fast_fields >= min_core_fields:
+        return fast_text, OCR_PASS_FAST
+    
+    full_text = extract_text(image)
+    # The full pass was paid for either way; keep whichever text reads more of the label
+    if count_core_fields(full_text) < fast_fields:
+        return fast_text, OCR_PASS_FAST_AFTER_FULL
+    return full_text, OCR_PASS_FULL
+
+def run_ocr(image, image_bytes):
+    """Preprocess and OCR an image, reusing cached text for repeat uploads.
+    
+    When PHASH_INDEX_PATH is set, a cropped label that is a near duplicate of one
+    read before reuses that label's text instead of running Tesseract.
+    Returns (text, ocr_pass) where ocr_pass is OCR_PASS_FAST, OCR_PASS_FULL,
+    OCR_PASS_FAST_AFTER_FULL, OCR_PASS_CACHED or OCR_PASS_NEAR_DUPLICATE.
+    """
+    cache = get_ocr_cache()
+    engine = get_ocr_engine(lang=TESSERACT_LANG)
+    settings = dict(OCR_SETTINGS, engine=engine.name)
+    key = ocr_cache_key(image_bytes, settings)
+    
+    text = cache.get(key)
+    if text is not None:
+        metrics.OCR_CACHE_LOOKUPS.inc("hit")
+        return text, OCR_PASS_CACHED
+    metrics.OCR_CACHE_LOOKUPS.inc("miss")
+    
+    # Crop to the nutrition panel when it can be found confidently
+    if LABEL_DETECTION:
+        with metrics.span("crop_to_label"):
+            image, _ = crop_to_label(image)
+    
+    # Same label photographed again: reuse its text by perceptual hash
+    index = get_phash_index(settings_key=ocr_cache_key(b"", settings))
+    if index is not None:
+        with metrics.span("phash"):
+            label_hash = dhash(image, index.hash_size)
+            text, _ = index.lookup_hash(label_hash)
+        metrics.PHASH_LOOKUPS.inc("miss" if text is None else "hit")
+        if text is not None:
+            metrics.OCR_PASSES.inc(OCR_PASS_NEAR_DUPLICATE)
+            cache.set(key, text)
+            return text, OCR_PASS_NEAR_DUPLICATE
+    
+    # CPU-bound from here on: wait for an OCR slot, or raise ServerBusy
+    with get_ocr_gate().slot():
+        processed_image = preprocess_image(image)
+        if OCR_STRATEGY == "adaptive":
+            text, ocr_pass = extract_text_adaptive(processed_image)
+        else:
+            text, ocr_pass = extract_text(processed_image), OCR_PASS_FULL
+    metrics.OCR_PASSES.inc(ocr_pass)
+    cache.set(key, text)
+    # Only index readings good enough to hand to the next photo of this label
+    if index is not None and count_core_fields(text) >= OCR_MIN_CORE_FIELDS:
+        index.add_hash(label_hash, text)
+    return text, ocr_pass
+
+def safe_float_convert(value_str):
+    """Safely convert string to float, handling various formats."""
+    try:
+        clean_str = re.sub(r'[^\d.,]', '', value_str)
+        clean_str = clean_str.replace(',', '.')
+        return float(clean_str)
+    except (ValueError, TypeError):
+        return None
+
+# Label spellings, expected unit and whether only whole numbers are accepted, per nutrient.
+# Order defines the key order of parse_nutrition_table's result.
+NUTRIENT_LABELS = {
+    'calories': (('Calories',), None, True),
+    'total_fat': (('Total Fat',), 'g', False),
+    'saturated_fat': (('Saturated Fat',), 'g', False),
+    'trans_fat': (('Trans Fat',), 'g', False),
+    'cholesterol': (('Cholesterol',), 'mg', True),
+    'sodium': (('Sodium',), 'mg', True),
+    'total_carbohydrate': (('Total Carbohydrates', 'Total Carbohydrate'), 'g', False),
+    'dietary_fiber': (('Dietary Fiber',), 'g', False),
+    'total_sugars': (('Total Sugars',), 'g', False),
+    'added_sugars': (('Added Sugars',), 'g', False),
+    'protein': (('Protein',), 'g', False),
+    'vitamin_d': (('Vitamin D',), 'mcg', False),
+    'calcium': (('Calcium',), 'mg', True),
+    'iron': (('Iron',), 'mg', False),
+    'potassium': (('Potassium',), 'mg', True),
+}
+
+_LABEL_TO_NUTRIENT = {
+    label.lower(): nutrient
+    for nutrient, (labels, _, _) in NUTRIENT_LABELS.items()
+    for label in labels
+}
+
+def _literal_trie_pattern(words):
+    """Build a regex alternation factored by common prefixes (e.g. 'c(?:al(?:cium|ories)|...)')."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{pattern})?' if '' in node else pattern
+    
+    return emit(trie)
+
+# One tokenizer for every field; the lookahead rejects most positions before any alternative is tried
+_LABEL_TOKEN_RE = re.compile(
+    r'(?=[' + ''.join(sorted({label[0] for label in _LABEL_TO_NUTRIENT} | {'s'})) + r'0-9])(?:'
+    r'(?P<name>' + _literal_trie_pattern(_LABEL_TO_NUTRIENT) + r')'
+    # A count of servings is not the nutrient's amount: leave it to the servings alternative
+    r'[:\s]*(?!\d+\s*servings? per container)(?P<amount>\d+\.?\d*)(?P<unit>\s*(?:mcg|µg)|mg|g)?'
+    r'|(?P<percent>\d+)%'
+    r'|Serving size[:\s]*(?P<serving_amount>[\d/]+)\s*(?P<serving_unit>[a-zA-Z]+)\s*\((?P<serving_grams>\d+)g\)'
+    r'|(?P<servings>\d+)\s*servings? per container'
+    r')',
+    re.IGNORECASE
+)
+
+def _nutrient_amount(nutrient, amount, unit):
+    """Validate a matched amount/unit against the nutrient's format and return its value."""
+    _, expected_unit, whole_number = NUTRIENT_LABELS[nutrient]
+    if expected_unit is None:
+        # Unitless (calories): keep the leading whole number
+        return safe_float_convert(amount.split('.')[0])
+    if unit is None:
+        return None
+    unit = unit.lower()
+    if expected_unit == 'mcg':
+        if unit.strip() not in ('mcg', 'µg'):
+            return None
+    elif unit != expected_unit:
+        return None
+    if whole_number and '.' in amount:
+        return None
+    return safe_float_convert(amount)
+
+def _scan_nutrition_table(text):
+    """Single pass over the text; returns (found, serving_size, servings_per_container).
+    
+    Each nutrient takes its first well-formed occurrence, and its % Daily Value is
+    the first percentage that follows it before the next nutrient.
+    
+    Unlike the original per-pattern parser, a nutrient without a percentage of its
+    own no longer takes the next nutrient's, and a percentage wrapped onto the next
+    line is still attributed. Values are unchanged (see test_parser.py).
+    """
+    found = {}
+    serving_size = None
+    servings_per_container = None
+    current = None  # nutrient still waiting for its % Daily Value
+    
+    for match in _LABEL_TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'amount' or kind == 'unit':
+            name, amount, unit = match.group('name', 'amount', 'unit')
+            nutrient = _LABEL_TO_NUTRIENT[name.lower()]
+            current = None
+            if nutrient not in found:
+                value = _nutrient_amount(nutrient, amount, unit)
+                if value is not None:
+                    found[nutrient] = {'value': value}
+                    current = nutrient
+        elif kind == 'percent':
+            if current is not None:
+                found[current]['daily_value_percent'] = safe_float_convert(match.group('percent'))
+                current = None
+        elif kind == 'serving_grams':
+            if serving_size is None:
+                serving_size = {
+                    'amount': match.group('serving_amount'),
+                    'unit': match.group('serving_unit'),
+                    'grams': int(match.group('serving_grams'))
+                }
+        elif kind == 'servings':
+            if servings_per_container is None:
+                servings_per_container = int(match.group('servings'))
+    
+    return found, serving_size, servings_per_container
+
+@metrics.timed("parse_nutrition_table")
+def parse_nutrition_table(text):
+    """Parse nutrition information in a single pass over the text into nested dicts."""
+    found, serving_size, servings_per_container = _scan_nutrition_table(text)
+    nutrients = {}
+    if serving_size is not None:
+        nutrients['serving_size'] = serving_size
+    if servings_per_container is not None:
+        nutrients['servings_per_container'] = servings_per_container
+    for nutrient in NUTRIENT_LABELS:
+        if nutrient in found:
+            nutrients[nutrient] = found[nutrient]
+    
+    return nutrients
+
+@metrics.timed("parse_nutrition_table")
+def parse_nutrition_record(text):
+    """Parse nutrition information straight into a compact NutrientRecord (no intermediate dicts)."""
+    found, serving_size, servings_per_container = _scan_nutrition_table(text)
+    record = NutrientRecord()
+    if serving_size is not None:
+        record.set_serving_size(serving_size['amount'], serving_size['unit'], serving_size['grams'])
+    if servings_per_container is not None:
+        record.set_servings_per_container(servings_per_container)
+    data = record.data
+    for nutrient, entry in found.items():
+        index = FIELD_INDEX[nutrient]
+        data[index] = entry['value']
+        if 'daily_value_percent' in entry:
+            data[index + DAILY_VALUE_OFFSET] = entry['daily_value_percent']
+    return record
+
+def _health_flag_inputs(nutrients):
+    """Return (sugars, fat, saturated fat, sodium, protein, calcium % DV, iron % DV), NaN where missing."""
+    # NutrientRecord is an ABC (Mapping), so rule out plain dicts with the cheap check first
+    if not isinstance(nutrients, dict) and isinstance(nutrients, NutrientRecord):
+        return _get_flag_inputs(nutrients.data)
+    get = nutrients.get
+    sugars, fat, saturated_fat, sodium, protein, calcium, iron = (
+        get('total_sugars'), get('total_fat'), get('saturated_fat'), get('sodium'),
+        get('protein'), get('calcium'), get('iron'),
+    )
+    return (
+        sugars['value'] if sugars else NAN,
+        fat['value'] if fat else NAN,
+        saturated_fat['value'] if saturated_fat else NAN,
+        sodium['value'] if sodium else NAN,
+        protein['value'] if protein else NAN,
+        calcium.get('daily_value_percent', NAN) if calcium else NAN,
+        iron.get('daily_value_percent', NAN) if iron else NAN,
+    )
+
+# Record slots read by _health_flag_inputs, in the same order
+_get_flag_inputs = itemgetter(*(
+    [FIELD_INDEX[name] for name in ('total_sugars', 'total_fat', 'saturated_fat', 'sodium', 'protein')]
+    + [FIELD_INDEX[name] + DAILY_VALUE_OFFSET for name in ('calcium', 'iron')]
+))
+
+@metrics.timed("compute_health_flags")
+def compute_health_flags(nutrients, thresholds=None):
+    """Compute health flags based on nutrient values (nested dicts or a NutrientRecord).
+    
+    Missing nutrients read as NaN, which fails every comparison, so they raise no flag.
+    thresholds defaults to THRESHOLDS; bulk_flags scores whole catalogs with the same rules.
+    """
+    thresholds = THRESHOLDS if thresholds is None else thresholds
+    sugars, fat, saturated_fat, sodium, protein, calcium_dv, iron_dv = _health_flag_inputs(nutrients)
+    flags = []
+    
+    if sugars >= thresholds['sugars']['high']:
+        flags.append("⚠️ High in sugar")
+    elif sugars >= thresholds['sugars']['moderate']:
+        flags.append("⚠️ Moderate sugar content")
+    
+    if fat >= thresholds['fat']['high']:
+        flags.append("⚠️ High in fat")
+    elif fat >= thresholds['fat']['moderate']:
+        flags.append("⚠️ Moderate fat content")
+    
+    if saturated_fat >= thresholds['saturates']['high']:
+        flags.append("⚠️ High in saturated fat")
+    
+    if sodium / 1000 >= thresholds['salt']['high']:  # Convert mg to g
+        flags.append("⚠️ High in sodium")
+    
+    # Add protein assessment
+    if protein < thresholds['protein']['low']:
+        flags.append("ℹ️ Low in protein")
+    elif protein >= thresholds['protein']['low']:
+        flags.append("✅ Good source of protein")
+    
+    # Add vitamin and mineral assessments
+    if calcium_dv >= thresholds['calcium']['good_source']:
+        flags.append("✅ Good source of calcium")
+    
+    if iron_dv >= thresholds['iron']['good_source']:
+        flags.append("✅ Good source of iron")
+    
+    return flags
+
+def estimate_tokens(text):
+    """Rough input-token count of text for the Mistral tokenizer (no tokenizer dependency)."""
+    digits = sum(1 for char in text if char.isdigit())
+    return digits + -(-(len(text) - digits) // TOKEN_CHARS)
+
+def build_mistral_prompt(nutrients, flags, stats=None):
+    """Build the (system, user) summary prompt in PROMPT_STYLE.
+    
+    The optional stats dict receives prompt_tokens (estimated) and, for the
+    compact style, prompt_dropped: nutrients left out to fit PROMPT_TOKEN_BUDGET.
+    """
+    if PROMPT_STYLE == "verbose":
+        system_message, user_message = build_verbose_prompt(nutrients, flags)
+    else:
+        system_message, user_message = build_compact_prompt(nutrients, flags, stats=stats)
+    if stats is not None:
+        stats['prompt_tokens'] = estimate_tokens(system_message) + estimate_tokens(user_message)
+    return system_message, user_message
+
+def _compact_amount(data, unit):
+    value = data['value']
+    text = f"{int(value) if float(value).is_integer() else value:g}{unit or ''}"
+    percent = data.get('daily_value_percent')
+    if percent is not None:
+        text += f" [{int(percent) if float(percent).is_integer() else percent:g}%]"
+    return text
+
+def _compact_user_message(nutrients, flags, dropped):
+    lines = ["Label per serving, [%DV]:"]
+    serving = nutrients.get('serving_size')
+    if serving:
+        line = f"serving {serving['amount']} {serving['unit']} ({serving['grams']}g)"
+        if 'servings_per_container' in nutrients and 'servings_per_container' not in dropped:
+            line += f", {nutrients['servings_per_container']} per container"
+        lines.append(line)
+    for group in COMPACT_GROUPS:
+        items = [f"{COMPACT_NAMES[name]} {_compact_amount(nutrients[name], NUTRIENT_LABELS[name][1])}"
+                 for name in group if name not in dropped and 'value' in (nutrients.get(name) or ())]
+        if items:
+            lines.append(", ".join(items))
+    if flags:
+        # Without the leading emoji, which the ASCII prompt cleaning would mangle
+        lines.append("flags: " + "; ".join(flag.split(" ", 1)[-1] for flag in flags))
+    return "\n".join(lines)
+
+def build_compact_prompt(nutrients, flags, token_budget=None, stats=None):
+    """Build a short (system, user) prompt: one line per nutrient group, requirements stated once.
+    
+    When the estimated tokens exceed token_budget (default PROMPT_TOKEN_BUDGET),
+    nutrients are left out in PROMPT_DROP_ORDER until the prompt fits or only
+    the essentials remain.
+    """
+    token_budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    system_tokens = estimate_tokens(COMPACT_SYSTEM_MESSAGE)
+    dropped = []
+    user_message = _compact_user_message(nutrients, flags, dropped)
+    for name in PROMPT_DROP_ORDER:
+        if system_tokens + estimate_tokens(user_message) <= token_budget:
+            break
+        if name in nutrients:
+            dropped.append(name)
+            user_message = _compact_user_message(nutrients, flags, dropped)
+    if stats is not None:
+        stats['prompt_dropped'] = dropped
+    return COMPACT_SYSTEM_MESSAGE, user_message
+
+def build_verbose_prompt(nutrients, flags):
+    """Build a structured prompt for Mistral AI."""
+    system_message = """You are a nutrition expert assistant who explains nutrition facts in a clear, friendly way. Your task is to:
+
+1. ALWAYS start with the serving size in grams
+2. Explain % Daily Values in simple terms (e.g., "20% of your daily needs")
+3. Provide 2-4 clear bullet points covering:
+   - Calories and main macronutrients (carbs, fat, protein)
+   - Sugar and sodium levels
+   - Important vitamins and minerals
+   - Any health flags (high/low nutrients)
+4. End with one practical, actionable tip for consumers
+
+Keep your tone friendly but cautious, and make the information easy to scan and understand.
+Avoid technical jargon - write as if explaining to a friend."""
+    
+    # Create a structured nutrition facts summary
+    nutrition_summary = "Nutrition Facts Summary:\n\n"
+    
+    # Always put serving size first if available
+    if 'serving_size' in nutrients:
+        nutrition_summary += f"Serving Size: {nutrients['serving_size']['amount']} {nutrients['serving_size']['unit']} ({nutrients['serving_size']['grams']}g)\n"
+    if 'servings_per_container' in nutrients:
+        nutrition_summary += f"Servings per Container: {nutrients['servings_per_container']}\n"
+    
+    # Group nutrients by category for better organization
+    categories = {
+        'Main Nutrients': ['calories', 'total_fat', 'saturated_fat', 'trans_fat', 'total_carbohydrate', 'protein'],
+        'Sugars and Fiber': ['total_sugars', 'added_sugars', 'dietary_fiber'],
+        'Minerals': ['sodium', 'potassium', 'calcium', 'iron'],
+        'Vitamins': ['vitamin_d']
+    }
+    
+    for category, nutrient_list in categories.items():
+        relevant_nutrients = [n for n in nutrient_list if n in nutrients]
+        if relevant_nutrients:
+            nutrition_summary += f"\n{category}:\n"
+            for nutrient in relevant_nutrients:
+                data = nutrients[nutrient]
+                if isinstance(data, dict) and 'value' in data:
+                    nutrition_summary += f"- {nutrient.replace('_', ' ').title()}: {data['value']}"
+                    if 'daily_value_percent' in data:
+                        nutrition_summary += f" ({data['daily_value_percent']}% Daily Value)"
+                    nutrition_summary += "\n"
+    
+    if flags:
+        nutrition_summary += "\nHealth Considerations:\n"
+        for flag in flags:
+            nutrition_summary += f"- {flag}\n"
+    
+    user_message = f"""Please analyze these nutrition facts and create a consumer-friendly summary:
+
+{nutrition_summary}
+
+Requirements for your response:
+1. Start by clearly stating the serving size in grams
+2. When mentioning Daily Values, explain them in simple terms (e.g., "provides 20% of what you need in a day")
+3. Provide 2-4 bullet points covering the key nutrients and health considerations
+4. End with one practical tip for healthy consumption
+
+Make your summary easy to read and understand, highlighting the most important information first."""
+    
+    return system_message, user_message
+
+def clean_prompt_text(text):
+    """Strip non-ASCII characters and normalize whitespace before sending a prompt."""
+    # Remove or replace problematic characters
+    text = text.encode('ascii', 'ignore').decode('ascii')
+    # Normalize spaces within lines, but keep the line structure
+    lines = [' '.join(line.split()) for line in text.splitlines()]
+    text = re.sub(r'\n{3,}', '\n\n', '\n'.join(lines))
+    return text.strip()
+
+def prompt_cache_key(system_message, user_message, max_tokens=None):
+    """Summary cache key of a prompt, as used for the API request it would make."""
+    return summary_cache_key(
+        clean_prompt_text(system_message), clean_prompt_text(user_message),
+        MISTRAL_MODEL, MISTRAL_TEMPERATURE, max_tokens or MISTRAL_MAX_TOKENS
+    )
+
+def _prepare_summary_request(system_message, user_message, api_key, max_tokens=None):
+    """Return (headers, payload, cache_key, prompt_tokens) for a summary request."""
+    if not api_key:
+        raise SummaryError("Mistral AI API key not found. Please set the MISTRAL_API_KEY environment variable.")
+    
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    clean_system_message = clean_prompt_text(system_message)
+    clean_user_message = clean_prompt_text(user_message)
+    max_tokens = max_tokens or MISTRAL_MAX_TOKENS
+    
+    cache_key = summary_cache_key(
+        clean_system_message, clean_user_message,
+        MISTRAL_MODEL, MISTRAL_TEMPERATURE, max_tokens
+    )
+    
+    payload = {
+        "model": MISTRAL_MODEL,
+        "messages": [
+            {"role": "system", "content": clean_system_message},
+            {"role": "user", "content": clean_user_message}
+        ],
+        "temperature": MISTRAL_TEMPERATURE,
+        "max_tokens": max_tokens
+    }
+    prompt_tokens = estimate_tokens(clean_system_message) + estimate_tokens(clean_user_message)
+    return headers, payload, cache_key, prompt_tokens
+
+def _post_summary_request(headers, payload, stream=False):
+    """POST a completion request and raise SummaryError for network and HTTP errors."""
+    try:
+        with metrics.span("summary_http"):
+            response = http_client.get_http_client().post(
+                MISTRAL_API_URL,
+                headers=headers,
+                json=payload,
+                stream=stream
+            )
+    except http_client.CircuitOpenError as e:
+        metrics.SUMMARY_API_ERRORS.inc("circuit_open")
+        raise SummaryError(
+            f"Summary service is temporarily unavailable. Please try again in {e.retry_after:.0f}s.",
+            retry_after=e.retry_after
+        ) from e
+    except requests.exceptions.Timeout as e:
+        metrics.SUMMARY_API_ERRORS.inc("timeout")
+        raise SummaryError("Request timed out. Please try again.") from e
+    except requests.exceptions.RequestException as e:
+        metrics.SUMMARY_API_ERRORS.inc("network")
+        raise SummaryError(f"Network error: {str(e)}") from e
+    
+    if response.status_code != 200:
+        metrics.SUMMARY_API_ERRORS.inc(str(response.status_code))
+    
+    # Handle response status
+    if response.status_code == 401:
+        raise SummaryError("Invalid API key. Please check your Mistral AI API key.", status_code=401)
+    elif response.status_code != 200:
+        try:
+            details = response.json()
+        except ValueError:
+            details = response.text
+        raise SummaryError(
+            f"API Error: Status code {response.status_code}",
+            status_code=response.status_code,
+            details=details
+        )
+    return response
+
+@contextmanager
+def summary_admission():
+    """Hold a summary admission slot for the block; a busy gate raises SummaryError."""
+    try:
+        with get_summary_gate().slot():
+            yield
+    except ServerBusy as e:
+        raise SummaryError(
+            f"Summary service is busy. Please try again in {e.retry_after}s.",
+            retry_after=e.retry_after
+        ) from e
+
+def request_mistral_summary(system_message, user_message, api_key, max_tokens=None):
+    """Get summary from Mistral AI API, raising SummaryError on failure.
+    
+    max_tokens overrides MISTRAL_MAX_TOKENS, e.g. for a reply covering several products.
+    """
+    headers, payload, cache_key, prompt_tokens = _prepare_summary_request(
+        system_message, user_message, api_key, max_tokens
+    )
+    
+    # Repeat products reuse an earlier summary without calling the API
+    cache = get_summary_cache()
+    cached_summary = cache.get(cache_key)
+    if cached_summary is not None:
+        return cached_summary
+    
+    metrics.SUMMARY_PROMPT_TOKENS.observe(prompt_tokens)
+    with summary_admission():
+        response = _post_summary_request(headers, payload)
+        
+        # Parse the response
+        try:
+            result = response.json()
+        except ValueError as e:
+            raise SummaryError(f"Error parsing API response: {str(e)}", status_code=200, details=response.text) from e
+    
+    if "choices" in result and len(result["choices"]) > 0:
+        summary = result["choices"][0]["message"]["content"]
+        cache.set(cache_key, summary)
+        return summary
+    raise SummaryError("Unexpected API response format", status_code=200, details=result)
+
+def stream_mistral_summary(system_message, user_message, api_key, stats=None):
+    """Yield summary text chunks from the API's server-sent events as they arrive.
+    
+    Timing is recorded in the optional stats dict: time_to_first_token and total_time
+    (seconds), plus the estimated prompt_tokens sent.
+    """
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    headers, payload, cache_key, stats['prompt_tokens'] = _prepare_summary_request(
+        system_message, user_message, api_key
+    )
+    
+    cache = get_summary_cache()
+    cached_summary = cache.get(cache_key)
+    if cached_summary is not None:
+        stats['cached'] = True
+        stats['time_to_first_token'] = stats['total_time'] = time.perf_counter() - start
+        yield cached_summary
+        return
+    
+    metrics.SUMMARY_PROMPT_TOKENS.observe(stats['prompt_tokens'])
+    # The slot is held until the whole reply has streamed in
+    with summary_admission():
+        response = _post_summary_request(headers, dict(payload, stream=True), stream=True)
+        chunks = []
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    event = json.loads(data)
+                    content = event["choices"][0]["delta"].get("content")
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    raise SummaryError(f"Error parsing streamed response: {str(e)}", status_code=200, details=data) from e
+                if content:
+                    if not chunks:
+                        stats['time_to_first_token'] = time.perf_counter() - start
+                    chunks.append(content)
+                    yield content
+        except requests.exceptions.RequestException as e:
+            metrics.SUMMARY_API_ERRORS.inc("network")
+            raise SummaryError(f"Network error: {str(e)}") from e
+        finally:
+            response.close()
+            stats['total_time'] = time.perf_counter() - start
+    
+    if not chunks:
+        raise SummaryError("Empty streamed response", status_code=200)
+    cache.set(cache_key, "".join(chunks))
+
+def iter_summary(system_message, user_message, api_key, stats=None):
+    """Stream a summary, falling back to the blocking request if streaming fails before any text arrives."""
+    stats = {} if stats is None else stats
+    if not MISTRAL_STREAM:
+        stats['streamed'] = False
+        yield request_mistral_summary(system_message, user_message, api_key)
+        return
+    
+    started = False
+    try:
+        for chunk in stream_mistral_summary(system_message, user_message, api_key, stats):
+            started = True
+            stats['streamed'] = True
+            yield chunk
+        return
+    except SummaryError as e:
+        # Partial output cannot be retried cleanly, and a rejected key, a busy service or a
+        # server error (already retried by the HTTP client) will not work on a second request
+        server_error = e.status_code is not None and e.status_code >= 500
+        if started or e.status_code == 401 or e.retry_after is not None or server_error:
+            raise
+    
+    stats['streamed'] = False
+    start = time.perf_counter()
+    summary = request_mistral_summary(system_message, user_message, api_key)
+    stats['time_to_first_token'] = stats['total_time'] = time.perf_counter() - start
+    yield summary
+
+def _new_result(image_hash_value=None):
+    return {
+        'image_hash': image_hash_value,
+        'status': STATUS_OK,
+        'error': None,
+        'ocr_pass': None,
+        'raw_text': None,
+        'cleaned_text': None,
+        'nutrients': {},
+        'flags': [],
+        'summary': None,
+        'summary_backend': None,
+        'timings': {},
+    }
+
+def _analyze_raw_text(result, raw_text, api_key, summarize, summarizer):
+    """Run the text stages (clean, parse, flags, optional summary) and fill in result."""
+    timings = result['timings']
+    result['raw_text'] = raw_text
+    if not raw_text:
+        result['status'] = STATUS_NO_TEXT
+        return result
+    
+    start = time.perf_counter()
+    cleaned_text = clean_ocr_text(raw_text)
+    nutrients = parse_nutrition_table(cleaned_text)
+    timings['parse'] = time.perf_counter() - start
+    result['cleaned_text'] = cleaned_text
+    result['nutrients'] = nutrients
+    metrics.PARSES.inc("hit" if nutrients else "miss")
+    if not nutrients:
+        result['status'] = STATUS_NO_NUTRIENTS
+        return result
+    
+    start = time.perf_counter()
+    result['flags'] = compute_health_flags(nutrients)
+    timings['flags'] = time.perf_counter() - start
+    
+    if summarize:
+        # summarizers builds on this module, so it is imported on first use
+        from summarizers import get_summarizer
+        if summarizer is None or isinstance(summarizer, str):
+            summarizer = get_summarizer(summarizer, api_key)
+        start = time.perf_counter()
+        stats = {}
+        try:
+            with metrics.span("summary"):
+                result['summary'] = summarizer.summarize(nutrients, result['flags'], stats)
+            result['summary_backend'] = stats.get('backend', summarizer.name)
+        except SummaryError as e:
+            result['status'] = STATUS_SUMMARY_FAILED
+            result['error'] = str(e)
+        finally:
+            timings['summary'] = time.perf_counter() - start
+    
+    return result
+
+def analyze_text(raw_text, api_key=None, summarize=False, summarizer=None):
+    """Run the pipeline from already recognized label text (no OCR) and return the same result shape as analyze_image."""
+    return _analyze_raw_text(_new_result(), raw_text, api_key, summarize, summarizer)
+
+def analyze_image(image_bytes, api_key=None, summarize=False, image=None, summarizer=None):
+    """Run the label pipeline on uploaded image bytes and return a JSON-serializable result.
+    
+    Stages: preprocess_image -> extract_text -> clean_ocr_text -> parse_nutrition_table
+    -> compute_health_flags, plus a summary when summarize is True. ocr_pass in the
+    result tells whether the fast OCR pass sufficed, the full pass ran or the text
+    came from the cache. summarizer is a
+    backend name or instance from summarizers (default: SUMMARIZER_BACKEND). An already
+    decoded image may be passed to skip decoding.
+    """
+    result = _new_result(image_hash(image_bytes))
+    
+    start = time.perf_counter()
+    try:
+        with metrics.span("ocr"):
+            if image is None:
+                with metrics.span("decode_image"):
+                    image = decode_image(image_bytes)
+            raw_text, result['ocr_pass'] = run_ocr(image, image_bytes)
+    except ImageTooLargeError as e:
+        result['status'] = STATUS_IMAGE_TOO_LARGE
+        result['error'] = str(e)
+        return result
+    except (OCRError, OSError) as e:
+        result['status'] = STATUS_OCR_FAILED
+        result['error'] = str(e)
+        return result
+    finally:
+        result['timings']['ocr'] = time.perf_counter() - start
+    
+    return _analyze_raw_text(result, raw_text, api_key, summarize, summarizer)
+
+def warmup(ocr=True):
+    """Load deferred dependencies and initialize the OCR engine once, at process start.
+    
+    Returns the seconds spent per step. OCR failures are ignored here; they are
+    reported by the first real analysis.
+    """
+    timings = {}
+    start = time.perf_counter()
+    # First attribute access executes each deferred module
+    np.ndarray, Image.open, ImageEnhance.Contrast, ImageOps.exif_transpose, requests.Session
+    http_client.get_http_client()
+    metrics.ensure_file_writer()
+    timings['imports'] = time.perf_counter() - start
+    
+    if ocr:
+        start = time.perf_counter()
+        try:
+            # One tiny recognition loads the language model (tesserocr) or the binary (pytesseract)
+            extract_text(Image.new('L', (32, 32), 255))
+        except OCRError:
+            pass
+        timings['ocr'] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,328 @@
+"""Local SQLite store of every analysis, for analytics without re-running OCR.
+
+Each analysis result (image hash, raw and cleaned OCR text, parsed nutrients,
+health flags, summary and stage timings) becomes one row of the `analyses`
+table. Key nutrients are also stored as indexed REAL columns, so filters such
+as sodium > 600 mg are index range scans:
+
+    python results_store.py export high_sodium.csv --where "sodium>600"
+    python results_store.py export all.ndjson
+
+Writes are buffered and inserted in batches (one transaction per batch), at
+the latest RESULTS_FLUSH_INTERVAL seconds after the first buffered row. The
+database runs in WAL mode, so exports and queries read while the app writes.
+Exports stream rows from a cursor and never hold the whole table in memory.
+"""
+import os
+import csv
+import sys
+import json
+import time
+import atexit
+import sqlite3
+import argparse
+import threading
+
+from nutrient_record import NutrientRecord
+
+# Defaults (overridable through environment variables)
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+# Nutrients copied into their own indexed columns (values in label units: g, mg, kcal)
+NUTRIENT_COLUMNS = ('calories', 'total_fat', 'saturated_fat', 'sodium', 'total_carbohydrate',
+                    'total_sugars', 'protein')
+# Stored as JSON text and decoded again on read
+JSON_COLUMNS = ('nutrients', 'flags', 'timings')
+COLUMNS = ('id', 'created_at', 'image_hash', 'status', 'ocr_pass', 'raw_text', 'cleaned_text',
+           'nutrients', 'flags', 'summary', 'summary_backend', 'timings') + NUTRIENT_COLUMNS
+FILTER_COLUMNS = ('id', 'created_at', 'image_hash', 'status', 'ocr_pass') + NUTRIENT_COLUMNS
+OPERATORS = ('<', '<=', '=', '>=', '>', '!=')
+
+_INSERT_COLUMNS = COLUMNS[1:]
+_INSERT_SQL = (f"INSERT INTO analyses ({', '.join(_INSERT_COLUMNS)}) "
+               f"VALUES ({', '.join('?' for _ in _INSERT_COLUMNS)})")
+
+
+def result_row(result, created_at=None):
+    """Flatten a pipeline result dict into a tuple in _INSERT_COLUMNS order."""
+    nutrients = result.get('nutrients') or {}
+    if isinstance(nutrients, NutrientRecord):
+        nutrients = nutrients.to_dict()
+    values = []
+    for name in NUTRIENT_COLUMNS:
+        entry = nutrients.get(name)
+        values.append(entry.get('value') if entry else None)
+    return (
+        time.time() if created_at is None else created_at,
+        result.get('image_hash'),
+        result.get('status'),
+        result.get('ocr_pass'),
+        result.get('raw_text'),
+        result.get('cleaned_text'),
+        json.dumps(nutrients, ensure_ascii=False),
+        json.dumps(result.get('flags') or [], ensure_ascii=False),
+        result.get('summary'),
+        result.get('summary_backend'),
+        json.dumps(result.get('timings') or {}),
+        *values,
+    )
+
+
+def where_clause(conditions):
+    """Build a parameterized WHERE clause from (column, operator, value) conditions."""
+    parts, params = [], []
+    for column, operator, value in conditions:
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot filter on {column!r}; use one of {', '.join(FILTER_COLUMNS)}")
+        if operator not in OPERATORS:
+            raise ValueError(f"Unknown operator {operator!r}")
+        parts.append(f"{column} {operator} ?")
+        params.append(value)
+    return (" WHERE " + " AND ".join(parts) if parts else ""), params
+
+
+def parse_condition(text):
+    """Parse a command-line filter such as "sodium>600" into a condition tuple."""
+    for operator in sorted(OPERATORS, key=len, reverse=True):
+        column, found, value = text.partition(operator)
+        if found:
+            column, value = column.strip(), value.strip()
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+            return column, operator, value
+    raise ValueError(f"Expected <column><operator><value>, got {text!r}")
+
+
+class ResultsStore:
+    """Batched writer and streaming reader of analysis results in one SQLite file."""
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+        self._counters = {'stored': 0, 'batches': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY,
+                created_at REAL NOT NULL,
+                image_hash TEXT,
+                status TEXT NOT NULL,
+                ocr_pass TEXT,
+                raw_text TEXT,
+                cleaned_text TEXT,
+                nutrients TEXT NOT NULL,
+                flags TEXT NOT NULL,
+                summary TEXT,
+                summary_backend TEXT,
+                timings TEXT NOT NULL,
+                {', '.join(f'{name} REAL' for name in NUTRIENT_COLUMNS)}
+            )
+            """
+        )
+        for column in ('image_hash',) + NUTRIENT_COLUMNS:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_analyses_{column} ON analyses ({column})")
+        self._conn.commit()
+
+    def add(self, result):
+        """Buffer one analysis result; it is written with the next batch."""
+        row = result_row(result)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+            elif self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write every buffered result in one transaction."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        with self._conn:
+            self._conn.executemany(_INSERT_SQL, rows)
+        self._counters['stored'] += len(rows)
+        self._counters['batches'] += 1
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, conditions, order_by, limit):
+        if order_by not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot order by {order_by!r}")
+        where, params = where_clause(conditions)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM analyses{where} ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return sql, params
+
+    def rows(self, conditions=(), order_by='id', limit=None):
+        """Yield stored results as dicts, streaming from a separate connection.
+
+        Buffered results are flushed first, so everything added so far is visible.
+        """
+        sql, params = self._query(conditions, order_by, limit)
+        for values in self._select(sql, params):
+            row = dict(zip(COLUMNS, values))
+            for column in JSON_COLUMNS:
+                row[column] = json.loads(row[column])
+            yield row
+
+    def _select(self, sql, params):
+        """Yield raw row tuples from a read-only connection, so writers are never blocked."""
+        self.flush()
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA query_only=ON")
+        try:
+            yield from conn.execute(sql, params)
+        finally:
+            conn.close()
+
+    def find(self, conditions=(), limit=None):
+        """Return matching results as a list, e.g. find([('sodium', '>', 600)])."""
+        return list(self.rows(conditions, limit=limit))
+
+    def latest(self, image_hash):
+        """Return the most recent result stored for an image hash, or None."""
+        with self._lock:
+            self._flush_locked()
+            found = self._conn.execute(
+                "SELECT id FROM analyses WHERE image_hash = ? ORDER BY id DESC LIMIT 1", (image_hash,)
+            ).fetchone()
+        if found is None:
+            return None
+        return next(self.rows([('id', '=', found[0])]))
+
+    def count(self, conditions=()):
+        where, params = where_clause(conditions)
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    def export_ndjson(self, out, conditions=()):
+        """Write matching results as one JSON object per line; returns the row count."""
+        # JSON columns are already JSON text: splice them in instead of decoding and re-encoding
+        keys = [json.dumps(column) + ": " for column in COLUMNS]
+        raw = [column in JSON_COLUMNS for column in COLUMNS]
+        dumps = json.dumps
+        count = 0
+        for values in self._select(*self._query(conditions, 'id', None)):
+            out.write("{" + ", ".join(key + (value if is_raw else dumps(value, ensure_ascii=False))
+                                      for key, value, is_raw in zip(keys, values, raw)) + "}\n")
+            count += 1
+        return count
+
+    def export_csv(self, out, conditions=()):
+        """Write matching results as CSV (JSON columns as JSON text); returns the row count."""
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        count = 0
+        for row in self.rows(conditions):
+            writer.writerow([json.dumps(row[column], ensure_ascii=False) if column in JSON_COLUMNS else row[column]
+                             for column in COLUMNS])
+            count += 1
+        return count
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['pending'] = len(self._pending)
+        return stats
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_results_store():
+    """Return the process-wide results store, or None when RESULTS_DB_PATH is unset."""
+    global _store
+    path = os.getenv("RESULTS_DB_PATH")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore(
+                path,
+                batch_size=int(os.getenv("RESULTS_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+                flush_interval=float(os.getenv("RESULTS_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)),
+            )
+            # Buffered rows are written when the process exits normally
+            atexit.register(_store.flush)
+        return _store
+
+
+def record_result(result):
+    """Add a result to the process-wide store when one is configured."""
+    store = get_results_store()
+    if store is not None:
+        store.add(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and export the NutriScan results database")
+    parser.add_argument("--db", default=os.getenv("RESULTS_DB_PATH"), help="Database file (default: RESULTS_DB_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Stream results to NDJSON or CSV")
+    export.add_argument("output", help="Output file; .csv for CSV, anything else for NDJSON, - for stdout")
+    export.add_argument("--format", choices=("ndjson", "csv"), help="Override the format implied by the file name")
+    export.add_argument("--where", action="append", default=[], metavar="CONDITION",
+                        help='Filter such as "sodium>600" or "status=ok" (repeatable; all must hold)')
+    count = commands.add_parser("count", help="Count matching results")
+    count.add_argument("--where", action="append", default=[], metavar="CONDITION")
+    args = parser.parse_args(argv)
+
+    if not args.db or not os.path.exists(args.db):
+        print("No results database; set RESULTS_DB_PATH or pass --db", file=sys.stderr)
+        return 1
+    try:
+        conditions = [parse_condition(text) for text in args.where]
+        where_clause(conditions)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    store = ResultsStore(args.db)
+
+    if args.command == "count":
+        print(store.count(conditions))
+        return 0
+
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "ndjson")
+    export_rows = store.export_csv if fmt == "csv" else store.export_ndjson
+    if args.output == "-":
+        written = export_rows(sys.stdout, conditions)
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='' if fmt == "csv" else None) as out:
+            written = export_rows(out, conditions)
+    print(f"Exported {written} results", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Summary backends.
+
+Every backend turns parsed nutrients and health flags into the same
+consumer-friendly format (serving size first, 2-4 bullets, one tip):
+
+- LocalSummarizer fills a template from the structured data. It makes no
+  network call and runs in well under a millisecond.
+- MistralSummarizer asks the Mistral chat API (streamed where possible).
+- AutoSummarizer uses Mistral, but answers with the local summary when the
+  remote backend fails, has no API key or does not start answering within
+  SUMMARY_REMOTE_TIMEOUT seconds.
+
+The backend is chosen with SUMMARIZER_BACKEND (auto|mistral|local) or per call
+through get_summarizer(name).
+"""
+import os
+import queue
+import threading
+import time
+
+from pipeline import NUTRIENT_LABELS, SummaryError, build_mistral_prompt, iter_summary
+
+DEFAULT_BACKEND = "auto"
+DEFAULT_REMOTE_TIMEOUT = 8.0
+
+# Practical tips, checked in order against the health flags
+TIPS = (
+    ("sodium", "Balance the salt by keeping the rest of today's meals low in sodium and drinking plenty of water."),
+    ("sugar", "Treat this as an occasional food, or pair a smaller portion with something high in fiber or protein."),
+    ("saturated fat", "Keep portions modest and choose lean or plant-based foods for your other meals today."),
+    ("fat", "Watch the portion size, since fat adds up quickly across several servings."),
+    ("low in protein", "Add a protein source such as yogurt, eggs, beans or nuts to make this more filling."),
+)
+DEFAULT_TIP = "Compare the serving size with how much you actually eat, since every number scales with each extra serving."
+
+
+def _number(value):
+    """Format 12.0 as '12' and 1.5 as '1.5'."""
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+def _amount(nutrients, key):
+    """Format a nutrient amount with its unit, e.g. '12g' or '250'."""
+    return f"{_number(nutrients[key]['value'])}{NUTRIENT_LABELS[key][1] or ''}"
+
+
+def _with_daily_value(nutrients, key, name):
+    """Amount plus a plain-language daily value, e.g. '470mg of sodium (about 20% of what you need in a day)'."""
+    text = f"{_amount(nutrients, key)} of {name}"
+    percent = nutrients[key].get('daily_value_percent')
+    if percent is not None:
+        text += f" (about {_number(percent)}% of what you need in a day)"
+    return text
+
+
+def _flag_text(flag):
+    """Strip the leading emoji from a health flag."""
+    return flag.split(" ", 1)[1] if " " in flag else flag
+
+
+def local_summary(nutrients, flags):
+    """Build the serving-size-first, 2-4 bullet, one-tip summary from structured data."""
+    lines = []
+    serving = nutrients.get('serving_size')
+    if serving:
+        lines.append(f"**Serving size:** {serving['amount']} {serving['unit']} ({serving['grams']}g)"
+                     " - all amounts below are per serving.")
+    else:
+        lines.append("**Serving size:** not readable on this label - amounts below are per serving.")
+    if 'servings_per_container' in nutrients:
+        lines[0] += f" The package holds {nutrients['servings_per_container']} servings."
+
+    bullets = []
+    macros = [f"{_amount(nutrients, key)} {name}" for key, name in (
+        ('total_fat', "fat"), ('total_carbohydrate', "carbs"), ('protein', "protein")) if key in nutrients]
+    if 'calories' in nutrients or macros:
+        text = f"{_amount(nutrients, 'calories')} calories" if 'calories' in nutrients else "Macros"
+        if macros:
+            text += (", with " if 'calories' in nutrients else ": ") + ", ".join(macros)
+        bullets.append(f"- **Calories and macros:** {text}.")
+
+    sugar_sodium = []
+    if 'total_sugars' in nutrients:
+        sugars = f"{_amount(nutrients, 'total_sugars')} sugars"
+        if 'added_sugars' in nutrients:
+            sugars += f" ({_amount(nutrients, 'added_sugars')} added)"
+        sugar_sodium.append(sugars)
+    if 'sodium' in nutrients:
+        sugar_sodium.append(_with_daily_value(nutrients, 'sodium', "sodium"))
+    if sugar_sodium:
+        bullets.append(f"- **Sugar and sodium:** {' and '.join(sugar_sodium)}.")
+
+    minerals = [f"{NUTRIENT_LABELS[key][0][0]} {_number(nutrients[key]['daily_value_percent'])}%"
+                for key in ('vitamin_d', 'calcium', 'iron', 'potassium')
+                if key in nutrients and 'daily_value_percent' in nutrients[key]]
+    if minerals:
+        bullets.append(f"- **Vitamins and minerals:** {', '.join(minerals)} of your daily needs.")
+
+    if flags:
+        bullets.append(f"- **Health flags:** {'; '.join(_flag_text(flag) for flag in flags)}.")
+
+    if len(bullets) < 2:
+        bullets.append("- **Note:** only part of the label could be read, so check the package for the full panel.")
+    lines.extend(bullets[:4])
+
+    flag_text = " ".join(flags).lower()
+    tip = next((tip for keyword, tip in TIPS if keyword in flag_text), DEFAULT_TIP)
+    lines.append(f"**Tip:** {tip}")
+    return "\n".join(lines)
+
+
+class LocalSummarizer:
+    """Template summary built from the parsed data; no network call."""
+
+    name = "local"
+
+    def summarize(self, nutrients, flags, stats=None):
+        return "".join(self.stream(nutrients, flags, stats))
+
+    def stream(self, nutrients, flags, stats=None):
+        stats = {} if stats is None else stats
+        start = time.perf_counter()
+        summary = local_summary(nutrients, flags)
+        stats['backend'] = self.name
+        stats['time_to_first_token'] = stats['total_time'] = time.perf_counter() - start
+        yield summary
+
+
+class MistralSummarizer:
+    """Summary from the Mistral chat API; raises SummaryError on failure."""
+
+    name = "mistral"
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def summarize(self, nutrients, flags, stats=None):
+        return "".join(self.stream(nutrients, flags, stats))
+
+    def stream(self, nutrients, flags, stats=None):
+        stats = {} if stats is None else stats
+        stats['backend'] = self.name
+        system_msg, user_msg = build_mistral_prompt(nutrients, flags, stats)
+        yield from iter_summary(system_msg, user_msg, self.api_key, stats)
+
+
+class AutoSummarizer:
+    """Mistral when it answers in time, the local template otherwise."""
+
+    name = "auto"
+
+    def __init__(self, api_key, remote_timeout=DEFAULT_REMOTE_TIMEOUT):
+        self.remote = MistralSummarizer(api_key) if api_key else None
+        self.local = LocalSummarizer()
+        self.remote_timeout = remote_timeout
+
+    def summarize(self, nutrients, flags, stats=None):
+        return "".join(self.stream(nutrients, flags, stats))
+
+    def stream(self, nutrients, flags, stats=None):
+        stats = {} if stats is None else stats
+        if self.remote is None:
+            stats['fallback_reason'] = "no API key"
+            yield from self.local.stream(nutrients, flags, stats)
+            return
+
+        # The remote stream is drained on its own thread, so a slow upstream can
+        # be abandoned; it still finishes in the background and fills the summary cache
+        chunks = queue.Queue()
+        remote_stats = {}
+
+        def drain():
+            try:
+                for chunk in self.remote.stream(nutrients, flags, remote_stats):
+                    chunks.put(chunk)
+                chunks.put(None)
+            except Exception as e:
+                chunks.put(e)
+
+        threading.Thread(target=drain, daemon=True, name="summary-remote").start()
+        try:
+            first = chunks.get(timeout=self.remote_timeout)
+        except queue.Empty:
+            first = SummaryError(f"Remote summary took longer than {self.remote_timeout:g}s")
+        if isinstance(first, Exception) or first is None:
+            stats['fallback_reason'] = str(first) if first is not None else "empty remote summary"
+            yield from self.local.stream(nutrients, flags, stats)
+            return
+
+        yield first
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+        stats.update(remote_stats)
+
+
+def create_summarizer(backend=DEFAULT_BACKEND, api_key=None):
+    """Create a summarizer by name: 'auto', 'mistral' or 'local'."""
+    backend = backend.lower()
+    if backend == "local":
+        return LocalSummarizer()
+    if backend == "mistral":
+        return MistralSummarizer(api_key)
+    if backend == "auto":
+        return AutoSummarizer(
+            api_key, remote_timeout=float(os.getenv("SUMMARY_REMOTE_TIMEOUT", DEFAULT_REMOTE_TIMEOUT))
+        )
+    raise ValueError(f"Unknown summarizer backend: {backend}")
+
+
+def get_summarizer(backend=None, api_key=None):
+    """Return a summarizer for this request; backend defaults to SUMMARIZER_BACKEND."""
+    return create_summarizer(backend or os.getenv("SUMMARIZER_BACKEND", DEFAULT_BACKEND), api_key)
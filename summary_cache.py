@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Defaults (overridable through environment variables)
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_SQLITE_PATH = ".cache/summaries.sqlite3"
+
+
+def summary_cache_key(system_message, user_message, model, temperature, max_tokens):
+    """Build a key from a canonical serialization of the prompt and model settings."""
+    canonical = json.dumps(
+        {
+            'system': system_message,
+            'user': user_message,
+            'model': model,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=True,
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store of (expires_at, summary) pairs."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        """Store a value and return the number of entries evicted to make room."""
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Local SQLite file store that survives restarts and is shared between processes."""
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_accessed ON summaries (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key, value, expires_at):
+        """Store a value and return the number of entries evicted to make room."""
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            # Expired rows go first, then the least recently used ones
+            cursor = self._conn.execute("DELETE FROM summaries WHERE expires_at <= ?", (now,))
+            evicted = cursor.rowcount
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()
+            if count > self.max_entries:
+                cursor = self._conn.execute(
+                    """
+                    DELETE FROM summaries WHERE key IN (
+                        SELECT key FROM summaries ORDER BY accessed_at ASC LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+                evicted += cursor.rowcount
+            self._conn.commit()
+            return evicted
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()
+            return count
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries")
+            self._conn.commit()
+
+
+class SummaryCache:
+    """TTL + LRU cache of generated summaries on top of a pluggable backend."""
+
+    def __init__(self, backend=None, ttl=DEFAULT_TTL_SECONDS):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def get(self, key):
+        """Return a cached summary, or None when missing or expired."""
+        value = self.backend.get(key, time.time())
+        with self._lock:
+            self._counters['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, key, summary):
+        evicted = self.backend.set(key, summary, time.time() + self.ttl)
+        with self._lock:
+            self._counters['stores'] += 1
+            self._counters['evictions'] += evicted
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored summaries."""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['entries'] = len(self.backend)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        self.backend.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache():
+    """Return the process-wide summary cache configured from the environment."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_entries = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+            backend_name = os.getenv("SUMMARY_CACHE_BACKEND", "memory").lower()
+            if backend_name == "sqlite":
+                backend = SQLiteBackend(
+                    path=os.getenv("SUMMARY_CACHE_PATH", DEFAULT_SQLITE_PATH),
+                    max_entries=max_entries,
+                )
+            elif backend_name == "memory":
+                backend = MemoryBackend(max_entries=max_entries)
+            else:
+                raise ValueError(f"Unknown SUMMARY_CACHE_BACKEND: {backend_name}")
+            _cache = SummaryCache(
+                backend=backend,
+                ttl=float(os.getenv("SUMMARY_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            )
+        return _cache
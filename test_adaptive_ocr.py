@@ -0,0 +1,58 @@
+from PIL import Image
+
+import metrics
+import pipeline
+
+FULL_LABEL = ("Serving size 1 cup (228g)\nCalories 250\nTotal Fat 12g 18%\nSodium 470mg 20%\n"
+              "Total Carbohydrate 31g 10%\nTotal Sugars 5g\nProtein 5g")
+
+
+def fake_extract_text(texts, calls):
+    def extract_text(image, psm=None, variables=None):
+        ocr_pass = pipeline.OCR_PASS_FAST if psm == pipeline.FAST_PASS_PSM else pipeline.OCR_PASS_FULL
+        calls.append((ocr_pass, image.size))
+        return texts[ocr_pass]
+    return extract_text
+
+
+def test_fast_pass_is_enough_for_a_clean_label(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pipeline, 'extract_text', fake_extract_text({'fast': FULL_LABEL}, calls))
+    text, ocr_pass = pipeline.extract_text_adaptive(Image.new('L', (1200, 1800), 255))
+    assert (text, ocr_pass) == (FULL_LABEL, pipeline.OCR_PASS_FAST)
+    # Only the downscaled copy was read
+    assert calls == [('fast', (666, 1000))]
+
+
+def test_escalates_when_too_few_core_fields(monkeypatch):
+    calls = []
+    texts = {'fast': "Calories 250\nProtein 5g", 'full': FULL_LABEL}
+    monkeypatch.setattr(pipeline, 'extract_text', fake_extract_text(texts, calls))
+    text, ocr_pass = pipeline.extract_text_adaptive(Image.new('L', (600, 900), 255))
+    assert (text, ocr_pass) == (FULL_LABEL, pipeline.OCR_PASS_FULL)
+    assert [name for name, _ in calls] == ['fast', 'full']
+
+
+def test_keeps_fast_text_when_full_pass_reads_less(monkeypatch):
+    texts = {'fast': "Calories 250\nProtein 5g", 'full': "Calories 250"}
+    monkeypatch.setattr(pipeline, 'extract_text', fake_extract_text(texts, []))
+    result = pipeline.extract_text_adaptive(Image.new('L', (600, 900), 255))
+    # Escalated, but the text came from the fast pass
+    assert result == (texts['fast'], pipeline.OCR_PASS_FAST_AFTER_FULL)
+
+
+def test_core_field_count():
+    assert pipeline.count_core_fields(FULL_LABEL) == len(pipeline.CORE_FIELDS)
+    assert pipeline.count_core_fields("Vitamin D 2mcg 10%") == 0
+
+
+def test_core_field_count_records_no_stage_metrics():
+    metrics.set_enabled(True)
+    metrics.REGISTRY.clear()
+    try:
+        pipeline.count_core_fields(FULL_LABEL)
+        for stage in ("clean_ocr_text", "parse_nutrition_table"):
+            assert metrics.STAGE_SECONDS.count(stage) == 0
+    finally:
+        metrics.set_enabled(False)
+        metrics.REGISTRY.clear()
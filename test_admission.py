@@ -0,0 +1,116 @@
+import time
+import threading
+
+import pytest
+
+import admission
+import metrics
+import pipeline
+from admission import Gate, ServerBusy
+
+
+@pytest.fixture
+def recording():
+    metrics.set_enabled(True)
+    metrics.REGISTRY.clear()
+    yield
+    metrics.set_enabled(False)
+    metrics.REGISTRY.clear()
+
+
+def hold(gate, release):
+    """Occupy one slot of gate from another thread until release is set."""
+    entered = threading.Event()
+
+    def run():
+        with gate.slot():
+            entered.set()
+            release.wait()
+    thread = threading.Thread(target=run)
+    thread.start()
+    entered.wait()
+    return thread
+
+
+def test_limits_concurrency_and_queues(recording):
+    gate = Gate("ocr", limit=1, max_queue=1, max_wait=5, service_seconds=0.01)
+    release = threading.Event()
+    holder = hold(gate, release)
+    admitted = []
+
+    def wait_for_slot():
+        with gate.slot():
+            admitted.append(gate.active)
+    waiter = threading.Thread(target=wait_for_slot)
+    waiter.start()
+    while gate.waiting == 0:
+        time.sleep(0.001)
+    assert metrics.ADMISSION_QUEUE_DEPTH.value("ocr") == 1
+
+    # Queue full: turned away at once rather than after max_wait
+    start = time.perf_counter()
+    with pytest.raises(ServerBusy) as busy:
+        with gate.slot():
+            pass
+    assert time.perf_counter() - start < 0.1
+    assert busy.value.retry_after >= 1 and "retry in" in str(busy.value)
+    assert metrics.ADMISSION_REJECTIONS.value("ocr", admission.REJECT_QUEUE_FULL) == 1
+
+    release.set()
+    holder.join()
+    waiter.join()
+    assert admitted == [1] and gate.active == 0 and gate.waiting == 0
+    assert metrics.ADMISSION_WAIT_SECONDS.count("ocr") == 2
+
+
+def test_wait_is_bounded():
+    gate = Gate("ocr", limit=1, max_queue=4, max_wait=0.05, service_seconds=0.01)
+    release = threading.Event()
+    holder = hold(gate, release)
+    with pytest.raises(ServerBusy):
+        with gate.slot():
+            pass
+    release.set()
+    holder.join()
+    assert gate.stats()['rejected'] == 1 and gate.stats()['waiting'] == 0
+
+
+def test_rejects_when_expected_wait_is_too_long():
+    gate = Gate("summary", limit=1, max_queue=4, max_wait=1, service_seconds=5)
+    release = threading.Event()
+    holder = hold(gate, release)
+    with pytest.raises(ServerBusy) as busy:
+        with gate.slot():
+            pass
+    assert busy.value.retry_after == 5
+    release.set()
+    holder.join()
+
+
+def test_busy_summary_gate_raises_summary_error(monkeypatch):
+    gate = Gate("summary", limit=1, max_queue=0)
+    monkeypatch.setitem(admission._gates, "summary", gate)
+    release = threading.Event()
+    holder = hold(gate, release)
+    try:
+        with pytest.raises(pipeline.SummaryError) as error:
+            pipeline.request_mistral_summary("system", "user busy", "key")
+        assert error.value.retry_after is not None and "busy" in str(error.value)
+    finally:
+        release.set()
+        holder.join()
+
+
+@pytest.mark.parametrize("name, limit_var, queue_var", [
+    ("ocr", "OCR_CONCURRENCY", "OCR_QUEUE_SIZE"),
+    ("summary", "SUMMARY_CONCURRENCY", "SUMMARY_QUEUE_SIZE"),
+])
+def test_queue_defaults_to_twice_the_configured_limit(monkeypatch, name, limit_var, queue_var):
+    monkeypatch.setattr(admission, '_gates', {})
+    monkeypatch.setenv(limit_var, "1")
+    monkeypatch.delenv(queue_var, raising=False)
+    gate = admission.get_gate(name)
+    assert (gate.limit, gate.max_queue) == (1, 2)
+    monkeypatch.setattr(admission, '_gates', {})
+    monkeypatch.setenv(queue_var, "5")
+    assert admission.get_gate(name).max_queue == 5
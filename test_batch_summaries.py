@@ -0,0 +1,128 @@
+import re
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import pipeline
+import http_client
+from http_client import HTTPClient
+from batch_summaries import BatchSummarizer, split_sections
+from summary_cache import get_summary_cache
+
+LABEL = ("Serving size 1 cup (228g)\nCalories 250\nTotal Fat 12g 18%\nSodium 470mg 20%\n"
+         "Total Carbohydrate 31g 10%\nTotal Sugars 5g\nProtein 5g")
+
+
+class BatchStubHandler(BaseHTTPRequestHandler):
+    """Answers every "### Pn" section of the request, except the ids listed in drop."""
+
+    drop = set()
+    requests_seen = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        BatchStubHandler.requests_seen.append(payload)
+        user_message = payload['messages'][1]['content']
+        ids = re.findall(r"^### (P\d+)$", user_message, re.MULTILINE)
+        if ids:
+            content = "\n\n".join(f"### {product_id}\nSummary for {product_id}, a fine breakfast choice overall."
+                                  for product_id in ids if product_id not in BatchStubHandler.drop)
+        else:
+            content = "Single summary."
+        data = json.dumps({'choices': [{'message': {'content': content}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingFallback:
+    name = "fallback"
+
+    def __init__(self):
+        self.calls = 0
+
+    def summarize(self, nutrients, flags, stats=None):
+        self.calls += 1
+        return "Single summary."
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    BatchStubHandler.drop = set()
+    BatchStubHandler.requests_seen = []
+    get_summary_cache().clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BatchStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = HTTPClient(max_retries=0)
+    monkeypatch.setattr(pipeline, 'MISTRAL_API_URL', f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions")
+    monkeypatch.setattr(http_client, 'get_http_client', lambda: client)
+    yield BatchStubHandler
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def products(count):
+    # Different sodium values give every product its own prompt
+    labels = []
+    for n in range(count):
+        nutrients = pipeline.parse_nutrition_table(LABEL.replace("470mg", f"{100 + n}mg"))
+        labels.append((nutrients, pipeline.compute_health_flags(nutrients)))
+    return labels
+
+
+def test_split_sections_rejects_duplicates_and_short_sections():
+    body = "A summary long enough to count as a real section of text."
+    reply = f"preamble\n### P1\n{body}\n### P2\nshort\n### P3\n{body}\n### P3\n{body}\n### P9\n{body}"
+    assert split_sections(reply, {'P1', 'P2', 'P3'}) == {'P1': body}
+
+
+def test_packs_products_into_one_request(stub):
+    fallback = CountingFallback()
+    stats = {}
+    results = BatchSummarizer("key", max_products=4, fallback=fallback).summarize_many(products(4), stats)
+    assert [summary for summary, _, _ in results] == [
+        f"Summary for P{n}, a fine breakfast choice overall." for n in range(1, 5)
+    ]
+    assert all(backend == "mistral-batch" and error is None for _, backend, error in results)
+    assert stats['api_calls'] == 1 and stats['batches'] == 1 and fallback.calls == 0
+    assert stub.requests_seen[0]['max_tokens'] == pipeline.MISTRAL_MAX_TOKENS * 4
+
+
+def test_missing_sections_are_retried_alone_and_shrink_batches(stub):
+    stub.drop = {'P2'}
+    fallback = CountingFallback()
+    summarizer = BatchSummarizer("key", max_products=4, fallback=fallback)
+    stats = {}
+    results = summarizer.summarize_many(products(4), stats)
+    assert results[1] == ("Single summary.", "fallback", None)
+    assert stats['retried'] == 1 and fallback.calls == 1
+    assert summarizer.batch_limit == 2
+
+
+def test_token_budget_splits_batches(stub):
+    summarizer = BatchSummarizer("key", token_budget=400, max_products=8, fallback=CountingFallback())
+    stats = {}
+    summarizer.summarize_many(products(6), stats)
+    assert stats['batches'] > 1 and stats['api_calls'] < 6
+    for payload in stub.requests_seen:
+        tokens = sum(pipeline.estimate_tokens(message['content']) for message in payload['messages'])
+        assert tokens <= 400
+
+
+def test_sections_are_cached_for_single_requests(stub):
+    labels = products(3)
+    BatchSummarizer("key", fallback=CountingFallback()).summarize_many(labels)
+    system_message, user_message = pipeline.build_mistral_prompt(*labels[0])
+    assert pipeline.request_mistral_summary(system_message, user_message, "key").startswith("Summary for P1")
+    stats = {}
+    BatchSummarizer("key", fallback=CountingFallback()).summarize_many(labels, stats)
+    assert stats['cached'] == 3 and stats['api_calls'] == 0
+    assert len(stub.requests_seen) == 1
@@ -0,0 +1,67 @@
+import json
+import random
+
+import pytest
+
+import bulk_flags
+from pipeline import THRESHOLDS, compute_health_flags
+from nutrient_record import NUTRIENT_FIELDS
+
+
+def random_products(count, seed=0):
+    """Products with random gaps and values that often sit exactly on a threshold."""
+    rng = random.Random(seed)
+    edges = [0.0, 3.0, 5.0, 17.5, 20.0, 22.5, 1500.0, 1499.0, 1501.0]
+    products = []
+    for _ in range(count):
+        product = {}
+        for name in NUTRIENT_FIELDS:
+            if rng.random() < 0.3:
+                continue
+            value = rng.choice(edges) if rng.random() < 0.4 else round(rng.uniform(0, 2500), 1)
+            product[name] = {'value': value}
+            if rng.random() < 0.6:
+                product[name]['daily_value_percent'] = float(rng.choice([0, 19, 20, 21, rng.randint(0, 100)]))
+        products.append(product)
+    return products
+
+
+def test_matches_compute_health_flags():
+    products = random_products(2000)
+    labels = bulk_flags.flag_labels(bulk_flags.nutrients_to_matrix(products))
+    assert labels == [compute_health_flags(product) for product in products]
+
+
+def test_matches_with_custom_thresholds(tmp_path):
+    path = tmp_path / "thresholds.json"
+    path.write_text(json.dumps({'sugars': {'high': 10}, 'protein': {'low': 8}, 'iron': {'good_source': 10}}))
+    thresholds = bulk_flags.load_thresholds(str(path))
+    assert thresholds['sugars'] == {'high': 10.0, 'moderate': THRESHOLDS['sugars']['moderate']}
+    products = random_products(500, seed=1)
+    labels = bulk_flags.flag_labels(bulk_flags.nutrients_to_matrix(products), thresholds)
+    assert labels == [compute_health_flags(product, thresholds) for product in products]
+
+
+def test_bitmasks():
+    matrix = bulk_flags.nutrients_to_matrix([{'total_sugars': {'value': 30.0}, 'protein': {'value': 2.0}}, {}])
+    masks = bulk_flags.flag_bitmasks(matrix)
+    assert masks[0] == bulk_flags.FLAG_BITS["⚠️ High in sugar"] | bulk_flags.FLAG_BITS["ℹ️ Low in protein"]
+    assert masks[1] == 0
+
+
+def test_unknown_threshold_group(tmp_path):
+    path = tmp_path / "thresholds.json"
+    path.write_text('{"sugar": {"high": 1}}')
+    with pytest.raises(ValueError):
+        bulk_flags.load_thresholds(str(path))
+
+
+def test_rescore_ndjson(tmp_path):
+    source, output = tmp_path / "results.ndjson", tmp_path / "rescored.ndjson"
+    rows = [{'file': "a.jpg", 'nutrients': {'sodium': {'value': 1600.0}}, 'flags': []},
+            {'file': "b.jpg", 'status': "ocr_failed", 'nutrients': {}}]
+    source.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    assert bulk_flags.main([str(source), "--output", str(output)]) == 0
+    rescored = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row['flags'] for row in rescored] == [["⚠️ High in sodium"], []]
+    assert rescored[0]['file'] == "a.jpg"
@@ -0,0 +1,42 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import pipeline
+
+
+def encode(image, fmt='JPEG', **params):
+    buffer = BytesIO()
+    image.save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def test_large_jpeg_decodes_at_reduced_scale():
+    image = pipeline.decode_image(encode(Image.new('RGB', (4000, 3000), 'white')), max_size=1800)
+    # 1/2 scale is the largest DCT reduction that keeps the longer side >= 1800
+    assert image.size == (2000, 1500)
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees clockwise
+    image = pipeline.decode_image(encode(Image.new('RGB', (400, 300)), exif=exif.tobytes()))
+    assert image.size == (300, 400)
+    assert 0x0112 not in image.getexif()
+
+
+def test_pixel_guard_rejects_before_decoding():
+    data = encode(Image.new('L', (5000, 5000)), 'PNG')
+    with pytest.raises(pipeline.ImageTooLargeError):
+        pipeline.decode_image(data, max_pixels=20_000_000)
+    # JPEGs are checked after draft-mode reduction
+    jpeg = encode(Image.new('L', (5000, 5000)))
+    assert pipeline.decode_image(jpeg, max_size=1000, max_pixels=2_000_000).size == (1250, 1250)
+
+
+def test_analyze_image_reports_oversized_upload(monkeypatch):
+    monkeypatch.setattr(pipeline, 'MAX_IMAGE_PIXELS', 10_000)
+    result = pipeline.analyze_image(encode(Image.new('L', (200, 200)), 'PNG'))
+    assert result['status'] == pipeline.STATUS_IMAGE_TOO_LARGE
+    assert "megapixels" in result['error']
@@ -0,0 +1,131 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_client import CircuitBreaker, CircuitOpenError, HTTPClient, parse_retry_after
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next (status, headers) from a script, then 200."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so connections can be reused
+    script = []
+    hits = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        ScriptedHandler.hits += 1
+        status, headers = ScriptedHandler.script.pop(0) if ScriptedHandler.script else (200, {})
+        body = b'{}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    ScriptedHandler.script = []
+    ScriptedHandler.hits = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_server_errors_then_succeeds(server_url):
+    ScriptedHandler.script = [(503, {}), (429, {'Retry-After': '0'})]
+    client = HTTPClient(max_retries=2, backoff_base=0.01)
+    response = client.post(server_url, json={})
+    assert response.status_code == 200
+    stats = client.stats()
+    assert stats['retries'] == 2
+    assert stats['new_connections'] == 1
+    assert stats['reused_connections'] == 2
+
+
+def test_gives_up_when_retry_after_is_too_long(server_url):
+    ScriptedHandler.script = [(429, {'Retry-After': '120'})]
+    client = HTTPClient(max_retries=2, backoff_max=1.0)
+    assert client.post(server_url, json={}).status_code == 429
+    assert ScriptedHandler.hits == 1
+
+
+def test_breaker_opens_and_fails_fast(server_url):
+    ScriptedHandler.script = [(500, {})] * 3
+    client = HTTPClient(max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    client.post(server_url, json={})
+    client.post(server_url, json={})
+    with pytest.raises(CircuitOpenError):
+        client.post(server_url, json={})
+    assert ScriptedHandler.hits == 2
+    assert client.stats()['breaker_trips'] == 1
+    assert client.stats()['breaker_state'] == "open"
+
+
+def test_half_open_trial_closes_breaker(server_url):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    client = HTTPClient(max_retries=0, breaker=breaker)
+    breaker.record_failure()
+    assert client.post(server_url, json={}).status_code == 200
+    assert breaker.state == "closed"
+
+
+def test_connection_errors_are_retried_and_raised():
+    client = HTTPClient(max_retries=1, backoff_base=0.01, connect_timeout=0.5)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.post("http://127.0.0.1:9/", json={})
+    assert client.stats()['retries'] == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        SlowHandler.hits += 1
+        threading.Event().wait(0.5)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_post_is_not_retried_after_read_timeout():
+    SlowHandler.hits = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = HTTPClient(max_retries=2, backoff_base=0.01, read_timeout=0.1)
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.post(f"http://127.0.0.1:{server.server_address[1]}/", json={})
+        assert SlowHandler.hits == 1 and client.stats()['retries'] == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unexpected_errors_end_half_open_trial(server_url, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    client = HTTPClient(max_retries=2, breaker=breaker)
+    breaker.record_failure()
+
+    def broken(*args, **kwargs):
+        raise requests.exceptions.TooManyRedirects("loop")
+    monkeypatch.setattr(client.session, 'request', broken)
+    with pytest.raises(requests.exceptions.TooManyRedirects):
+        client.post(server_url, json={})
+    monkeypatch.undo()
+    # The trial failed and was released, so the next call after the cool-down is a new trial
+    assert client.post(server_url, json={}).status_code == 200
+    assert breaker.state == "closed"
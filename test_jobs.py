@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from jobs import JobManager, JobQueueFull
+from pipeline import STATUS_NO_TEXT, STATUS_OK
+
+
+def wait_for(event):
+    def job_body(job, value):
+        event.wait(5)
+        job.append_text(str(value))
+        return {'value': value, 'status': STATUS_OK, 'summary_error': None}
+    return job_body
+
+
+def test_same_key_reuses_running_job():
+    release = threading.Event()
+    manager = JobManager(max_workers=1)
+    first = manager.submit("abc", wait_for(release), 1)
+    second = manager.submit("abc", wait_for(release), 2)
+    assert second is first
+    release.set()
+    assert first.result()['value'] == 1
+    assert manager.submit("abc", wait_for(release), 3) is first
+    manager.shutdown()
+
+
+def test_failed_job_is_resubmitted():
+    def failing(job):
+        raise RuntimeError("boom")
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit("abc", failing)
+    with pytest.raises(RuntimeError):
+        job.result()
+    release = threading.Event()
+    release.set()
+    retry = manager.submit("abc", wait_for(release), 1)
+    assert retry is not job
+    assert retry.result()['value'] == 1
+    manager.shutdown()
+
+
+def test_unsuccessful_analysis_is_resubmitted():
+    def no_text(job):
+        return {'status': STATUS_NO_TEXT, 'summary_error': None}
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit("abc", no_text)
+    assert job.result()['status'] == STATUS_NO_TEXT
+    assert not job.succeeded()
+    release = threading.Event()
+    release.set()
+    retry = manager.submit("abc", wait_for(release), 1)
+    assert retry is not job
+    assert retry.result()['value'] == 1
+    manager.shutdown()
+
+
+def test_pending_jobs_are_bounded():
+    release = threading.Event()
+    manager = JobManager(max_workers=1, max_pending=2)
+    manager.submit("a", wait_for(release), 1)
+    manager.submit("b", wait_for(release), 2)
+    with pytest.raises(JobQueueFull):
+        manager.submit("c", wait_for(release), 3)
+    release.set()
+    manager.shutdown()
+
+
+def test_partial_text_is_visible_while_running():
+    release = threading.Event()
+    manager = JobManager(max_workers=1)
+    job = manager.submit("abc", wait_for(release), 7)
+    assert job.partial_text() == ""
+    assert not job.done()
+    release.set()
+    job.result()
+    assert job.partial_text() == "7"
+    manager.shutdown()
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from label_detect import crop_to_label, detect_label_region
+from benchmarks.common import SAMPLE_IMAGE
+
+
+@pytest.fixture(scope="module")
+def sample():
+    with Image.open(SAMPLE_IMAGE) as image:
+        return image.convert('RGB')
+
+
+def test_crops_sample_label_to_its_rules(sample):
+    box, confidence = detect_label_region(sample)
+    assert confidence == 1.0
+    left, top, right, bottom = box
+    # The panel is the middle ~70% of the 600 px width, full height
+    assert 60 <= left <= 110 and 490 <= right <= 540
+    assert top == 0 and bottom == sample.size[1]
+
+    cropped, crop_box = crop_to_label(sample)
+    assert crop_box == box and cropped.size == (right - left, bottom - top)
+
+
+def test_large_photo_scales_the_box(sample):
+    # Above DETECT_MAX_SIZE the photo is reduced before detection; the box comes back in full-size pixels
+    big = sample.resize((sample.size[0] * 4, sample.size[1] * 4))
+    box, confidence = detect_label_region(big)
+    small_box, _ = detect_label_region(sample)
+    assert confidence == 1.0
+    assert all(abs(a - 4 * b) <= 16 for a, b in zip(box, small_box))
+    assert detect_label_region(big.convert('P'))[0] is not None
+
+
+@pytest.mark.parametrize("image", [
+    Image.new('RGB', (800, 600), "white"),
+    Image.fromarray(np.tile(np.linspace(0, 255, 800, dtype=np.uint8), (600, 1))),
+])
+def test_falls_back_to_full_image(image):
+    assert detect_label_region(image) == (None, 0.0)
+    cropped, box = crop_to_label(image)
+    assert cropped is image and box is None
+
+
+def test_low_confidence_falls_back(sample):
+    cropped, box = crop_to_label(sample, min_confidence=1.5)
+    assert cropped is sample and box is None
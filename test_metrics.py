@@ -0,0 +1,109 @@
+import io
+import json
+import threading
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+import api
+import metrics
+from pipeline import analyze_text
+
+
+@pytest.fixture
+def recording():
+    metrics.set_enabled(True)
+    metrics.REGISTRY.clear()
+    yield
+    metrics.set_enabled(False)
+    metrics.REGISTRY.clear()
+
+
+def test_disabled_records_nothing():
+    metrics.set_enabled(False)
+    assert metrics.span("parse_nutrition_table") is metrics.span("clean_ocr_text")
+    analyze_text("Calories 250")
+    assert metrics.STAGE_SECONDS.count("parse_nutrition_table") == 0
+    assert metrics.PARSES.value("hit") == 0
+
+
+def test_pipeline_stages_and_parse_hits(recording):
+    analyze_text("Calories 250\nSodium 2000mg 87%")
+    analyze_text("no label here")
+    for stage in ("clean_ocr_text", "parse_nutrition_table"):
+        assert metrics.STAGE_SECONDS.count(stage) == 2
+    assert metrics.STAGE_SECONDS.count("compute_health_flags") == 1
+    assert (metrics.PARSES.value("hit"), metrics.PARSES.value("miss")) == (1, 1)
+
+
+def test_span_counts_errors(recording):
+    with pytest.raises(ValueError):
+        with metrics.span("summary"):
+            raise ValueError
+    assert metrics.STAGE_SECONDS.count("summary") == 1
+    assert metrics.STAGE_ERRORS.value("summary") == 1
+
+
+def test_prometheus_text_format(recording):
+    histogram = metrics.Histogram("demo_seconds", "Demo", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, 'a"b')
+    histogram.observe(0.5, 'a"b')
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP demo_seconds Demo", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{stage="a\\"b",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="a\\"b",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{stage="a\\"b",le="+Inf"} 2' in lines
+    assert 'demo_seconds_count{stage="a\\"b"} 2' in lines
+
+
+def call(method, path, body=b""):
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path,
+               'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body)}
+    setup_testing_defaults(environ)
+    captured = {}
+
+    def start_response(status, headers):
+        captured['status'] = int(status.split()[0])
+        captured['headers'] = dict(headers)
+
+    data = b"".join(api.application(environ, start_response))
+    return captured['status'], captured['headers'], data.decode('utf-8')
+
+
+def test_metrics_endpoint(recording):
+    call('POST', '/v1/analyze/text', json.dumps({'text': "Calories 250"}).encode('utf-8'))
+    call('GET', '/nope')
+    status, headers, body = call('GET', '/metrics')
+    assert status == 200
+    assert headers['Content-Type'].startswith("text/plain; version=0.0.4")
+    assert 'nutriscan_api_responses_total{route="/v1/analyze/text",status="200"} 1' in body
+    assert 'nutriscan_api_responses_total{route="other",status="404"} 1' in body
+    assert 'nutriscan_parses_total{result="hit"} 1' in body
+    assert 'nutriscan_api_requests_in_flight 1' in body
+
+
+def test_metrics_endpoint_hidden_when_disabled():
+    metrics.set_enabled(False)
+    assert call('GET', '/metrics')[0] == 404
+
+
+def test_file_writer_survives_write_errors(monkeypatch, capsys, tmp_path):
+    path = str(tmp_path / "metrics.prom")
+    stop = threading.Event()
+    attempts = []
+    real_write_file = metrics.write_file
+
+    def flaky_write_file(path):
+        attempts.append(path)
+        if len(attempts) <= 2:
+            raise OSError(28, "No space left on device")
+        real_write_file(path)
+        stop.set()
+
+    monkeypatch.setattr(metrics, 'write_file', flaky_write_file)
+    writer = threading.Thread(target=metrics._write_periodically, args=(path, 0.01, stop))
+    writer.start()
+    writer.join(5)
+    assert not writer.is_alive() and len(attempts) == 3
+    assert (tmp_path / "metrics.prom").exists()
+    assert capsys.readouterr().err.count("Could not write metrics file") == 1
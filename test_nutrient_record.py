@@ -0,0 +1,54 @@
+import math
+import pickle
+
+import pipeline
+from nutrient_record import NUTRIENT_FIELDS, NutrientRecord
+from summarizers import local_summary
+
+LABEL = ("Serving size 2/3 cup (55g) 8 servings per container Calories 230 Total Fat 8g 10% "
+         "Saturated Fat 1g 5% Trans Fat 0g Cholesterol 0mg 0% Sodium 160mg 7% Total Carbohydrate 37g 13% "
+         "Dietary Fiber 4g 14% Total Sugars 12g Protein 3g Vitamin D 2mcg 10% Calcium 260mg 20% "
+         "Iron 8mg 45% Potassium 240mg 6%")
+
+
+def test_field_index_matches_parser_order():
+    assert NUTRIENT_FIELDS == tuple(pipeline.NUTRIENT_LABELS)
+
+
+def test_record_matches_dict_form():
+    nutrients = pipeline.parse_nutrition_table(LABEL)
+    record = pipeline.parse_nutrition_record(LABEL)
+    assert record == nutrients
+    assert list(record.to_dict().items()) == list(nutrients.items())
+    assert NutrientRecord.from_dict(nutrients) == nutrients
+
+
+def test_missing_values_are_nan():
+    record = pipeline.parse_nutrition_record("Calories 90 Protein 2g")
+    assert record.value('calories') == 90.0 and record.value('sodium') is None
+    assert math.isnan(record.data[NUTRIENT_FIELDS.index('sodium')])
+    assert 'sodium' not in record and 'serving_size' not in record and 'bogus' not in record
+    assert record.get('sodium') is None
+    assert len(record) == 2
+
+
+def test_pipeline_functions_accept_records():
+    nutrients = pipeline.parse_nutrition_table(LABEL)
+    record = NutrientRecord.from_dict(nutrients)
+    flags = pipeline.compute_health_flags(nutrients)
+    assert pipeline.compute_health_flags(record) == flags
+    assert pipeline.build_mistral_prompt(record, flags) == pipeline.build_mistral_prompt(nutrients, flags)
+    assert local_summary(record, flags) == local_summary(nutrients, flags)
+
+
+def test_flags_match_for_partial_labels():
+    for text in ("Total Sugars 30g", "Total Fat 4g Protein 5g", "Calcium 100mg", "Iron 8mg 45%",
+                 "Sodium 1500mg Saturated Fat 5g", ""):
+        nutrients = pipeline.parse_nutrition_table(text)
+        assert pipeline.compute_health_flags(pipeline.parse_nutrition_record(text)) == \
+            pipeline.compute_health_flags(nutrients), text
+
+
+def test_pickle_round_trip():
+    record = pipeline.parse_nutrition_record(LABEL)
+    assert pickle.loads(pickle.dumps(record)) == record.to_dict()
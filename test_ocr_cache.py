@@ -0,0 +1,60 @@
+import os
+
+import pipeline
+from ocr_cache import OCRCache, ocr_cache_key
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = OCRCache(max_entries=2)
+    cache.set("a", "text a")
+    cache.set("b", "text b")
+    assert cache.get("a") == "text a"  # "b" is now the least recently used
+    cache.set("c", "text c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "text a" and cache.get("c") == "text c"
+    stats = cache.stats()
+    assert stats['memory_evictions'] == 1 and stats['memory_entries'] == 2
+    assert stats['memory_hits'] == 3 and stats['misses'] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    OCRCache(disk_dir=str(tmp_path)).set("key", "Calories 250")
+    cache = OCRCache(disk_dir=str(tmp_path))
+    assert cache.get("key") == "Calories 250"
+    assert cache.stats()['disk_hits'] == 1
+    assert cache.get("key") == "Calories 250"
+    assert cache.stats()['memory_hits'] == 1
+
+
+def test_disk_tier_size_cap_evicts_oldest(tmp_path):
+    cache = OCRCache(max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=25)
+    for age, key in enumerate(("old", "mid")):
+        cache.set(key, "x" * 10)
+        # Distinct, ordered mtimes whatever the filesystem's timestamp resolution
+        os.utime(tmp_path / f"{key}.txt", (1000 + age, 1000 + age))
+    cache.set("new", "x" * 10)
+    assert sorted(os.listdir(tmp_path)) == ["mid.txt", "new.txt"]
+    assert cache.stats()['disk_bytes'] == 20 and cache.stats()['disk_evictions'] == 1
+    # Too large for the whole budget: not written at all
+    cache.set("huge", "x" * 30)
+    assert not (tmp_path / "huge.txt").exists()
+
+
+def test_read_refreshes_disk_recency(tmp_path):
+    cache = OCRCache(max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=25)
+    cache.set("a", "x" * 10)
+    cache.set("b", "x" * 10)
+    os.utime(tmp_path / "a.txt", (1000, 1000))
+    os.utime(tmp_path / "b.txt", (2000, 2000))
+    assert cache.get("a") == "x" * 10  # from disk (memory holds "b"), touching the file
+    cache.set("c", "x" * 10)
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "c.txt"]
+
+
+def test_keys_change_with_image_and_settings():
+    settings = dict(pipeline.OCR_SETTINGS, engine="pytesseract")
+    key = ocr_cache_key(b"image", settings)
+    assert key == ocr_cache_key(b"image", dict(settings))
+    assert key != ocr_cache_key(b"image2", settings)
+    for name, value in (('psm', 11), ('lang', "deu"), ('preprocess', "legacy"), ('engine', "tesserocr")):
+        assert key != ocr_cache_key(b"image", dict(settings, **{name: value}))
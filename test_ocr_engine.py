@@ -0,0 +1,68 @@
+import pytest
+
+import ocr_engine
+from ocr_engine import DEFAULT_PSM, PytesseractEngine, _TesserocrWorker, build_tesseract_config, create_engine
+
+
+class RecordingAPI:
+    """Stands in for a tesserocr.PyTessBaseAPI handle, tracking psm and variables."""
+
+    def __init__(self):
+        self.psm = DEFAULT_PSM
+        self.variables = {'tessedit_char_whitelist': "", 'preserve_interword_spaces': "0"}
+
+    def SetPageSegMode(self, psm):
+        self.psm = psm
+
+    def GetVariableAsString(self, name):
+        return self.variables.get(name)
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+        return True
+
+
+def worker():
+    worker = _TesserocrWorker.__new__(_TesserocrWorker)
+    worker.api = RecordingAPI()
+    worker._defaults = {}
+    return worker
+
+
+def test_configure_restores_per_call_variables():
+    w = worker()
+    original = dict(w.api.variables)
+    w._configure(6, {'tessedit_char_whitelist': "0123456789%g", 'preserve_interword_spaces': 1})
+    assert w.api.psm == 6
+    assert w.api.variables == {'tessedit_char_whitelist': "0123456789%g", 'preserve_interword_spaces': "1"}
+
+    # The next call sets only one of them: the other goes back to its default
+    w._configure(None, {'preserve_interword_spaces': 0})
+    assert w.api.psm == DEFAULT_PSM
+    assert w.api.variables == {'tessedit_char_whitelist': "", 'preserve_interword_spaces': "0"}
+
+    w._configure(None, {})
+    assert w.api.variables == original and w._defaults == {}
+
+
+def test_configure_keeps_the_original_default_across_calls():
+    w = worker()
+    w._configure(None, {'tessedit_char_whitelist': "abc"})
+    w._configure(None, {'tessedit_char_whitelist': "xyz"})
+    w._configure(None, {})
+    assert w.api.variables['tessedit_char_whitelist'] == ""
+
+
+def test_falls_back_to_pytesseract_without_tesserocr(monkeypatch):
+    monkeypatch.setattr(ocr_engine, 'tesserocr', None)
+    engine = create_engine("auto", lang="deu")
+    assert isinstance(engine, PytesseractEngine) and engine.name == "pytesseract" and engine.lang == "deu"
+    with pytest.raises(RuntimeError):
+        create_engine("tesserocr")
+    with pytest.raises(ValueError):
+        create_engine("easyocr")
+
+
+def test_build_tesseract_config():
+    assert build_tesseract_config() == ""
+    assert build_tesseract_config(6, {'b': 1, 'a': "x"}) == "--psm 6 -c a=x -c b=1"
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from pipeline import clean_ocr_text, parse_nutrition_record, parse_nutrition_table
+from benchmarks.bench_parser import generate_text, legacy_parse_nutrition_table
+
+FULL_LABEL = """Nutrition Facts
+8 servings per container
+Serving size 2/3 cup (55g)
+Calories 230
+Total Fat 8g 10%
+Saturated Fat 1g 5%
+Trans Fat 0g
+Cholesterol 0mg 0%
+Sodium 160mg 7%
+Total Carbohydrate 37g 13%
+Dietary Fiber 4g 14%
+Total Sugars 12g
+Includes 10g Added Sugars 20%
+Protein 3g
+Vitamin D 2mcg 10%
+Calcium 260mg 20%
+Iron 8mg 45%
+Potassium 240mg 6%"""
+
+
+def values(nutrients):
+    return {key: entry['value'] if isinstance(entry, dict) and 'value' in entry else entry
+            for key, entry in nutrients.items()}
+
+
+def daily_values(nutrients):
+    return {key: entry['daily_value_percent'] for key, entry in nutrients.items()
+            if isinstance(entry, dict) and 'daily_value_percent' in entry}
+
+
+@pytest.mark.parametrize("text", [
+    FULL_LABEL,
+    "About 12 servings per container Serving size 1 cup (228g) Calories 250",
+    "1 serving per container Serving size 1 bar (40g)",
+    "TOTAL FAT 8G 10% SODIUM 160MG 7% PROTEIN 3G",
+    "Total Carbohydrates 20g 7% Dietary Fiber 3g 11%",
+    "% Daily Value* Total Fat 8g 10% Sodium 2400mg 104%",
+    "Vitamin D 2 mcg 10% Calcium 260mg 20% Iron 1.5mg 8%",
+])
+@pytest.mark.parametrize("clean", [False, True])
+def test_values_match_legacy_parser(text, clean):
+    text = clean_ocr_text(text) if clean else text
+    assert values(parse_nutrition_table(text)) == values(legacy_parse_nutrition_table(text))
+
+
+def test_same_line_daily_values():
+    nutrients = parse_nutrition_table(clean_ocr_text(FULL_LABEL))
+    assert daily_values(nutrients) == {
+        'total_fat': 10.0, 'saturated_fat': 5.0, 'cholesterol': 0.0, 'sodium': 7.0,
+        'total_carbohydrate': 13.0, 'dietary_fiber': 14.0, 'vitamin_d': 10.0,
+        'calcium': 20.0, 'iron': 45.0, 'potassium': 6.0,
+    }
+    # Intended change: the legacy parser gave nutrients without a % Daily Value the
+    # next nutrient's, e.g. calories took total fat's 10% and trans fat cholesterol's 0%
+    legacy = daily_values(legacy_parse_nutrition_table(clean_ocr_text(FULL_LABEL)))
+    assert legacy['calories'] == 10.0 and legacy['trans_fat'] == 0.0
+    assert {key: legacy[key] for key in daily_values(nutrients)} == daily_values(nutrients)
+
+
+def test_daily_value_on_next_line():
+    # Intended change: a percentage wrapped onto the next line still belongs to the
+    # nutrient above it (the legacy pattern stopped at the newline)
+    nutrients = parse_nutrition_table("Total Fat 8g\n10%\nSodium 160mg\n7%\nProtein 3g")
+    assert daily_values(nutrients) == {'total_fat': 10.0, 'sodium': 7.0}
+    assert daily_values(legacy_parse_nutrition_table("Total Fat 8g\n10%\nSodium 160mg\n7%")) == {}
+
+
+def test_servings_count_after_a_nutrient_name():
+    text = "Total Carbohydrate 12 servings per container Protein 3g"
+    assert parse_nutrition_table(text) == {'servings_per_container': 12, 'protein': {'value': 3.0}}
+    assert parse_nutrition_table(text) == legacy_parse_nutrition_table(text)
+
+
+def test_sub_nutrients():
+    text = clean_ocr_text("Total Fat 8g 10%\nSaturated Fat 1g 5%\nTrans Fat 0g\nTotal Carbohydrate 37g 13%\n"
+                          "Dietary Fiber 4g 14%\nTotal Sugars 12g\nIncludes 10g Added Sugars 20%")
+    nutrients = parse_nutrition_table(text)
+    assert nutrients['saturated_fat'] == {'value': 1.0, 'daily_value_percent': 5.0}
+    assert nutrients['trans_fat'] == {'value': 0.0}
+    assert nutrients['dietary_fiber'] == {'value': 4.0, 'daily_value_percent': 14.0}
+    assert nutrients['total_sugars'] == {'value': 12.0}
+    # "Includes 10g Added Sugars" puts the amount before the name; neither parser reads it
+    assert 'added_sugars' not in nutrients and 'added_sugars' not in legacy_parse_nutrition_table(text)
+
+
+def test_first_well_formed_occurrence_wins():
+    nutrients = parse_nutrition_table("Sodium 2.5mg Sodium 160mg 7% Sodium 200mg 9%")
+    assert nutrients['sodium'] == {'value': 160.0, 'daily_value_percent': 7.0}
+
+
+def test_synthetic_corpus_matches_legacy_values():
+    rng = random.Random(0)
+    for _ in range(300):
+        text = generate_text(rng)
+        new, old = parse_nutrition_table(text), legacy_parse_nutrition_table(text)
+        assert values(new) == values(old)
+        # Every % Daily Value the new parser assigns is one the legacy parser found too
+        assert daily_values(new).items() <= daily_values(old).items()
+
+
+def test_record_matches_dict_parser():
+    text = clean_ocr_text(FULL_LABEL)
+    assert parse_nutrition_record(text).to_dict() == parse_nutrition_table(text)
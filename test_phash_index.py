@@ -0,0 +1,102 @@
+import random
+
+import pytest
+from PIL import Image, ImageDraw, ImageEnhance
+
+import pipeline
+import phash_index
+from phash_index import BKTree, PerceptualHashIndex, dhash, hamming
+
+LABEL = ("Serving size 1 cup (228g)\nCalories 250\nTotal Fat 12g 18%\nSodium 470mg 20%\n"
+         "Total Carbohydrate 31g 10%\nTotal Sugars 5g\nProtein 5g")
+
+
+def label_image(seed, size=(600, 1200)):
+    """A white panel with random dark bars, standing in for a label photo."""
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    for y in range(20, size[1] - 40, 40):
+        draw.rectangle((20, y, rng.randint(100, size[0] - 20), y + rng.randint(8, 30)), fill='black')
+    return image
+
+
+def test_dhash_tolerates_lighting_but_not_another_label():
+    image = label_image(1)
+    darker = ImageEnhance.Brightness(image).enhance(0.8)
+    assert hamming(dhash(image), dhash(darker)) <= 4
+    assert hamming(dhash(image), dhash(label_image(2))) > 32
+    assert dhash(image) < 1 << phash_index.HASH_SIZE ** 2
+
+
+def test_bk_tree_matches_brute_force():
+    rng = random.Random(0)
+    keys = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for value, key in enumerate(keys):
+        tree.add(key, value)
+    for _ in range(20):
+        query = keys[rng.randrange(len(keys))] ^ (1 << rng.randrange(64))
+        expected = sorted((hamming(query, key), value) for value, key in enumerate(keys) if hamming(query, key) <= 20)
+        assert sorted(tree.search(query, 20)) == expected
+
+
+def test_lookup_within_max_distance():
+    index = PerceptualHashIndex(max_distance=2)
+    index.add_hash(0b1111, LABEL)
+    assert index.lookup_hash(0b0111) == (LABEL, 1)
+    assert index.lookup_hash(0b0001) == (None, None)
+    stats = index.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_ambiguous_match_is_a_miss():
+    index = PerceptualHashIndex(max_distance=2)
+    index.add_hash(0b0011, LABEL)
+    index.add_hash(0b1100, "Calories 90")
+    assert index.lookup_hash(0b0110) == (None, None)
+    assert index.stats()['ambiguous'] == 1
+
+
+def test_persists_and_ignores_other_settings(tmp_path):
+    path = str(tmp_path / "phash.jsonl")
+    PerceptualHashIndex(path, settings_key="a").add_hash(42, LABEL)
+    PerceptualHashIndex(path, settings_key="b").add_hash(42, "Calories 90")
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"hash": "2a", "bi')  # torn last line
+    reloaded = PerceptualHashIndex(path, settings_key="a")
+    assert len(reloaded) == 1
+    assert reloaded.lookup_hash(42) == (LABEL, 0)
+
+
+@pytest.fixture
+def phash_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("PHASH_INDEX_PATH", str(tmp_path / "phash.jsonl"))
+    monkeypatch.setattr(phash_index, '_index', None)
+    yield
+    phash_index._index = None
+
+
+def test_run_ocr_skips_tesseract_for_a_rephotographed_label(phash_path, monkeypatch):
+    calls = []
+
+    def extract_text_adaptive(image):
+        calls.append(image.size)
+        return LABEL, pipeline.OCR_PASS_FAST
+
+    monkeypatch.setattr(pipeline, 'extract_text_adaptive', extract_text_adaptive)
+    monkeypatch.setattr(pipeline, 'OCR_STRATEGY', "adaptive")
+    monkeypatch.setattr(pipeline, 'LABEL_DETECTION', False)
+    image = label_image(3)
+    assert pipeline.run_ocr(image, b"first upload") == (LABEL, pipeline.OCR_PASS_FAST)
+    again = ImageEnhance.Brightness(image).enhance(0.9)
+    assert pipeline.run_ocr(again, b"second upload") == (LABEL, pipeline.OCR_PASS_NEAR_DUPLICATE)
+    assert pipeline.run_ocr(label_image(4), b"other label")[1] == pipeline.OCR_PASS_FAST
+    assert len(calls) == 2
+
+
+def test_run_ocr_does_not_index_poor_readings(phash_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'extract_text_adaptive', lambda image: ("Calories 90", pipeline.OCR_PASS_FULL))
+    monkeypatch.setattr(pipeline, 'LABEL_DETECTION', False)
+    pipeline.run_ocr(label_image(5), b"blurry upload")
+    assert len(phash_index.get_phash_index()) == 0
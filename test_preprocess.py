@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter
+
+import pipeline
+from benchmarks.common import SAMPLE_IMAGE
+
+
+@pytest.fixture(scope="module")
+def sample():
+    with Image.open(SAMPLE_IMAGE) as image:
+        return image.convert('RGB')
+
+
+def gray(sample):
+    image = sample.convert('L')
+    return image, np.asarray(image)
+
+
+@pytest.mark.parametrize("radius", [1, 2, 5])
+def test_box_mean_matches_pil_box_blur(sample, radius):
+    image, pixels = gray(sample)
+    expected = np.asarray(image.filter(ImageFilter.BoxBlur(radius))).astype(int)
+    # box_mean floors the mean where PIL rounds it
+    difference = np.abs(pipeline.box_mean(pixels, radius, band_rows=100).astype(int) - expected)
+    assert difference.max() <= 1
+
+
+def test_unsharp_mask_matches_pil_box_blur_unsharp(sample):
+    image, pixels = gray(sample)
+    blurred = np.asarray(image.filter(ImageFilter.BoxBlur(2))).astype(int)
+    expected = np.clip(2 * pixels.astype(int) - blurred, 0, 255)
+    difference = np.abs(pipeline.unsharp_mask(pixels, 2, 1.0).astype(int) - expected)
+    assert difference.max() <= 1
+
+
+@pytest.mark.parametrize("max_size", [pipeline.PREPROCESS_MAX_SIZE, 400])
+def test_numpy_path_stays_close_to_pil_path(sample, monkeypatch, max_size):
+    # 400 forces the downsampling branch (integer reduce, then LANCZOS) on the 600x900 sample
+    monkeypatch.setattr(pipeline, 'PREPROCESS_MAX_SIZE', max_size)
+    fast = pipeline.preprocess_image_numpy(sample, binarize=False)
+    legacy = pipeline.preprocess_image_legacy(sample)
+    assert fast.mode == legacy.mode == 'L' and fast.size == legacy.size
+    # Different filters (percentile stretch and box unsharp vs. PIL enhancers): similar, not equal
+    difference = np.abs(np.asarray(fast).astype(int) - np.asarray(legacy).astype(int))
+    assert difference.mean() < 8
+
+
+def test_binarize_outputs_black_and_white(sample):
+    result = np.asarray(pipeline.preprocess_image_numpy(sample, binarize=True))
+    assert set(np.unique(result)) <= {0, 255}
+    # Mostly paper: most pixels stay white
+    assert (result == 255).mean() > 0.5
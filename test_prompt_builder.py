@@ -0,0 +1,58 @@
+import pipeline
+
+LABEL = ("Serving size 2/3 cup (55g) 8 servings per container Calories 230 Total Fat 8g 10% "
+         "Saturated Fat 1g 5% Trans Fat 0g Cholesterol 0mg 0% Sodium 160mg 7% Total Carbohydrate 37g 13% "
+         "Dietary Fiber 4g 14% Total Sugars 12g Protein 3g Vitamin D 2mcg 10% Calcium 260mg 20% "
+         "Iron 8mg 45% Potassium 240mg 6%")
+
+
+def label():
+    nutrients = pipeline.parse_nutrition_table(LABEL)
+    return nutrients, pipeline.compute_health_flags(nutrients)
+
+
+def prompt_tokens(system_message, user_message):
+    return (pipeline.estimate_tokens(pipeline.clean_prompt_text(system_message))
+            + pipeline.estimate_tokens(pipeline.clean_prompt_text(user_message)))
+
+
+def test_compact_prompt_keeps_every_value_in_fewer_tokens():
+    nutrients, flags = label()
+    system_message, user_message = pipeline.build_compact_prompt(nutrients, flags)
+    cleaned = pipeline.clean_prompt_text(user_message)
+    assert cleaned.splitlines()[1:4] == ["serving 2/3 cup (55g), 8 per container", "calories 230",
+                                        "fat 8g [10%], sat fat 1g [5%], trans fat 0g"]
+    assert "potassium 240mg [6%]" in cleaned and "Low in protein" in cleaned
+    assert prompt_tokens(system_message, user_message) < prompt_tokens(*pipeline.build_verbose_prompt(nutrients, flags)) / 2
+
+
+def test_budget_drops_optional_nutrients_first():
+    nutrients, flags = label()
+    stats = {}
+    _, user_message = pipeline.build_compact_prompt(nutrients, flags, token_budget=185, stats=stats)
+    assert stats['prompt_dropped'][:2] == ['potassium', 'vitamin_d']
+    assert prompt_tokens(pipeline.COMPACT_SYSTEM_MESSAGE, user_message) <= 185
+    assert "potassium" not in user_message and "sodium 160mg [7%]" in user_message
+
+    _, user_message = pipeline.build_compact_prompt(nutrients, flags, token_budget=0)
+    for essential in ("serving", "calories", "fat 8g", "sodium", "carbs", "sugars", "protein", "flags"):
+        assert essential in user_message
+
+
+def test_prompt_style_and_token_stats(monkeypatch):
+    nutrients, flags = label()
+    stats = {}
+    assert pipeline.build_mistral_prompt(nutrients, flags, stats) == pipeline.build_compact_prompt(nutrients, flags)
+    assert stats['prompt_tokens'] > 0
+    monkeypatch.setattr(pipeline, 'PROMPT_STYLE', "verbose")
+    assert pipeline.build_mistral_prompt(nutrients, flags) == pipeline.build_verbose_prompt(nutrients, flags)
+
+
+def test_estimate_tokens_counts_digits_singly():
+    assert pipeline.estimate_tokens("") == 0
+    assert pipeline.estimate_tokens("1234") == 4
+    assert pipeline.estimate_tokens("sodium 160mg") == 3 + 3
+
+
+def test_prompt_cleaning_keeps_lines():
+    assert pipeline.clean_prompt_text("  a   b \n\n\n\ncé\n") == "a b\n\nc"
@@ -0,0 +1,82 @@
+import io
+import csv
+import json
+
+import pytest
+
+import pipeline
+from results_store import ResultsStore, main, parse_condition
+
+LABEL = ("Serving size 1 cup (228g)\nCalories 250\nTotal Fat 12g 18%\nSodium 470mg 20%\n"
+         "Total Carbohydrate 31g 10%\nTotal Sugars 5g\nProtein 5g")
+
+
+def result(sodium, image_hash="abc"):
+    result = pipeline.analyze_text(LABEL.replace("470mg", f"{sodium}mg"))
+    result['image_hash'] = image_hash
+    return result
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), batch_size=3, flush_interval=0)
+    yield store
+    store.close()
+
+
+def test_round_trip(store):
+    original = result(470)
+    store.add(original)
+    row = store.latest("abc")
+    assert row['nutrients'] == original['nutrients']
+    assert row['flags'] == original['flags']
+    assert row['cleaned_text'] == original['cleaned_text']
+    assert row['timings'].keys() == original['timings'].keys()
+    assert row['sodium'] == 470.0 and row['status'] == pipeline.STATUS_OK
+    assert store.latest("missing") is None
+
+
+def test_batches_inserts(store):
+    for sodium in (100, 200, 300, 400):
+        store.add(result(sodium))
+    assert store.stats() == {'stored': 3, 'batches': 1, 'pending': 1}
+    assert store.count() == 4  # reads flush the pending row first
+
+
+def test_wal_mode_and_indexed_filter(store):
+    store.add(result(800))
+    store.add(result(300))
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert [row['sodium'] for row in store.find([('sodium', '>', 600)])] == [800.0]
+    plan = store._conn.execute("EXPLAIN QUERY PLAN SELECT id FROM analyses WHERE sodium > 600").fetchall()
+    assert "idx_analyses_sodium" in str(plan)
+
+
+def test_rejects_unknown_filter_columns(store):
+    with pytest.raises(ValueError):
+        store.find([('raw_text', '=', "x")])
+    assert parse_condition("sodium>=600") == ('sodium', '>=', 600.0)
+    assert parse_condition("status=ok") == ('status', '=', "ok")
+
+
+def test_exports(store):
+    for sodium in (700, 100, 900):
+        store.add(result(sodium, image_hash=str(sodium)))
+    out = io.StringIO()
+    assert store.export_ndjson(out, [('sodium', '>', 600)]) == 2
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [row['image_hash'] for row in rows] == ["700", "900"]
+
+    out = io.StringIO()
+    assert store.export_csv(out) == 3
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert json.loads(rows[0]['nutrients'])['sodium']['value'] == 700.0
+
+
+def test_cli_export(store, tmp_path, capsys):
+    store.add(result(800))
+    store.flush()
+    output = tmp_path / "high.csv"
+    assert main(["--db", store.path, "export", str(output), "--where", "sodium>600"]) == 0
+    assert len(list(csv.DictReader(output.open(newline='')))) == 1
+    assert main(["--db", store.path, "count", "--where", "bogus>1"]) == 2
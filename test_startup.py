@@ -0,0 +1,37 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# lazy_import registers a not-yet-executed stub in sys.modules, so "loaded"
+# means the entry is a plain module rather than a lazy one
+CHECK = """
+import sys, json, types
+import {module}
+print(json.dumps([name for name in ('numpy', 'PIL.Image')
+                  if type(sys.modules.get(name)) is types.ModuleType]))
+"""
+
+
+def eagerly_loaded(module):
+    completed = subprocess.run([sys.executable, "-c", CHECK.format(module=module)], cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def test_importing_pipeline_does_not_load_numpy_or_pil():
+    assert eagerly_loaded("pipeline") == []
+
+
+def test_importing_api_does_not_load_numpy_or_pil():
+    assert eagerly_loaded("api") == []
+
+
+def test_pil_submodules_stay_importable_after_pipeline():
+    code = ("import pipeline\n"
+            "import PIL.Image, PIL.ImageOps, PIL.ImageEnhance\n"
+            "assert callable(PIL.Image.open) and callable(PIL.ImageOps.grayscale)\n"
+            "assert PIL.ImageEnhance.Contrast is pipeline.ImageEnhance.Contrast\n")
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
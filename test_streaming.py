@@ -0,0 +1,105 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import pipeline
+import http_client
+from http_client import HTTPClient
+from summary_cache import get_summary_cache
+
+CHUNKS = ["Serving size: 1 cup. ", "High in sodium. ", "Pair with vegetables."]
+
+
+class SSEStubHandler(BaseHTTPRequestHandler):
+    """Mimics the Mistral chat completions endpoint, streamed or not."""
+
+    # None, an HTTP error status, or "malformed" for an unparseable event
+    fail_streaming = None
+    requests_seen = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        SSEStubHandler.requests_seen.append(payload)
+
+        if payload.get('stream'):
+            failure = SSEStubHandler.fail_streaming
+            if isinstance(failure, int):
+                self._send_json(failure, {'error': 'streaming unavailable'})
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            if failure == "malformed":
+                self.wfile.write(b"data: {not json\n\n")
+                return
+            for chunk in CHUNKS:
+                event = {'choices': [{'index': 0, 'delta': {'content': chunk}}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        else:
+            self._send_json(200, {'choices': [{'message': {'content': "".join(CHUNKS)}}]})
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Point the summary requests at a local SSE stub, with no client retries."""
+    monkeypatch.setattr(SSEStubHandler, 'fail_streaming', None)
+    monkeypatch.setattr(SSEStubHandler, 'requests_seen', [])
+    get_summary_cache().clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SSEStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = HTTPClient(max_retries=0)
+    monkeypatch.setattr(pipeline, 'MISTRAL_API_URL', f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions")
+    monkeypatch.setattr(http_client, 'get_http_client', lambda: client)
+    yield
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_streams_chunks_in_order(stub):
+    stats = {}
+    chunks = list(pipeline.stream_mistral_summary("system", "user", "key", stats))
+    assert chunks == CHUNKS
+    assert SSEStubHandler.requests_seen[0]['stream'] is True
+    assert 0 <= stats['time_to_first_token'] <= stats['total_time']
+
+
+def test_falls_back_to_blocking_request(stub):
+    SSEStubHandler.fail_streaming = "malformed"
+    stats = {}
+    chunks = list(pipeline.iter_summary("system", "user", "key", stats))
+    assert chunks == ["".join(CHUNKS)]
+    assert stats['streamed'] is False
+    assert [payload.get('stream', False) for payload in SSEStubHandler.requests_seen] == [True, False]
+
+
+def test_server_error_is_not_repeated_as_a_blocking_request(stub):
+    SSEStubHandler.fail_streaming = 503
+    with pytest.raises(pipeline.SummaryError) as error:
+        list(pipeline.iter_summary("system", "user", "key"))
+    assert error.value.status_code == 503
+    assert [payload.get('stream', False) for payload in SSEStubHandler.requests_seen] == [True]
+
+
+def test_streamed_summary_is_cached(stub):
+    list(pipeline.iter_summary("system", "user", "key"))
+    stats = {}
+    assert list(pipeline.iter_summary("system", "user", "key", stats)) == ["".join(CHUNKS)]
+    assert stats['cached'] is True
+    assert len(SSEStubHandler.requests_seen) == 1
+
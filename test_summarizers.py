@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from pipeline import SummaryError, compute_health_flags
+from summarizers import AutoSummarizer, LocalSummarizer, create_summarizer, local_summary
+
+NUTRIENTS = {
+    'serving_size': {'amount': '1', 'unit': 'cup', 'grams': 228},
+    'servings_per_container': 2,
+    'calories': {'value': 250.0},
+    'total_fat': {'value': 12.0, 'daily_value_percent': 18.0},
+    'sodium': {'value': 1600.0, 'daily_value_percent': 70.0},
+    'total_sugars': {'value': 5.0},
+    'protein': {'value': 5.0},
+    'calcium': {'value': 260.0, 'daily_value_percent': 20.0},
+}
+
+
+class FakeRemote:
+    def __init__(self, chunks=("Remote ", "summary"), delay=0.0, error=None):
+        self.chunks, self.delay, self.error = chunks, delay, error
+
+    def stream(self, nutrients, flags, stats=None):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        if stats is not None:
+            stats['backend'] = "mistral"
+        yield from self.chunks
+
+
+def auto_with(remote, timeout=1.0):
+    summarizer = AutoSummarizer("key", remote_timeout=timeout)
+    summarizer.remote = remote
+    return summarizer
+
+
+def test_local_summary_format():
+    summary = local_summary(NUTRIENTS, compute_health_flags(NUTRIENTS))
+    lines = summary.splitlines()
+    assert lines[0].startswith("**Serving size:** 1 cup (228g)")
+    assert 2 <= sum(line.startswith("- ") for line in lines) <= 4
+    assert lines[-1].startswith("**Tip:**") and "salt" in lines[-1]
+    assert "250 calories" in summary and "about 70% of what you need in a day" in summary
+
+
+def test_local_summary_with_sparse_label():
+    lines = local_summary({'calories': {'value': 90.0}}, []).splitlines()
+    assert lines[0].startswith("**Serving size:**")
+    assert sum(line.startswith("- ") for line in lines) == 2
+
+
+def test_auto_uses_remote_when_it_answers():
+    stats = {}
+    assert auto_with(FakeRemote()).summarize(NUTRIENTS, [], stats) == "Remote summary"
+    assert stats['backend'] == "mistral"
+
+
+def test_auto_falls_back_on_error_and_timeout():
+    for remote in (FakeRemote(error=SummaryError("API Error")), FakeRemote(delay=0.5)):
+        stats = {}
+        summary = auto_with(remote, timeout=0.1).summarize(NUTRIENTS, [], stats)
+        assert summary == local_summary(NUTRIENTS, [])
+        assert stats['backend'] == "local" and stats['fallback_reason']
+
+
+def test_auto_without_api_key_is_local():
+    stats = {}
+    AutoSummarizer(None).summarize(NUTRIENTS, [], stats)
+    assert stats['backend'] == "local"
+
+
+def test_create_summarizer():
+    assert isinstance(create_summarizer("local"), LocalSummarizer)
+    with pytest.raises(ValueError):
+        create_summarizer("gpt")
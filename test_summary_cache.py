@@ -0,0 +1,75 @@
+import pytest
+
+import pipeline
+import summary_cache
+from summary_cache import MemoryBackend, SQLiteBackend, SummaryCache, summary_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(summary_cache.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_entries_expire_after_ttl(backend, clock, tmp_path):
+    store = MemoryBackend() if backend == "memory" else SQLiteBackend(str(tmp_path / "summaries.sqlite3"))
+    cache = SummaryCache(store, ttl=60)
+    cache.set("key", "summary")
+    clock[0] += 59
+    assert cache.get("key") == "summary"
+    clock[0] += 1
+    assert cache.get("key") is None
+    assert len(store) == 0
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_sqlite_backend_round_trip_across_instances(tmp_path):
+    path = str(tmp_path / "cache" / "summaries.sqlite3")
+    SummaryCache(SQLiteBackend(path)).set("key", "Moderate sodium; pair with vegetables. 🥦")
+    cache = SummaryCache(SQLiteBackend(path))
+    assert cache.get("key") == "Moderate sodium; pair with vegetables. 🥦"
+    assert cache.stats()['entries'] == 1
+    cache.clear()
+    assert cache.get("key") is None
+
+
+def test_sqlite_backend_evicts_least_recently_used(clock, tmp_path):
+    store = SQLiteBackend(str(tmp_path / "summaries.sqlite3"), max_entries=2)
+    cache = SummaryCache(store)
+    for key in ("a", "b"):
+        cache.set(key, key)
+        clock[0] += 1
+    assert cache.get("a") == "a"
+    clock[0] += 1
+    cache.set("c", "c")
+    assert cache.get("b") is None and cache.get("a") == "a" and cache.get("c") == "c"
+    assert cache.stats()['evictions'] == 1
+
+
+def test_memory_backend_evicts_least_recently_used():
+    cache = SummaryCache(MemoryBackend(max_entries=2))
+    cache.set("a", "a")
+    cache.set("b", "b")
+    cache.get("a")
+    cache.set("c", "c")
+    assert cache.get("b") is None and cache.get("a") == "a"
+
+
+def test_keys_change_with_prompt_model_and_max_tokens():
+    base = summary_cache_key("system", "user", "mistral-small", 0.3, 500)
+    assert base == summary_cache_key("system", "user", "mistral-small", 0.3, 500)
+    assert base != summary_cache_key("system 2", "user", "mistral-small", 0.3, 500)
+    assert base != summary_cache_key("system", "user 2", "mistral-small", 0.3, 500)
+    assert base != summary_cache_key("system", "user", "mistral-large", 0.3, 500)
+    assert base != summary_cache_key("system", "user", "mistral-small", 0.7, 500)
+    assert base != summary_cache_key("system", "user", "mistral-small", 0.3, 1000)
+
+
+def test_prompt_cache_key_follows_model_and_max_tokens(monkeypatch):
+    key = pipeline.prompt_cache_key("system", "user")
+    assert key == pipeline.prompt_cache_key("system", "user", pipeline.MISTRAL_MAX_TOKENS)
+    assert key != pipeline.prompt_cache_key("system", "user", pipeline.MISTRAL_MAX_TOKENS * 2)
+    monkeypatch.setattr(pipeline, 'MISTRAL_MODEL', "another-model")
+    assert key != pipeline.prompt_cache_key("system", "user")
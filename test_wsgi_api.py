@@ -0,0 +1,61 @@
+import io
+import json
+from wsgiref.util import setup_testing_defaults
+
+import api
+
+
+def call(method, path, body=b"", query=""):
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+    }
+    setup_testing_defaults(environ)
+    captured = {}
+
+    def start_response(status, headers):
+        captured['status'] = int(status.split()[0])
+        captured['headers'] = dict(headers)
+
+    data = b"".join(api.application(environ, start_response))
+    return captured['status'], captured['headers'], json.loads(data)
+
+
+def test_healthz():
+    assert call('GET', '/healthz')[0::2] == (200, {'status': 'ok'})
+
+
+def test_analyze_text_with_local_summary():
+    body = json.dumps({'text': "Calories 250\nSodium 2000mg 87%", 'summary': True, 'summarizer': 'local'})
+    status, headers, result = call('POST', '/v1/analyze/text', body.encode('utf-8'))
+    assert status == 200
+    assert headers['Content-Type'].startswith('application/json')
+    assert result['nutrients']['sodium'] == {'value': 2000.0, 'daily_value_percent': 87.0}
+    assert "⚠️ High in sodium" in result['flags']
+    assert result['summary_backend'] == 'local' and result['summary'].startswith("**Serving size:**")
+
+
+def test_client_errors():
+    assert call('GET', '/v1/analyze/text')[0] == 405
+    assert call('POST', '/nope', b"{}")[0] == 404
+    assert call('POST', '/v1/analyze/text', b"not json")[0] == 400
+    assert call('POST', '/v1/analyze/text', b'{"text": 1}')[0] == 400
+    assert call('POST', '/v1/analyze/image')[0] == 411
+    assert call('POST', '/v1/analyze/image', b"x", query="summary=1&summarizer=gpt")[0] == 400
+
+
+def test_upload_limit(monkeypatch):
+    monkeypatch.setattr(api, 'MAX_UPLOAD_BYTES', 4)
+    assert call('POST', '/v1/analyze/image', b"12345")[0] == 413
+
+
+def test_busy_ocr_answers_503(monkeypatch):
+    def busy(*args, **kwargs):
+        raise api.ServerBusy("ocr", 3)
+    monkeypatch.setattr(api, 'analyze_image', busy)
+    status, headers, body = call('POST', '/v1/analyze/image', b"image")
+    assert status == 503 and headers['Retry-After'] == "3"
+    assert body['retry_after'] == 3